@@ -5,6 +5,23 @@ It exposes the ASGI callable as a module-level variable named ``application``.
 
 For more information on this file, see
 https://docs.djangoproject.com/en/5.2/howto/deployment/asgi/
+
+تشغيل الإنتاج على ASGI (بدل gunicorn sync workers):
+
+    ARABELLA_ASYNC_VIEWS=1 gunicorn arabella.asgi:application \\
+        -k uvicorn_worker.UvicornWorker -w 2 --timeout 60 --graceful-timeout 30
+
+- worker واحد بيخدم مئات الاتصالات المفتوحة (long-poll على حالة الطلب،
+  panel/feed/، SSE) لأن الانتظار بـ asyncio مو thread محجوز.
+- ARABELLA_ASYNC_VIEWS=1 → صفحات القراءة من menu/async_views.py.
+  الـ views اللي بتكتب (سلة / checkout / اللوحة) بتضل sync وDjango بيشغّلها
+  على thread واحد لكل worker (thread_sensitive)، فعدد الـ workers هو حد
+  الكتابة المتوازية متل قبل. مع SQLite الكاتب واحد أصلاً.
+- --timeout لازم يكون أكبر من ORDER_STATUS_MAX_WAIT و live.MAX_WAIT (25 ثانية).
+- ADMIN_LIVE_TRANSPORT = "sse" بيشتغل بس هون.
+- بيتطلب: pip install uvicorn-worker (شوف requirements.txt).
+
+مقارنة السعة مع WSGI: python manage.py bench_asgi (شوف الـ command).
 """
 
 import os
@@ -14,3 +31,8 @@ from django.core.asgi import get_asgi_application
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'arabella.settings')
 
 application = get_asgi_application()
+
+# تنظيف الـ sessions بالخلفية إذا SESSION_PURGE_INTERVAL > 0 (menu/sessions.py)
+from menu import sessions  # noqa: E402
+
+sessions.start_scheduler()
@@ -10,6 +10,7 @@ For the full list of settings and their values, see
 https://docs.djangoproject.com/en/5.2/ref/settings/
 """
 
+import os
 from pathlib import Path
 
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
@@ -41,14 +42,17 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'menu.middleware.RequestProfilingMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
+    'menu.middleware.TableCookieMiddleware',
+    'menu.middleware.CartStoreMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
-    'whitenoise.middleware.WhiteNoiseMiddleware',
+    'menu.middleware.WhiteNoiseMiddleware',
 
 ]
 
@@ -78,6 +82,23 @@ WSGI_APPLICATION = 'arabella.wsgi.application'
 # Database
 # https://docs.djangoproject.com/en/5.2/ref/settings/#databases
 
+# SQLite profile (ARABELLA_DB_PROFILE):
+# - "production" (default): WAL + busy_timeout + mmap/cache pragmas on every new
+#   connection, BEGIN IMMEDIATE for atomic blocks (no read→write lock upgrade
+#   deadlocks between gunicorn workers) and persistent connections.
+# - "plain": Django defaults (rollback journal, connection per request).
+DB_PROFILE = os.environ.get("ARABELLA_DB_PROFILE", "production")
+
+SQLITE_PRAGMAS = {
+    "journal_mode": "WAL",
+    "synchronous": "NORMAL",   # آمن مع WAL (ممكن نخسر آخر commit إذا طفى الجهاز، مو الـ DB)
+    "busy_timeout": 5000,      # ms
+    "mmap_size": 134217728,    # 128 MB
+    "cache_size": -32000,      # ~32 MB (القيم السالبة بالـ KiB)
+    "temp_store": "MEMORY",
+    "foreign_keys": "ON",
+}
+
 DATABASES = {
     'default': {
         'ENGINE': 'django.db.backends.sqlite3',
@@ -85,6 +106,27 @@ DATABASES = {
     }
 }
 
+# Per-profile overrides for DATABASES["default"] (also used by bench_checkout).
+# The lock wait is busy_timeout above; the driver's "timeout" option would be
+# overridden by the pragma, so it is not set here.
+SQLITE_PROFILES = {
+    "plain": {},
+    "production": {
+        "CONN_MAX_AGE": 600,
+        "CONN_HEALTH_CHECKS": True,
+        "OPTIONS": {
+            "transaction_mode": "IMMEDIATE",
+            "init_command": "; ".join(f"PRAGMA {k}={v}" for k, v in SQLITE_PRAGMAS.items()),
+        },
+    },
+}
+
+DATABASES["default"].update(SQLITE_PROFILES[DB_PROFILE])
+
+# Retries for write transactions that still hit "database is locked" (menu/db.py)
+DB_WRITE_RETRIES = 3
+DB_WRITE_RETRY_BACKOFF = 0.05  # seconds, doubled per attempt
+
 
 # Password validation
 # https://docs.djangoproject.com/en/5.2/ref/settings/#auth-password-validators
@@ -129,3 +171,87 @@ MEDIA_ROOT = BASE_DIR / "media"
 # https://docs.djangoproject.com/en/5.2/ref/settings/#default-auto-field
 
 DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
+
+
+# Menu images: WebP/JPEG derivatives under MEDIA_ROOT/derivatives (menu/images.py).
+# Generated on save (MENU_IMAGE_EAGER) or by `python manage.py build_images`;
+# templates only look them up.
+MENU_IMAGE_WIDTHS = (320, 640, 960)
+MENU_IMAGE_EAGER = True
+
+# Tests write media (and metrics) into a temporary directory
+TEST_RUNNER = "menu.test_runner.Runner"
+
+# Admin panel live updates (menu/live.py): "poll" (long-poll JSON, works on WSGI)
+# or "sse" (Server-Sent Events, needs the ASGI app)
+ADMIN_LIVE_TRANSPORT = "poll"
+LIVE_POLL_INTERVAL = 2.0
+
+# Async read views (menu/async_views.py) for landing/home/offers/product/offer,
+# order status and the panel long-poll. Only useful under the ASGI app
+# (see arabella/asgi.py); under WSGI each async view runs in its own event loop.
+ASYNC_VIEWS = os.environ.get("ARABELLA_ASYNC_VIEWS", "") == "1"
+
+# Preparation queue (menu/prep.py, panel/prep/): station -> category slugs.
+# Products in other categories go to PREP_DEFAULT_STATION, offers to
+# PREP_OFFER_STATION. The map below is example config: set it to your own
+# category slugs. `manage.py check --database default` (and migrate) warns
+# about slugs that match no category (menu.W001). The screen reloads the whole queue every PREP_FULL_REFRESH
+# seconds and otherwise only fetches items of orders that changed.
+PREP_STATIONS = {
+    "bar": ["hot-drinks", "cold-drinks", "coffee", "juices"],
+    "shisha": ["shisha"],
+}
+PREP_DEFAULT_STATION = "kitchen"
+PREP_OFFER_STATION = "kitchen"
+PREP_FULL_REFRESH = 300
+
+# Per-worker LRU of rendered home page sections (menu/fragments.py), keyed by the
+# catalog snapshot digest, category and search query; bounded by total size in bytes.
+FRAGMENT_CACHE_MAX_BYTES = 8 * 1024 * 1024
+
+# Checkout idempotency token lifetime in seconds (menu/cart.py)
+CHECKOUT_TOKEN_TTL = 120
+
+# Sessions (menu/sessions.py): database backed, with an idle expiry that depends
+# on who owns the session. Visitors (oversized carts, table, submitted order) get
+# SESSION_ANON_AGE, logged-in staff SESSION_STAFF_AGE, both in seconds since the
+# last change. Expired rows are removed by `python manage.py purge_sessions`
+# (cron) or, when SESSION_PURGE_INTERVAL > 0, by a background thread in each
+# web worker, SESSION_PURGE_BATCH rows per transaction.
+SESSION_ENGINE = "menu.sessions"
+SESSION_ANON_AGE = 3 * 60 * 60
+SESSION_STAFF_AGE = 7 * 24 * 60 * 60
+SESSION_PURGE_BATCH = 500
+SESSION_PURGE_INTERVAL = 0
+
+# Where customer carts live (menu/cart.py): "session" (a django_session row) or
+# "cookie" (signed, compressed cookie; cart actions need no database). Carts whose
+# cookie would exceed CART_COOKIE_MAX_BYTES fall back to the session.
+CART_STORE = "cookie"
+CART_COOKIE_NAME = "arabella_cart"
+CART_COOKIE_AGE = 24 * 60 * 60
+CART_COOKIE_MAX_BYTES = 3500
+
+# Table number from the QR code (menu/table.py). Visitors without a session
+# (nothing in the cart yet) keep it in this signed cookie instead of a session row.
+TABLE_COOKIE_NAME = "arabella_table"
+TABLE_COOKIE_AGE = 12 * 60 * 60
+
+# Request profiling (menu/middleware.py): Server-Timing header on every response,
+# JSON slow-request log (logger "menu.slow_requests") above PROFILING_SLOW_MS,
+# and a cProfile dump for the sampled share of slow requests
+PROFILING_ENABLED = True
+PROFILING_SERVER_TIMING = True
+PROFILING_SLOW_MS = 500
+PROFILING_SAMPLE_RATE = 0.01
+PROFILING_TOP_QUERIES = 5
+PROFILING_DUMP_DIR = BASE_DIR / "profiles"
+
+# Prometheus metrics (menu/metrics.py) at panel/metrics/: staff session or
+# "Authorization: Bearer <METRICS_TOKEN>". Workers merge their counters into
+# METRICS_DB from a background thread every METRICS_FLUSH_INTERVAL seconds.
+METRICS_ENABLED = True
+METRICS_TOKEN = os.environ.get("ARABELLA_METRICS_TOKEN", "")
+METRICS_DB = BASE_DIR / "metrics.sqlite3"
+METRICS_FLUSH_INTERVAL = 5.0
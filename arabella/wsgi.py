@@ -14,3 +14,8 @@ from django.core.wsgi import get_wsgi_application
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'arabella.settings')
 
 application = get_wsgi_application()
+
+# تنظيف الـ sessions بالخلفية إذا SESSION_PURGE_INTERVAL > 0 (menu/sessions.py)
+from menu import sessions  # noqa: E402
+
+sessions.start_scheduler()
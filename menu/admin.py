@@ -1,6 +1,31 @@
-from django.contrib import admin
+from django.contrib import admin, messages
+from django.db import IntegrityError
+from django.http import HttpResponse
+from django.shortcuts import redirect
+from django.template.response import TemplateResponse
+from django.urls import path
+from django.utils import timezone
+
+from . import catalog_io, rollups
 from .models import Category, Product, Offer
-from .models import Order, OrderItem
+from .models import Order, OrderItem, TableState
+
+def _export_response(data: dict, fmt: str) -> HttpResponse:
+    content_type = "application/json" if fmt == "json" else "text/csv"
+    resp = HttpResponse(catalog_io.dumps(data, fmt), content_type=f"{content_type}; charset=utf-8")
+    stamp = timezone.localtime().strftime("%Y%m%d-%H%M")
+    resp["Content-Disposition"] = f'attachment; filename="arabella-menu-{stamp}.{fmt}"'
+    return resp
+
+
+def _export_action(kind: str, fmt: str):
+    def action(modeladmin, request, queryset):
+        return _export_response(catalog_io.export_data(**{kind: queryset}), fmt)
+
+    action.__name__ = f"export_{fmt}"
+    action.short_description = f"Export selected ({fmt.upper()})"
+    return action
+
 
 @admin.register(Category)
 class CategoryAdmin(admin.ModelAdmin):
@@ -8,6 +33,7 @@ class CategoryAdmin(admin.ModelAdmin):
     list_editable = ("order", "is_active")
     prepopulated_fields = {"slug": ("name",)}
     search_fields = ("name", "slug")
+    actions = [_export_action("categories", "json"), _export_action("categories", "csv")]
 
 
 @admin.register(Product)
@@ -17,6 +43,55 @@ class ProductAdmin(admin.ModelAdmin):
     list_editable = ("price_syp", "is_active", "is_featured")
     prepopulated_fields = {"slug": ("name",)}
     search_fields = ("name", "slug", "description")
+    actions = [_export_action("products", "json"), _export_action("products", "csv")]
+    change_list_template = "admin/menu/product/change_list.html"
+
+    def get_urls(self):
+        urls = [
+            path("import/", self.admin_site.admin_view(self.import_view), name="menu_catalog_import"),
+            path("export/<str:fmt>/", self.admin_site.admin_view(self.export_view), name="menu_catalog_export"),
+        ]
+        return urls + super().get_urls()
+
+    def export_view(self, request, fmt):
+        if fmt not in ("json", "csv"):
+            fmt = "json"
+        return _export_response(catalog_io.export_data(), fmt)
+
+    def import_view(self, request):
+        """
+        رفع ملف المنيو كامل (نفس منطق import_catalog، بدون مجلد صور:
+        الصور بتنقرا من مسارات موجودة بالـ MEDIA).
+        """
+        if not self.has_add_permission(request) or not self.has_change_permission(request):
+            return redirect("admin:menu_product_changelist")
+
+        errors = []
+        if request.method == "POST" and request.FILES.get("file"):
+            upload = request.FILES["file"]
+            dry_run = bool(request.POST.get("dry_run"))
+            try:
+                data = catalog_io.loads(upload.read().decode("utf-8"), catalog_io.detect_format(upload.name))
+                result = catalog_io.import_data(data, dry_run=dry_run)
+            except (ValueError, UnicodeDecodeError) as e:
+                errors = [f"cannot parse {upload.name}: {e}"]
+            except catalog_io.CatalogImportError as e:
+                errors = e.errors
+            except IntegrityError as e:
+                errors = [str(e)]
+            else:
+                prefix = "[dry-run] " if dry_run else ""
+                self.message_user(request, f"{prefix}{result.summary()}", messages.SUCCESS)
+                if not dry_run:
+                    return redirect("admin:menu_product_changelist")
+
+        context = {
+            **self.admin_site.each_context(request),
+            "opts": self.model._meta,
+            "title": "Import menu",
+            "errors": errors,
+        }
+        return TemplateResponse(request, "admin/menu/catalog_import.html", context)
 
 
 @admin.register(Offer)
@@ -24,6 +99,7 @@ class OfferAdmin(admin.ModelAdmin):
     list_display = ("title", "price_syp", "order", "is_active")
     list_editable = ("order", "is_active", "price_syp")
     search_fields = ("title", "subtitle")
+    actions = [_export_action("offers", "json"), _export_action("offers", "csv")]
 
 class OrderItemInline(admin.TabularInline):
     model = OrderItem
@@ -35,4 +111,29 @@ class OrderAdmin(admin.ModelAdmin):
     list_display = ("id", "table_no", "status", "total_syp", "created_at")
     list_filter = ("status", "created_at")
     search_fields = ("table_no", "id")
-    inlines = [OrderItemInline]
\ No newline at end of file
+    inlines = [OrderItemInline]
+    readonly_fields = ("status_changed_at",)
+
+    def save_model(self, request, obj, form, change):
+        if "status" in form.changed_data:
+            obj.status_changed_at = timezone.now()
+        super().save_model(request, obj, form, change)
+
+    def save_related(self, request, form, formsets, change):
+        # بعد حفظ الأسطر (inlines): الـ rollups بتقرا order.items
+        super().save_related(request, form, formsets, change)
+        if not TableState.sync(form.instance):
+            self.message_user(
+                request,
+                f"الطاولة {form.instance.table_no} عليها طلب مفتوح تاني — سجل الطاولة ما تغيّر",
+                messages.WARNING,
+            )
+        rollups.sync(form.instance)
+
+
+@admin.register(TableState)
+class TableStateAdmin(admin.ModelAdmin):
+    list_display = ("table_no", "order", "status", "updated_at")
+    list_filter = ("status",)
+    search_fields = ("table_no",)
+    readonly_fields = ("updated_at",)
@@ -1,51 +1,347 @@
+import hmac
+import json
+from datetime import timedelta
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
 from django.contrib.admin.views.decorators import staff_member_required
-from django.db.models import Prefetch
+from django.db import transaction
+from django.http import HttpResponse, HttpResponseForbidden, JsonResponse, StreamingHttpResponse
 from django.shortcuts import render, get_object_or_404, redirect
-from django.views.decorators.http import require_POST
+from django.template.loader import render_to_string
 from django.utils import timezone
+from django.utils.http import url_has_allowed_host_and_scheme
+from django.views.decorators.http import require_POST
 
-from .models import Order, OrderItem
+from . import history as history_srv
+from . import live, metrics, prep, rollups
+from .db import atomic_retry
+from .models import Category, Offer, Order, Product, TableState
 
-CLOSED = [Order.Status.DELIVERED, Order.Status.CANCELED]
+CLOSED = Order.CLOSED_STATUSES
 
 @staff_member_required
 def dashboard(request):
-    qs = (
-        Order.objects
-        .exclude(status__in=CLOSED)
-        .prefetch_related("items")
-        .order_by("table_no", "-created_at")
+    # الـ cursor قبل القراءة (متل prep_queue): أي تغيير بالنص بيرجع مع أول تحديث
+    cursor = live.encode_cursor(live.latest_cursor())
+    # ✅ سجل الطاولات فيه طلب مفتوح واحد لكل طاولة → ما في داعي للـ dedupe
+    states = (
+        TableState.objects
+        .filter(order__isnull=False)
+        .select_related("order")
+        .prefetch_related("order__items")
+        .order_by("table_no")
     )
-
-    latest_by_table = {}
-    for o in qs:
-        if o.table_no not in latest_by_table:
-            latest_by_table[o.table_no] = o  # أول واحد هو الأحدث
-
-    orders = list(latest_by_table.values())
+    orders = [s.order for s in states]
 
     return render(request, "admin/admin.html", {
         "orders": orders,
         "open_orders": len(orders),
         "active_tables": len(orders),
         "max_order_id": max([o.id for o in orders], default=0),
+        "cursor": cursor,
+        "live_transport": getattr(settings, "ADMIN_LIVE_TRANSPORT", "poll"),
     })
 
 
+def _feed_payload(request, cursor):
+    """
+    الطلبات اللي تغيّرت بعد cursor + HTML الكرت لكل طاولة مفتوحة.
+    """
+    orders = live.changed_orders(cursor)
+    if not orders:
+        return None
+
+    open_ids = set(
+        TableState.objects
+        .filter(order_id__in=[o.id for o in orders])
+        .values_list("order_id", flat=True)
+    )
+
+    changes = []
+    for o in orders:
+        row = {
+            "id": o.id,
+            "table_no": o.table_no,
+            "status": o.status,
+            "open": o.id in open_ids,
+        }
+        if row["open"]:
+            row["html"] = render_to_string("admin/_table_card.html", {"o": o}, request=request)
+        changes.append(row)
+
+    last = orders[-1]
+    open_count = TableState.objects.filter(order__isnull=False).count()
+    return {
+        "cursor": live.encode_cursor((last.updated_at, last.id)),
+        "orders": changes,
+        "open_orders": open_count,
+        "active_tables": open_count,
+        "max_order_id": max(o.id for o in orders),
+    }
+
+
+@staff_member_required
+def feed(request):
+    """
+    GET panel/feed/?cursor=...&wait=20
+    long-poll: بيرجع فوراً إذا في تغييرات، وإلا بيستنى لحد wait ثانية.
+    """
+    raw = request.GET.get("cursor") or ""
+    cursor = live.decode_cursor(raw)
+    try:
+        wait = float(request.GET.get("wait") or 0)
+    except ValueError:
+        wait = 0
+
+    if wait > 0:
+        live.wait_for_orders(cursor, wait)
+
+    payload = _feed_payload(request, cursor)
+    if payload is None:
+        return JsonResponse({"cursor": raw, "orders": []})
+    return JsonResponse(payload)
+
+
+@staff_member_required
+async def feed_stream(request):
+    """
+    Server-Sent Events (مع ASGI): event "orders" عند كل تغيير + ping كل 15 ثانية.
+    """
+    cursor = live.decode_cursor(request.GET.get("cursor") or "")
+    build = sync_to_async(_feed_payload)
+
+    async def events():
+        nonlocal cursor
+        idle = 0.0
+        while True:
+            seq = live.current_seq()
+            if await live.ahas_changes(cursor):
+                payload = await build(request, cursor)
+                if payload:
+                    cursor = live.decode_cursor(payload["cursor"])
+                    idle = 0.0
+                    yield f"event: orders\ndata: {json.dumps(payload)}\n\n"
+                    continue
+            interval = live.poll_interval()
+            await live.await_change(seq, interval)
+            idle += interval
+            if idle >= 15:
+                idle = 0.0
+                yield ": ping\n\n"
+
+    response = StreamingHttpResponse(events(), content_type="text/event-stream")
+    response["Cache-Control"] = "no-cache"
+    response["X-Accel-Buffering"] = "no"
+    return response
+
+
 @staff_member_required
 @require_POST
 def set_status(request, order_id: int):
-    order = get_object_or_404(Order, id=order_id)
-    status = request.POST.get("status") or order.status
-    order.status = status
-    order.save(update_fields=["status"])
-    return redirect("admin_dashboard")
+    _change_status(order_id, request.POST.get("status"))
+    return _redirect_back(request)
 
 
 @staff_member_required
 @require_POST
 def done(request, order_id: int):
-    order = get_object_or_404(Order, id=order_id)
-    order.status = Order.Status.DELIVERED
-    order.save(update_fields=["status"])
+    _change_status(order_id, Order.Status.DELIVERED)
+    return _redirect_back(request)
+
+
+def _redirect_back(request):
+    # ?next= من صفحة التفاصيل، وإلا اللوحة
+    target = request.POST.get("next") or ""
+    if target and url_has_allowed_host_and_scheme(target, allowed_hosts={request.get_host()}):
+        return redirect(target)
     return redirect("admin_dashboard")
+
+
+@atomic_retry
+def _change_status(order_id: int, status) -> Order:
+    order = get_object_or_404(Order, id=order_id)
+    if status not in Order.Status.values:
+        status = order.status
+    if order.is_closed and status not in CLOSED and TableState.busy_with_other(order):
+        # الطاولة إلها طلب مفتوح تاني → ما منفتح القديم فوقه
+        status = order.status
+    previous, since = order.status, order.status_since
+    order.status = status
+    if status != previous:
+        order.status_changed_at = timezone.now()
+    order.save(update_fields=["status", "status_changed_at", "updated_at"])
+    TableState.sync(order)
+    rollups.sync(order)
+    if status == Order.Status.READY:
+        prep.mark_order_prepared(order.id)
+    if status != previous and since is not None:
+        # الوقت اللي قضاه الطلب بالحالة السابقة
+        transaction.on_commit(lambda: metrics.observe(
+            "arabella_order_status_duration_seconds",
+            (order.status_changed_at - since).total_seconds(),
+            status_from=previous,
+            status_to=status,
+        ))
+    return order
+
+
+@staff_member_required
+def history(request):
+    """
+    سجل الطلبات (المغلقة افتراضياً) بصفحات keyset: ?cursor= بدل ?page=.
+    """
+    f = history_srv.parse_filter(request.GET)
+    orders, next_cursor = history_srv.page(f, history_srv.parse_cursor(request.GET.get("cursor", "")))
+    return render(request, "admin-history.html", {
+        "orders": orders,
+        "filter": f,
+        "statuses": Order.Status.choices,
+        "is_first_page": not request.GET.get("cursor"),
+        "first_qs": f.querystring(),
+        "next_qs": f.querystring(cursor=next_cursor) if next_cursor else "",
+    })
+
+
+@staff_member_required
+def order_details(request, order_id: int):
+    order = get_object_or_404(Order.objects.prefetch_related("items"), id=order_id)
+    return render(request, "admin-order-details.html", {
+        "order": order,
+        "statuses": Order.Status.choices,
+    })
+
+
+@staff_member_required
+def items(request):
+    tab = request.GET.get("tab") or "products"
+    ctx = {"tab": tab}
+    if tab == "offers":
+        ctx["offers"] = Offer.objects.all()
+    elif tab == "categories":
+        ctx["categories"] = Category.objects.all()
+    else:
+        ctx["tab"] = "products"
+        ctx["products"] = Product.objects.select_related("category").order_by("category__order", "category__name", "name")
+    return render(request, "admin-items.html", ctx)
+
+
+REPORT_RANGES = {"today": 0, "7d": 6, "30d": 29, "90d": 89}
+
+
+@staff_member_required
+def reports(request):
+    """
+    أكثر الأصناف مبيعاً والإيرادات من جداول المبيعات اليومية (menu/rollups.py).
+    """
+    today = timezone.localdate()
+    rng = request.GET.get("range") or "7d"
+    if rng not in REPORT_RANGES:
+        rng = "7d"
+    since = today - timedelta(days=REPORT_RANGES[rng])
+    return render(request, "admin-reports.html", {
+        "range": rng,
+        "report": rollups.report(since, today),
+    })
+
+
+def _prep_station(request) -> str:
+    station = (request.GET.get("station") or request.POST.get("station") or "").strip()
+    return station if station in prep.stations() else ""
+
+
+def _full_refresh() -> int:
+    return int(getattr(settings, "PREP_FULL_REFRESH", 300))
+
+
+@staff_member_required
+def prep_queue(request):
+    """
+    شاشة المطبخ/البار: الأصناف الناقصة مجمّعة (?station=bar).
+    """
+    station = _prep_station(request)
+    # الـ cursor قبل الحساب: أي تغيير بالنص بيرجع مع أول تحديث
+    cursor = live.encode_cursor(live.latest_cursor())
+    rows = prep.queue(station)
+    return render(request, "admin-prep.html", {
+        "rows": rows,
+        "station": station,
+        "stations": prep.stations(),
+        "cursor": cursor,
+        "pending_total": sum(r.pending for r in rows),
+        "full_refresh": _full_refresh(),
+    })
+
+
+def _prep_row_json(row) -> dict:
+    return {**row.as_dict(), "html": render_to_string("admin/_prep_row.html", {"r": row})}
+
+
+def _prep_feed_payload(station: str, raw: str, full: bool) -> dict:
+    if full:
+        cursor = live.encode_cursor(live.latest_cursor())
+        rows, gone = prep.queue(station), []
+    else:
+        rows, gone, cursor = prep.changes(live.decode_cursor(raw), station)
+    return {"cursor": cursor or raw, "full": full, "rows": [_prep_row_json(r) for r in rows], "gone": gone}
+
+
+@staff_member_required
+def prep_feed(request):
+    """
+    GET panel/prep/feed/?cursor=...&station=bar&wait=20
+    بس الأصناف اللي تغيّرت (قيم كاملة، مو فروقات)؛ ?full=1 → الطابور كامل.
+    """
+    raw = request.GET.get("cursor") or ""
+    try:
+        wait = float(request.GET.get("wait") or 0)
+    except ValueError:
+        wait = 0
+    full = request.GET.get("full") == "1"
+    if wait > 0 and not full:
+        live.wait_for_orders(live.decode_cursor(raw), wait)
+    return JsonResponse(_prep_feed_payload(_prep_station(request), raw, full))
+
+
+@staff_member_required
+@require_POST
+@atomic_retry
+def prep_prepare(request):
+    """
+    POST key=product:12 [note=...] [qty=1] → تم تحضير qty قطعة (من أقدم طلب).
+    بدون qty → كل الناقص من هالصنف.
+    """
+    key = (request.POST.get("key") or "").strip()
+    note = request.POST.get("note")
+    try:
+        qty = int(request.POST["qty"]) if request.POST.get("qty") else None
+    except ValueError:
+        qty = None
+    if qty is not None and qty <= 0:
+        return JsonResponse({"error": "qty must be positive"}, status=400)
+
+    marked, suggested = prep.prepare(key, note, qty)
+    for order_id, status in suggested.items():
+        _change_status(order_id, status)
+
+    row = prep.row_for(key, _prep_station(request))
+    return JsonResponse({
+        "key": key,
+        "marked": marked,
+        "row": _prep_row_json(row) if row else None,
+        "orders": {str(k): v for k, v in suggested.items()},
+    })
+
+
+def metrics_view(request):
+    """
+    Prometheus scrape: موظف مسجّل دخول، أو Authorization: Bearer <METRICS_TOKEN>.
+    """
+    token = getattr(settings, "METRICS_TOKEN", "")
+    auth = request.headers.get("Authorization", "")
+    allowed = (request.user.is_active and request.user.is_staff) or (
+        token and hmac.compare_digest(auth, f"Bearer {token}")
+    )
+    if not allowed:
+        return HttpResponseForbidden()
+    return HttpResponse(metrics.render(), content_type="text/plain; version=0.0.4; charset=utf-8")
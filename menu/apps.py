@@ -4,3 +4,12 @@ from django.apps import AppConfig
 class MenuConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'menu'
+
+    def ready(self):
+        from django.core import checks
+        from . import catalog, search, images, live, prep
+        checks.register(prep.check_stations, checks.Tags.database)
+        catalog.connect_signals()
+        search.connect_signals()
+        images.connect_signals()
+        live.connect_signals()
@@ -0,0 +1,232 @@
+# menu/async_views.py
+"""
+نسخ async من صفحات القراءة (landing / home / offers / product / offer / order status)
+ومن الـ long-poll تبع لوحة الطلبات وطابور التحضير. بتنفعّل بـ ASYNC_VIEWS = True مع تشغيل ASGI
+(شوف arabella/asgi.py).
+
+الفكرة: طلب عم يستنى (long-poll على حالة الطلب، أو زبون على نت بطيء) ما لازم
+يحجز worker كامل. هون الانتظار بـ asyncio.sleep، والـ session والـ ORM بالنسخ
+الـ async (aget / aset / afirst / aget ...). الشغل الـ sync الوحيد الباقي
+(إعادة بناء الـ catalog، البحث، حساب ملخص سلة قديم) بيروح على thread بـ sync_to_async.
+
+نفس المنطق والـ templates تبع views.py؛ الـ views اللي بتكتب (سلة / checkout)
+بتضل sync.
+"""
+import functools
+import time
+
+from asgiref.sync import sync_to_async
+from django.contrib.admin.views.decorators import staff_member_required
+from django.http import Http404, JsonResponse
+from django.shortcuts import render
+from django.utils.cache import get_conditional_response
+
+from . import admin_views
+from . import cart as cart_srv
+from . import catalog as catalog_srv
+from . import fragments
+from . import live
+from . import table as table_srv
+from .models import Order, TableState
+from .views import (
+    ORDER_STATUS_MAX_WAIT,
+    _home_response,
+    _home_sections,
+    _menu_etag,
+    _menu_headers,
+    _order_status_etag,
+    _order_status_headers,
+    _order_status_items,
+)
+
+
+async def capture_table_from_qr(request):
+    await table_srv.acapture_from_qr(request)
+
+
+async def ensure_cart_not_cleared_if_open(request):
+    """
+    متل views.ensure_cart_not_cleared_if_open. كمان بتحمّل الـ session (async)
+    فكل قراءة بعدها من request.session ما بتلمس الـ DB.
+    """
+    if not await request.session.aget("has_submitted_order"):
+        return
+
+    table_no = (await request.session.aget("table_no") or "").strip()
+    if not table_no:
+        return
+
+    open_id = await (
+        TableState.objects
+        .filter(pk=table_no, order__isnull=False)
+        .values_list("order_id", flat=True)
+        .afirst()
+    )
+    if open_id is None:
+        cart_srv.clear(cart_srv.store_for(request))
+        request.session.pop("has_submitted_order", None)
+
+
+def conditional_menu_page(view):
+    """
+    متل views.conditional_menu_page (304 قبل أي شغل على المنيو).
+    """
+    @functools.wraps(view)
+    async def wrapper(request, *args, **kwargs):
+        await capture_table_from_qr(request)
+        await ensure_cart_not_cleared_if_open(request)  # بتحمّل الـ session قبل البصمة
+        menu = await catalog_srv.aget_catalog()
+        etag = _menu_etag(request, menu, view.__name__, *args, *sorted(kwargs.items()))
+        response = get_conditional_response(request, etag=etag)
+        if response is None:
+            response = await view(request, *args, **kwargs)
+        return _menu_headers(response, etag)
+    return wrapper
+
+
+async def landing(request):
+    await capture_table_from_qr(request)
+    await ensure_cart_not_cleared_if_open(request)
+    return render(request, "index.html")
+
+
+@conditional_menu_page
+async def home(request):
+    q = (request.GET.get("q") or "").strip()
+    selected_cat = (request.GET.get("cat") or "all").strip()
+
+    # كاش الأقسام بالذاكرة → ما في thread إلا إذا لازم render
+    menu = await catalog_srv.aget_catalog()
+    parts = fragments.home_sections.get((menu.digest, selected_cat, q))
+    if parts is None:
+        parts = await sync_to_async(_home_sections)(menu, selected_cat, q, lookup=False)
+    cart_count, cart_total = await cart_srv.asummary(cart_srv.store_for(request))
+    return _home_response(parts, cart_count, cart_total)
+
+
+@conditional_menu_page
+async def product_details(request, slug: str):
+    cart_count, cart_total = await cart_srv.asummary(cart_srv.store_for(request))
+    product = (await catalog_srv.aget_catalog()).product_by_slug.get(slug)
+    if product is None:
+        raise Http404("No Product matches the given query.")
+    return render(request, "product.html", {
+        "product": product,
+        "cart_count": cart_count,
+        "cart_total": cart_total,
+    })
+
+
+@conditional_menu_page
+async def offers(request):
+    cart_count, cart_total = await cart_srv.asummary(cart_srv.store_for(request))
+    menu = await catalog_srv.aget_catalog()
+    return render(request, "offers.html", {
+        "offers": menu.offers,
+        "cart_count": cart_count,
+        "cart_total": cart_total,
+    })
+
+
+@conditional_menu_page
+async def offer_customize(request, slug: str):
+    cart_count, cart_total = await cart_srv.asummary(cart_srv.store_for(request))
+    offer = (await catalog_srv.aget_catalog()).offer_by_slug.get(slug)
+    if offer is None:
+        raise Http404("No Offer matches the given query.")
+    return render(request, "offer-customize.html", {
+        "offer": offer,
+        "cart_count": cart_count,
+        "cart_total": cart_total,
+    })
+
+
+async def _order_status_validators(order_id: int):
+    row = await Order.objects.filter(id=order_id).values_list("updated_at", "status").afirst()
+    if row is None:
+        raise Http404("No Order matches the given query.")
+    updated_at, status = row
+    items = [it async for it in _order_status_items(order_id)]
+    return _order_status_etag(order_id, updated_at, status, items), updated_at
+
+
+async def order_status(request, order_id: int):
+    """
+    متل views.order_status، بس الانتظار (?wait=N) ما بيحجز thread.
+    """
+    etag, updated_at = await _order_status_validators(order_id)
+
+    try:
+        wait = min(float(request.GET.get("wait") or 0), ORDER_STATUS_MAX_WAIT)
+    except ValueError:
+        wait = 0
+    client_etag = request.headers.get("If-None-Match")
+    if wait > 0 and client_etag == etag:
+        deadline = time.monotonic() + wait
+        while etag == client_etag:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            await live.await_change(live.current_seq(), min(live.poll_interval(), remaining))
+            etag, updated_at = await _order_status_validators(order_id)
+
+    last_modified = int(updated_at.timestamp())
+    response = get_conditional_response(request, etag=etag, last_modified=last_modified)
+    if response is None:
+        try:
+            order = await Order.objects.aget(id=order_id)
+        except Order.DoesNotExist:
+            raise Http404("No Order matches the given query.")
+        response = render(request, "order-status.html", {"order": order, "etag": etag})
+    return _order_status_headers(response, etag, last_modified)
+
+
+async def _await_orders(cursor, wait: float) -> None:
+    deadline = time.monotonic() + min(wait, live.MAX_WAIT)
+    while True:
+        seq = live.current_seq()
+        if await live.ahas_changes(cursor):
+            return
+        remaining = deadline - time.monotonic()
+        if remaining <= 0:
+            return
+        await live.await_change(seq, min(live.poll_interval(), remaining))
+
+
+@staff_member_required
+async def feed(request):
+    """
+    متل admin_views.feed (long-poll تبع لوحة الطلبات).
+    """
+    raw = request.GET.get("cursor") or ""
+    cursor = live.decode_cursor(raw)
+    try:
+        wait = float(request.GET.get("wait") or 0)
+    except ValueError:
+        wait = 0
+
+    if wait > 0:
+        await _await_orders(cursor, wait)
+
+    payload = await sync_to_async(admin_views._feed_payload)(request, cursor)
+    if payload is None:
+        return JsonResponse({"cursor": raw, "orders": []})
+    return JsonResponse(payload)
+
+
+@staff_member_required
+async def prep_feed(request):
+    """
+    متل admin_views.prep_feed (طابور المطبخ/البار).
+    """
+    raw = request.GET.get("cursor") or ""
+    try:
+        wait = float(request.GET.get("wait") or 0)
+    except ValueError:
+        wait = 0
+    full = request.GET.get("full") == "1"
+    if wait > 0 and not full:
+        await _await_orders(live.decode_cursor(raw), wait)
+    station = admin_views._prep_station(request)
+    payload = await sync_to_async(admin_views._prep_feed_payload)(station, raw, full)
+    return JsonResponse(payload)
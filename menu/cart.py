@@ -1,9 +1,37 @@
 # menu/cart.py
+import abc
+import hashlib
+import json
+import secrets
+import time
 from dataclasses import dataclass
-from typing import Dict, Iterable, Tuple
-from .models import Product, Offer
+from typing import Dict, Iterable, Optional, Tuple
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core import signing
+from django.core.exceptions import ImproperlyConfigured
+
+from . import catalog as catalog_srv, metrics
 
 SESSION_KEY = "cart_items"
+# ملخص السلة (العدد + الإجمالي) محسوب على snapshot منيو معيّن (Catalog.digest؛
+# مو رقم النسخة لأنه مع LocMemCache ما بيتحرك بكل الـ workers)
+# {"count": 3, "total": 45000, "menu": "3f2a..."}
+SUMMARY_KEY = "cart_summary"
+# توكن تأكيد الطلب (idempotency) — {"token": "...", "issued": ts, "digest": "...", "order_id": 5}
+CHECKOUT_TOKEN_KEY = "checkout_token"
+DEFAULT_CHECKOUT_TOKEN_TTL = 120  # ثواني
+
+# مكان حفظ السلة (CART_STORE): "session" أو "cookie"
+STORE_KEYS = (SESSION_KEY, SUMMARY_KEY, CHECKOUT_TOKEN_KEY)
+DEFAULT_STORE = "session"
+DEFAULT_COOKIE_NAME = "arabella_cart"
+DEFAULT_COOKIE_AGE = 24 * 60 * 60  # ثواني
+# حد الكوكي بالمتصفحات ~4096 بايت مع الاسم والخصائص
+DEFAULT_COOKIE_MAX_BYTES = 3500
+_COOKIE_SALT = "menu.cart"
+
 
 @dataclass
 class CartLine:
@@ -20,13 +48,226 @@ class CartLine:
         return int(self.unit_price) * int(self.qty)
 
 
+# -----------------------------
+# التخزين
+# -----------------------------
+class CartStore(abc.ABC):
+    """
+    مكان حفظ السلة. كل دوال هالملف بتاخد store (أو session مباشرة، نفس الواجهة):
+    get / store[key] = value / pop / modified.
+    """
+    modified: bool
+
+    @abc.abstractmethod
+    def get(self, key, default=None):
+        ...
+
+    @abc.abstractmethod
+    def __setitem__(self, key, value):
+        ...
+
+    @abc.abstractmethod
+    def pop(self, key, default=None):
+        ...
+
+    def save(self, request, response) -> None:
+        """
+        بعد الـ view (CartStoreMiddleware).
+        """
+
+
+class SessionCartStore(CartStore):
+    """
+    السلة جوّا الـ session (row بـ django_session مع الـ DB backend).
+    الحفظ على SessionMiddleware.
+    """
+
+    def __init__(self, session):
+        self.session = session
+
+    def get(self, key, default=None):
+        return self.session.get(key, default)
+
+    def __setitem__(self, key, value):
+        self.session[key] = value
+
+    def pop(self, key, default=None):
+        return self.session.pop(key, default)
+
+    @property
+    def modified(self) -> bool:
+        return self.session.modified
+
+    @modified.setter
+    def modified(self, value: bool) -> None:
+        self.session.modified = value
+
+
+def _encode(data: dict) -> str:
+    """
+    ترميز مختصر قبل التوقيع والضغط:
+    {"c": [["p:12", 2], ["o:3", 1, "ملاحظة"]], "s": [count, total, menu], "t": {...}}
+    """
+    compact = {}
+    items = data.get(SESSION_KEY) or {}
+    if items:
+        compact["c"] = [
+            [key, int(row.get("qty", 0))] + ([row["note"]] if row.get("note") else [])
+            for key, row in items.items()
+        ]
+    summary_ = data.get(SUMMARY_KEY)
+    if isinstance(summary_, dict):
+        compact["s"] = [summary_.get("count", 0), summary_.get("total", 0), summary_.get("menu")]
+    token = data.get(CHECKOUT_TOKEN_KEY)
+    if isinstance(token, dict):
+        compact["t"] = token
+    if not compact:
+        return ""
+    return signing.dumps(compact, salt=_COOKIE_SALT, compress=True)
+
+
+def _decode(raw: str) -> Optional[dict]:
+    try:
+        compact = signing.loads(raw, salt=_COOKIE_SALT, max_age=cart_cookie_age())
+    except signing.BadSignature:
+        return None
+    data = {}
+    if compact.get("c"):
+        data[SESSION_KEY] = {
+            row[0]: {"qty": int(row[1]), "note": row[2] if len(row) > 2 else ""} for row in compact["c"]
+        }
+    if compact.get("s"):
+        count, total, menu = compact["s"]
+        data[SUMMARY_KEY] = {"count": count, "total": total, "menu": menu}
+    if compact.get("t"):
+        data[CHECKOUT_TOKEN_KEY] = compact["t"]
+    return data
+
+
+def cart_cookie_name() -> str:
+    return getattr(settings, "CART_COOKIE_NAME", DEFAULT_COOKIE_NAME)
+
+
+def cart_cookie_age() -> int:
+    return int(getattr(settings, "CART_COOKIE_AGE", DEFAULT_COOKIE_AGE))
+
+
+def cart_cookie_max_bytes() -> int:
+    return int(getattr(settings, "CART_COOKIE_MAX_BYTES", DEFAULT_COOKIE_MAX_BYTES))
+
+
+class CookieCartStore(CartStore):
+    """
+    السلة بكوكي موقّعة ومضغوطة → إضافة/تعديل/قراءة السلة بدون DB.
+
+    إذا الكوكي بتطلع أكبر من CART_COOKIE_MAX_BYTES (سلة كبيرة / ملاحظات طويلة)
+    السلة بتنحفظ بالـ session بدلها والكوكي بتنمسح، وبترجع للكوكي لما تصغر.
+    """
+
+    def __init__(self, request):
+        self.request = request
+        self.modified = False
+        self.in_session = False
+        self._data: Optional[dict] = None
+
+    def _load(self) -> dict:
+        if self._data is None:
+            raw = self.request.COOKIES.get(cart_cookie_name())
+            data = _decode(raw) if raw else None
+            if data is None:
+                # ما في كوكي: يا سلة فاضية، يا سلة كبيرة محفوظة بالـ session
+                # (بدون كوكي session ما في استعلام)
+                session = self.request.session
+                data = {key: session[key] for key in STORE_KEYS if key in session}
+                self.in_session = bool(data)
+            self._data = data
+        return self._data
+
+    def get(self, key, default=None):
+        return self._load().get(key, default)
+
+    def __setitem__(self, key, value):
+        self._load()[key] = value
+        self.modified = True
+
+    def pop(self, key, default=None):
+        data = self._load()
+        if key not in data:
+            return default
+        self.modified = True
+        return data.pop(key)
+
+    def save(self, request, response) -> None:
+        if not self.modified:
+            return
+        name = cart_cookie_name()
+        value = _encode(self._data)
+        session = request.session
+
+        if len(value) > cart_cookie_max_bytes():
+            for key in STORE_KEYS:
+                if key in self._data:
+                    session[key] = self._data[key]
+                else:
+                    session.pop(key, None)
+            metrics.inc("arabella_cart_cookie_fallback_total")
+            if name in request.COOKIES:
+                response.delete_cookie(name, samesite="Lax")
+            return
+
+        if self.in_session:
+            for key in STORE_KEYS:
+                session.pop(key, None)
+        if value:
+            response.set_cookie(
+                name, value, max_age=cart_cookie_age(),
+                secure=settings.SESSION_COOKIE_SECURE, httponly=True, samesite="Lax",
+            )
+        elif name in request.COOKIES:
+            response.delete_cookie(name, samesite="Lax")
+
+
+STORES = {
+    "session": lambda request: SessionCartStore(request.session),
+    "cookie": CookieCartStore,
+}
+
+
+def store_for(request) -> CartStore:
+    """
+    الـ store تبع الطلب (واحد لكل request، حسب CART_STORE).
+    """
+    store = getattr(request, "_cart_store", None)
+    if store is None:
+        name = getattr(settings, "CART_STORE", DEFAULT_STORE)
+        if name not in STORES:
+            raise ImproperlyConfigured(f"CART_STORE must be one of {', '.join(STORES)}, not {name!r}")
+        store = request._cart_store = STORES[name](request)
+    return store
+
+
+def save_store(request, response) -> None:
+    store = getattr(request, "_cart_store", None)
+    if store is not None:
+        store.save(request, response)
+
+
+# -----------------------------
+# السلة
+# -----------------------------
 def _get_raw_cart(session) -> Dict[str, dict]:
     """
     {
       "p:12": {"qty": 2, "note": ""},
       "o:3":  {"qty": 1, "note": "مشروب: ... | أركيلة: ..."}
     }
+    للقراءة بس: ما منكتب سلة فاضية بالـ session (كانت بتعمل UPDATE مع كل صفحة).
     """
+    cart = session.get(SESSION_KEY)
+    return cart if isinstance(cart, dict) else {}
+
+
+def _cart_for_write(session) -> Dict[str, dict]:
     cart = session.get(SESSION_KEY)
     if not isinstance(cart, dict):
         cart = {}
@@ -34,26 +275,64 @@ def _get_raw_cart(session) -> Dict[str, dict]:
     return cart
 
 
-def add_product(session, product_id: int, qty: int = 1, note: str = "") -> None:
-    cart = _get_raw_cart(session)
-    key = f"p:{int(product_id)}"
+def _unit_price(key: str) -> Optional[int]:
+    """
+    سعر الوحدة من الـ catalog (None إذا المنتج/العرض مو متاح).
+    """
+    menu = catalog_srv.get_catalog()
+    try:
+        kind, raw_id = key.split(":", 1)
+        obj_id = int(raw_id)
+    except ValueError:
+        return None
+    if kind == "p":
+        obj = menu.product_by_id.get(obj_id)
+    elif kind == "o":
+        obj = menu.offer_by_id.get(obj_id)
+    else:
+        obj = None
+    return int(obj.price_syp) if obj is not None else None
+
+
+def _adjust_summary(session, key: str, qty_delta: int) -> None:
+    """
+    تحديث تدريجي للملخص بعد أي تعديل على السلة.
+    إذا الملخص ناقص أو قديم (snapshot منيو مختلف) منحسبه كامل هون، حتى
+    الصفحة الجاية تقرأه بدون ما تكتب بالـ session.
+    """
+    summary = session.get(SUMMARY_KEY)
+    if not isinstance(summary, dict):
+        # منحسبه هلق (الـ session عم تنكتب أصلاً) بدل أول صفحة بعدها
+        _store_summary(session)
+        return
+    if not qty_delta:
+        return
+    price = _unit_price(key)
+    if summary.get("menu") != catalog_srv.get_catalog().digest or price is None:
+        _store_summary(session)
+        return
+    summary["count"] = int(summary.get("count", 0)) + int(qty_delta)
+    summary["total"] = int(summary.get("total", 0)) + int(qty_delta) * price
+    session[SUMMARY_KEY] = summary
+
+
+def _add(session, key: str, qty: int, note: str) -> None:
+    cart = _cart_for_write(session)
     row = cart.get(key) or {"qty": 0, "note": ""}
     row["qty"] = int(row.get("qty", 0)) + int(qty)
     if note:
         row["note"] = note
     cart[key] = row
+    _adjust_summary(session, key, int(qty))
     session.modified = True
 
 
+def add_product(session, product_id: int, qty: int = 1, note: str = "") -> None:
+    _add(session, f"p:{int(product_id)}", qty, note)
+
+
 def add_offer(session, offer_id: int, qty: int = 1, note: str = "") -> None:
-    cart = _get_raw_cart(session)
-    key = f"o:{int(offer_id)}"
-    row = cart.get(key) or {"qty": 0, "note": ""}
-    row["qty"] = int(row.get("qty", 0)) + int(qty)
-    if note:
-        row["note"] = note
-    cart[key] = row
-    session.modified = True
+    _add(session, f"o:{int(offer_id)}", qty, note)
 
 
 def get_qty(session, key: str) -> int:
@@ -63,30 +342,138 @@ def get_qty(session, key: str) -> int:
 
 
 def set_qty_key(session, key: str, qty: int) -> None:
-    cart = _get_raw_cart(session)
-    qty = int(qty)
-    if qty <= 0:
+    qty = max(int(qty), 0)
+    old_qty = get_qty(session, key)
+    if qty == old_qty:
+        return
+    cart = _cart_for_write(session)
+    if qty == 0:
         cart.pop(key, None)
     else:
         row = cart.get(key) or {"qty": 0, "note": ""}
         row["qty"] = qty
         cart[key] = row
+    _adjust_summary(session, key, qty - old_qty)
     session.modified = True
 
 
 def remove_key(session, key: str) -> None:
-    cart = _get_raw_cart(session)
-    cart.pop(key, None)
+    if key not in _get_raw_cart(session):
+        return
+    row = _cart_for_write(session).pop(key)
+    _adjust_summary(session, key, -int(row.get("qty", 0)))
     session.modified = True
 
 
 def clear(session) -> None:
+    # pop بيعلّم الـ session متغيّرة بس إذا المفتاح كان موجود
     session.pop(SESSION_KEY, None)
-    session.pop("has_submitted_order", None)
-    session.modified = True
+    session.pop(SUMMARY_KEY, None)
+
+
+def checkout_token_ttl() -> int:
+    return int(getattr(settings, "CHECKOUT_TOKEN_TTL", DEFAULT_CHECKOUT_TOKEN_TTL))
+
+
+def checkout_token(session) -> str:
+    """
+    توكن لفورم تأكيد الطلب. نفس التوكن بيضل طول مدة الـ TTL
+    (حتى ما نكتب بالـ session مع كل فتحة للسلة).
+    """
+    row = session.get(CHECKOUT_TOKEN_KEY)
+    if isinstance(row, dict) and time.time() - float(row.get("issued", 0)) < checkout_token_ttl():
+        return row["token"]
+    token = secrets.token_urlsafe(16)
+    session[CHECKOUT_TOKEN_KEY] = {"token": token, "issued": time.time()}
+    return token
+
+
+def digest(session) -> str:
+    """
+    بصمة محتوى السلة (للـ ETag تبع صفحات المنيو). سلة فاضية → "".
+    """
+    cart = _get_raw_cart(session)
+    if not cart:
+        return ""
+    return hashlib.sha1(json.dumps(cart, sort_keys=True, ensure_ascii=False).encode()).hexdigest()[:16]
+
+
+def checkout_digest(session, table_no: str, note: str) -> str:
+    """
+    بصمة محتوى السلة + الطاولة + الملاحظة (لمعرفة إذا الإرسال مكرر).
+    """
+    raw = {
+        "cart": _get_raw_cart(session),
+        "table_no": table_no,
+        "note": note,
+    }
+    return hashlib.sha1(json.dumps(raw, sort_keys=True, ensure_ascii=False).encode()).hexdigest()
+
+
+def submitted_order_id(session, token: str, digest: str) -> Optional[int]:
+    """
+    إذا نفس التوكن انبعت قبل مع نفس المحتوى (وضمن الـ TTL) → رقم الطلب.
+    """
+    row = session.get(CHECKOUT_TOKEN_KEY)
+    if not token or not isinstance(row, dict) or row.get("token") != token:
+        return None
+    if row.get("digest") != digest or time.time() - float(row.get("issued", 0)) >= checkout_token_ttl():
+        return None
+    return row.get("order_id")
+
+
+def remember_submission(session, token: str, digest: str, order_id: int) -> None:
+    session[CHECKOUT_TOKEN_KEY] = {
+        "token": token,
+        "issued": time.time(),
+        "digest": digest,
+        "order_id": int(order_id),
+    }
+
+
+def summary(session) -> Tuple[int, int]:
+    """
+    (عدد القطع، الإجمالي) للشارة بأعلى الصفحات.
+    بيرجع من الـ session مباشرة؛ وبينحسب من جديد بس إذا snapshot المنيو
+    تغيّر (سعر/توفّر) أو ما كان في ملخص.
+    """
+    cached = session.get(SUMMARY_KEY)
+    if isinstance(cached, dict) and cached.get("menu") == catalog_srv.get_catalog().digest:
+        metrics.cache_lookup("cart_summary", True)
+        return int(cached.get("count", 0)), int(cached.get("total", 0))
+
+    metrics.cache_lookup("cart_summary", False)
+    return _store_summary(session)
+
+
+def _store_summary(session) -> Tuple[int, int]:
+    """
+    حساب كامل. بينحفظ بالـ session بس إذا السلة مو فاضية
+    (زائر ما أضاف شي ما لازم ينكتبله session أبداً).
+    """
+    menu = catalog_srv.get_catalog()
+    lines, total = get_lines(session, menu)
+    count = sum(int(ln.qty) for ln in lines)
+    if count:
+        session[SUMMARY_KEY] = {"count": count, "total": int(total), "menu": menu.digest}
+    else:
+        session.pop(SUMMARY_KEY, None)
+    return count, int(total)
+
+
+async def asummary(session) -> Tuple[int, int]:
+    """
+    نفس summary للـ views الـ async (الـ session لازم تكون محمّلة قبل).
+    الحساب من جديد ممكن يبني الـ catalog، فبيروح على thread.
+    """
+    cached = session.get(SUMMARY_KEY)
+    if isinstance(cached, dict) and cached.get("menu") == (await catalog_srv.aget_catalog()).digest:
+        metrics.cache_lookup("cart_summary", True)
+        return int(cached.get("count", 0)), int(cached.get("total", 0))
+    return await sync_to_async(summary)(session)
 
 
-def get_lines(session) -> Tuple[Iterable[CartLine], int]:
+def get_lines(session, menu=None) -> Tuple[Iterable[CartLine], int]:
     cart = _get_raw_cart(session)
     if not cart:
         return [], 0
@@ -100,8 +487,9 @@ def get_lines(session) -> Tuple[Iterable[CartLine], int]:
         elif k.startswith("o:"):
             offer_ids.append(int(k.split(":")[1]))
 
-    products_map = {p.id: p for p in Product.objects.filter(id__in=product_ids, is_active=True)}
-    offers_map = {o.id: o for o in Offer.objects.filter(id__in=offer_ids, is_active=True)}
+    menu = menu or catalog_srv.get_catalog()
+    products_map = {pid: menu.product_by_id[pid] for pid in product_ids if pid in menu.product_by_id}
+    offers_map = {oid: menu.offer_by_id[oid] for oid in offer_ids if oid in menu.offer_by_id}
 
     lines: list[CartLine] = []
     total = 0
@@ -0,0 +1,187 @@
+# menu/catalog.py
+"""
+كاش المنيو داخل الذاكرة (Category / Product / Offer).
+
+المنيو بيتغير مرتين باليوم تقريباً، فبدل ما كل صفحة تعمل querysets
+منحمّل المنيو الفعّال مرة وحدة ومنحتفظ فيه مع رقم نسخة (menu version).
+أي save/delete على الموديلات الثلاثة بيرفع النسخة، وأول طلب بعدها
+بيعيد بناء الـ snapshot.
+
+النسخة محفوظة بالـ cache الافتراضي، فإذا كان الـ cache مشترك بين
+الـ workers (Redis / file) كل الـ workers بيشوفوا التغيير فوراً.
+ومع LocMemCache (كل worker لحاله) في حد أعلى لعمر الـ snapshot
+(MENU_CATALOG_MAX_AGE) حتى ما يضل worker شايف منيو قديم.
+
+النسخة بتقول "لازم نعيد البناء"، بس اللي بيعرّف محتوى الـ snapshot هو
+Catalog.digest (بصمة الداتا نفسها): هي اللي بتدخل بالـ ETag وبمفاتيح الكاش،
+لأن مع LocMemCache ممكن الداتا تتغيّر والنسخة بهالـ worker تضل نفسها.
+"""
+import hashlib
+import threading
+import time
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+
+from . import metrics
+from .models import Category, Product, Offer
+
+VERSION_CACHE_KEY = "menu:catalog:version"
+DEFAULT_MAX_AGE = 60  # ثواني
+
+
+@dataclass
+class Catalog:
+    version: int
+    built_at: float
+    # بصمة المحتوى (شوف _digest)
+    digest: str = ""
+    categories: List[Category] = field(default_factory=list)
+    # المنتجات الظاهرة بالمنيو (المنتج والتصنيف فعّالين)
+    products: List[Product] = field(default_factory=list)
+    products_by_category: Dict[str, List[Product]] = field(default_factory=dict)
+    offers: List[Offer] = field(default_factory=list)
+
+    # lookups (كل المنتجات الفعّالة حتى لو التصنيف مخفي، متل get_object_or_404 القديم)
+    product_by_slug: Dict[str, Product] = field(default_factory=dict)
+    product_by_id: Dict[int, Product] = field(default_factory=dict)
+    offer_by_slug: Dict[str, Offer] = field(default_factory=dict)
+    offer_by_id: Dict[int, Offer] = field(default_factory=dict)
+
+    def products_for(self, category_slug: str = "all") -> List[Product]:
+        if not category_slug or category_slug == "all":
+            return self.products
+        return self.products_by_category.get(category_slug, [])
+
+
+_lock = threading.Lock()
+_catalog: Optional[Catalog] = None
+_local_version = 0
+
+
+def current_version() -> int:
+    """
+    رقم نسخة المنيو الحالي (متزايد دائماً).
+    """
+    version = cache.get(VERSION_CACHE_KEY)
+    if version is None:
+        return _local_version
+    return max(int(version), _local_version)
+
+
+def bump_version() -> int:
+    global _local_version
+    with _lock:
+        _local_version += 1
+        local = _local_version
+    cache.add(VERSION_CACHE_KEY, 0, timeout=None)
+    try:
+        version = cache.incr(VERSION_CACHE_KEY)
+    except ValueError:
+        # المفتاح انحذف بين add و incr
+        cache.set(VERSION_CACHE_KEY, local, timeout=None)
+        version = local
+    if version < local:
+        # cache جديد/فاضي: لا ترجع النسخة لورا
+        cache.set(VERSION_CACHE_KEY, local, timeout=None)
+        version = local
+    with _lock:
+        _local_version = max(_local_version, int(version))
+    return int(version)
+
+
+def _build(version: int) -> Catalog:
+    cat = Catalog(version=version, built_at=time.monotonic())
+
+    cat.categories = list(Category.objects.filter(is_active=True).order_by("order", "name"))
+    cat.offers = list(Offer.objects.filter(is_active=True).order_by("order", "title"))
+
+    for p in Product.objects.filter(is_active=True).select_related("category"):
+        cat.product_by_slug[p.slug] = p
+        cat.product_by_id[p.id] = p
+        if not p.category.is_active:
+            continue
+        cat.products.append(p)
+        cat.products_by_category.setdefault(p.category.slug, []).append(p)
+
+    for o in cat.offers:
+        cat.offer_by_slug[o.slug] = o
+        cat.offer_by_id[o.id] = o
+
+    cat.digest = _digest(cat)
+    return cat
+
+
+def _digest(cat: Catalog) -> str:
+    """
+    sha1 على كل حقول التصنيفات والمنتجات والعروض المحمّلة بالترتيب.
+    """
+    h = hashlib.sha1()
+    for rows in (cat.categories, cat.product_by_id.values(), cat.offers):
+        for obj in rows:
+            h.update(repr([f.value_from_object(obj) for f in obj._meta.concrete_fields]).encode())
+        h.update(b"|")
+    return h.hexdigest()[:20]
+
+
+def _max_age() -> float:
+    return float(getattr(settings, "MENU_CATALOG_MAX_AGE", DEFAULT_MAX_AGE))
+
+
+def get_catalog() -> Catalog:
+    global _catalog
+    version = current_version()
+    cat = _catalog
+    if cat is not None and cat.version == version and time.monotonic() - cat.built_at < _max_age():
+        metrics.cache_lookup("catalog", True)
+        return cat
+
+    metrics.cache_lookup("catalog", False)
+    with _lock:
+        cat = _catalog
+        if cat is None or cat.version != version or time.monotonic() - cat.built_at >= _max_age():
+            cat = _build(version)
+            _catalog = cat
+    return cat
+
+
+def peek() -> Optional[Catalog]:
+    """
+    الـ snapshot الحالي بهالـ worker بدون فحص عمره ولا إعادة بناء (أو None).
+    """
+    return _catalog
+
+
+async def aget_catalog() -> Catalog:
+    """
+    للـ views الـ async: الـ snapshot الجاهز بيرجع بنفس الـ event loop،
+    وإعادة البناء (ORM) بس هي اللي بتروح على thread.
+    """
+    cat = _catalog
+    if cat is not None and cat.version == current_version() and time.monotonic() - cat.built_at < _max_age():
+        metrics.cache_lookup("catalog", True)
+        return cat
+    return await sync_to_async(get_catalog)()
+
+
+def invalidate() -> None:
+    """
+    رفع النسخة بعد الـ commit (حتى ما ينبني snapshot من داتا لسا ما انحفظت).
+    """
+    transaction.on_commit(bump_version)
+
+
+def _on_menu_change(sender, **kwargs):
+    invalidate()
+
+
+def connect_signals() -> None:
+    from django.db.models.signals import post_save, post_delete
+
+    for model in (Category, Product, Offer):
+        post_save.connect(_on_menu_change, sender=model, dispatch_uid=f"catalog-save-{model.__name__}")
+        post_delete.connect(_on_menu_change, sender=model, dispatch_uid=f"catalog-delete-{model.__name__}")
@@ -0,0 +1,325 @@
+# menu/catalog_io.py
+"""
+استيراد/تصدير المنيو كامل (تصنيفات + منتجات + عروض) بصيغة JSON أو CSV.
+
+- upsert حسب slug: bulk_create للجديد و bulk_update للموجود، كله بـ transaction وحدة
+  (يا بينحفظ الملف كامل يا ولا شي).
+- slugs الناقصة بتتولد للدفعة كلها من مجموعة slugs محمّلة مسبقاً، والموجودة بالملف
+  بتتفحص بنفس قواعد SlugField.
+- الصور: اسم ملف من مجلد --images بينسخ لـ MEDIA، أو مسار موجود بالـ storage.
+- نسخة المنيو بترتفع مرة وحدة بالآخر (bulk ما بيطلق signals).
+
+شكل CSV: ملف واحد بعمود type = category / product / offer.
+"""
+import csv
+import io
+import json
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional
+
+from django.core.exceptions import ValidationError
+from django.core.files import File
+from django.core.files.storage import default_storage
+from django.db import transaction
+
+from . import catalog as catalog_srv
+from .models import Category, Offer, Product
+from .slugs import slug_base, unique_slug
+
+CSV_FIELDS = [
+    "type", "slug", "name", "category", "description", "subtitle",
+    "price_syp", "order", "image", "is_active", "is_featured",
+]
+TRUE = {"1", "true", "yes", "y", "on", "نعم"}
+
+
+class CatalogImportError(Exception):
+    def __init__(self, errors: List[str]):
+        super().__init__("\n".join(errors))
+        self.errors = errors
+
+
+@dataclass
+class ImportResult:
+    created: Dict[str, int] = field(default_factory=lambda: {"categories": 0, "products": 0, "offers": 0})
+    updated: Dict[str, int] = field(default_factory=lambda: {"categories": 0, "products": 0, "offers": 0})
+
+    def summary(self) -> str:
+        return ", ".join(
+            f"{kind}: +{self.created[kind]} ~{self.updated[kind]}" for kind in ("categories", "products", "offers")
+        )
+
+
+# -----------------------------
+# export
+# -----------------------------
+def _image_name(f) -> str:
+    return f.name if f else ""
+
+
+def category_rows(qs: Optional[Iterable[Category]] = None) -> List[dict]:
+    return [
+        {"slug": c.slug, "name": c.name, "order": c.order, "is_active": c.is_active}
+        for c in (qs if qs is not None else Category.objects.all())
+    ]
+
+
+def product_rows(qs: Optional[Iterable[Product]] = None) -> List[dict]:
+    qs = qs if qs is not None else Product.objects.all()
+    return [
+        {
+            "slug": p.slug, "name": p.name, "category": p.category.slug, "description": p.description,
+            "price_syp": p.price_syp, "image": _image_name(p.image),
+            "is_active": p.is_active, "is_featured": p.is_featured,
+        }
+        for p in qs.select_related("category").order_by("category__order", "name")
+    ]
+
+
+def offer_rows(qs: Optional[Iterable[Offer]] = None) -> List[dict]:
+    return [
+        {
+            "slug": o.slug, "name": o.title, "subtitle": o.subtitle, "price_syp": o.price_syp,
+            "order": o.order, "image": _image_name(o.image), "is_active": o.is_active,
+        }
+        for o in (qs if qs is not None else Offer.objects.all())
+    ]
+
+
+def export_data(categories=None, products=None, offers=None) -> dict:
+    """
+    بدون وسائط → المنيو كامل. مع querysets → بس المحدد (أكشن الأدمن).
+    """
+    full = categories is None and products is None and offers is None
+    return {
+        "categories": category_rows(categories) if full or categories is not None else [],
+        "products": product_rows(products) if full or products is not None else [],
+        "offers": offer_rows(offers) if full or offers is not None else [],
+    }
+
+
+def dumps(data: dict, fmt: str) -> str:
+    if fmt == "json":
+        return json.dumps(data, ensure_ascii=False, indent=2)
+
+    out = io.StringIO()
+    writer = csv.DictWriter(out, fieldnames=CSV_FIELDS, extrasaction="ignore")
+    writer.writeheader()
+    for kind, type_name in (("categories", "category"), ("products", "product"), ("offers", "offer")):
+        for row in data.get(kind, []):
+            writer.writerow({**row, "type": type_name})
+    return out.getvalue()
+
+
+# -----------------------------
+# import
+# -----------------------------
+def loads(text: str, fmt: str) -> dict:
+    if fmt == "json":
+        data = json.loads(text)
+        return {k: list(data.get(k) or []) for k in ("categories", "products", "offers")}
+
+    data = {"categories": [], "products": [], "offers": []}
+    kinds = {"category": "categories", "product": "products", "offer": "offers"}
+    for row in csv.DictReader(io.StringIO(text.lstrip("﻿"))):
+        kind = kinds.get((row.get("type") or "").strip().lower())
+        if kind:
+            data[kind].append({k: v for k, v in row.items() if k != "type" and v not in (None, "")})
+    return data
+
+
+def detect_format(filename: str, default: str = "json") -> str:
+    suffix = Path(filename or "").suffix.lower()
+    return {".csv": "csv", ".json": "json"}.get(suffix, default)
+
+
+def _bool(value, default: bool) -> bool:
+    if value is None or value == "":
+        return default
+    if isinstance(value, bool):
+        return value
+    return str(value).strip().lower() in TRUE
+
+
+def _int(value, default: Optional[int], errors: List[str], where: str) -> Optional[int]:
+    if value is None or value == "":
+        return default
+    try:
+        n = int(str(value).replace(",", "").strip())
+    except ValueError:
+        errors.append(f"{where}: invalid number {value!r}")
+        return default
+    if n < 0:
+        errors.append(f"{where}: negative number {value!r}")
+    return n
+
+
+class _Images:
+    """
+    ملف من مجلد الصور → نسخة بالـ storage (مرة وحدة لكل ملف)،
+    أو مسار موجود أصلاً بالـ storage (متل ملف مصدّر).
+    """
+
+    def __init__(self, directory: Optional[Path], dry_run: bool = False):
+        self.directory = Path(directory) if directory else None
+        self.dry_run = dry_run
+        self._saved: Dict[str, str] = {}
+
+    def resolve(self, value: str, upload_to: str, errors: List[str], where: str) -> Optional[str]:
+        value = (value or "").strip()
+        if not value:
+            return None
+        if self.directory is not None:
+            src = self.directory / Path(value).name
+            if src.is_file():
+                key = str(src)
+                if self.dry_run:
+                    return f"{upload_to}{src.name}"
+                if key not in self._saved:
+                    with src.open("rb") as fh:
+                        self._saved[key] = default_storage.save(f"{upload_to}{src.name}", File(fh))
+                return self._saved[key]
+        if default_storage.exists(value):
+            return value
+        errors.append(f"{where}: image not found {value!r}")
+        return None
+
+
+def _upsert(model, rows: List[dict], existing: Dict[str, object], build, fields: List[str], result_key: str,
+            result: ImportResult, errors: List[str]) -> None:
+    new, changed = [], []
+    for row in rows:
+        obj = existing.get(row["slug"])
+        if obj is None:
+            new.append(build(model(slug=row["slug"]), row))
+        else:
+            changed.append(build(obj, row))
+    if errors:
+        return  # ما في داعي نكتب شي، رح يرجع rollback
+    model.objects.bulk_create(new, batch_size=500)
+    if changed:
+        model.objects.bulk_update(changed, fields, batch_size=500)
+    result.created[result_key] += len(new)
+    result.updated[result_key] += len(changed)
+
+
+def _assign_slugs(model, rows: List[dict], text_key: str, fallback: str, errors: List[str]) -> Dict[str, object]:
+    """
+    يحمّل الموجود حسب slug (استعلام واحد) ويولّد slugs للصفوف الناقصة من نفس المجموعة.
+    """
+    field = model._meta.get_field("slug")
+    seen = set()
+    for r in rows:
+        if r.get("slug"):
+            r["slug"] = str(r["slug"]).strip()
+            try:
+                # نفس قواعد SlugField(allow_unicode=True): slug غلط بيكسر reverse() بكل المنيو
+                field.run_validators(r["slug"])
+            except ValidationError as e:
+                errors.append(f"{model._meta.model_name} {r['slug']!r}: {' '.join(e.messages)}")
+            if r["slug"] in seen:
+                errors.append(f"{model._meta.model_name} {r['slug']}: duplicate slug in file")
+            seen.add(r["slug"])
+
+    existing = {o.slug: o for o in model.objects.filter(slug__in=[r["slug"] for r in rows if r.get("slug")])}
+    missing = [r for r in rows if not r.get("slug")]
+    if missing:
+        taken = set(model.objects.values_list("slug", flat=True)) | {r["slug"] for r in rows if r.get("slug")}
+        for r in missing:
+            r["slug"] = unique_slug(slug_base(r.get(text_key) or r.get("name"), fallback), taken)
+    return existing
+
+
+@transaction.atomic
+def import_data(data: dict, images_dir: Optional[Path] = None, dry_run: bool = False) -> ImportResult:
+    """
+    بيرفع CatalogImportError (مع كل الأخطاء) وبيرجّع كل شي لورا لو في أي صف غلط.
+    """
+    errors: List[str] = []
+    result = ImportResult()
+    images = _Images(images_dir, dry_run)
+
+    # --- categories
+    cat_rows = [dict(r) for r in data.get("categories", [])]
+    for i, r in enumerate(cat_rows, 1):
+        if not (r.get("name") or "").strip():
+            errors.append(f"category #{i}: name is required")
+    existing = _assign_slugs(Category, cat_rows, "name", "category", errors)
+
+    def build_category(c: Category, r: dict) -> Category:
+        c.name = r.get("name", c.name).strip()
+        c.order = _int(r.get("order"), c.order or 0, errors, f"category {c.slug}")
+        c.is_active = _bool(r.get("is_active"), c.is_active if c.pk else True)
+        return c
+
+    _upsert(Category, cat_rows, existing, build_category, ["name", "order", "is_active"], "categories", result, errors)
+
+    # --- products
+    prod_rows = [dict(r) for r in data.get("products", [])]
+    cat_slugs = {r.get("category") for r in prod_rows if r.get("category")}
+    categories = {c.slug: c for c in Category.objects.filter(slug__in=cat_slugs)}
+    batch_cats = {r["slug"] for r in cat_rows}  # لو التصنيفات ما انكتبت بسبب خطأ تاني
+    for i, r in enumerate(prod_rows, 1):
+        where = f"product {r.get('slug') or '#%d' % i}"
+        if not (r.get("name") or "").strip():
+            errors.append(f"{where}: name is required")
+        if r.get("category") not in categories and r.get("category") not in batch_cats:
+            errors.append(f"{where}: unknown category {r.get('category')!r}")
+    existing = _assign_slugs(Product, prod_rows, "name", "product", errors)
+
+    def build_product(p: Product, r: dict) -> Product:
+        where = f"product {p.slug}"
+        p.name = r.get("name", p.name or "").strip()
+        if r.get("category") in categories:
+            p.category = categories[r["category"]]
+        p.description = r.get("description", p.description or "")
+        p.price_syp = _int(r.get("price_syp"), p.price_syp, errors, where)
+        if p.price_syp is None:
+            errors.append(f"{where}: price_syp is required")
+        p.is_active = _bool(r.get("is_active"), p.is_active if p.pk else True)
+        p.is_featured = _bool(r.get("is_featured"), p.is_featured if p.pk else False)
+        if r.get("image"):
+            p.image = images.resolve(r["image"], "products/", errors, where) or p.image
+        return p
+
+    _upsert(
+        Product, prod_rows, existing, build_product,
+        ["name", "category", "description", "price_syp", "is_active", "is_featured", "image"],
+        "products", result, errors,
+    )
+
+    # --- offers
+    offer_rows_ = [dict(r) for r in data.get("offers", [])]
+    for i, r in enumerate(offer_rows_, 1):
+        r.setdefault("name", r.get("title"))
+        if not (r.get("name") or "").strip():
+            errors.append(f"offer {r.get('slug') or '#%d' % i}: name is required")
+    existing = _assign_slugs(Offer, offer_rows_, "name", "offer", errors)
+
+    def build_offer(o: Offer, r: dict) -> Offer:
+        where = f"offer {o.slug}"
+        o.title = (r.get("name") or o.title or "").strip()
+        o.subtitle = r.get("subtitle", o.subtitle or "")
+        o.price_syp = _int(r.get("price_syp"), o.price_syp, errors, where)
+        if o.price_syp is None:
+            errors.append(f"{where}: price_syp is required")
+        o.order = _int(r.get("order"), o.order or 0, errors, where)
+        o.is_active = _bool(r.get("is_active"), o.is_active if o.pk else True)
+        if r.get("image"):
+            o.image = images.resolve(r["image"], "offers/", errors, where) or o.image
+        return o
+
+    _upsert(
+        Offer, offer_rows_, existing, build_offer,
+        ["title", "subtitle", "price_syp", "order", "is_active", "image"],
+        "offers", result, errors,
+    )
+
+    if errors:
+        raise CatalogImportError(errors)
+    if dry_run:
+        transaction.set_rollback(True)
+    else:
+        catalog_srv.invalidate()
+    return result
@@ -0,0 +1,287 @@
+# menu/datagen.py
+"""
+توليد داتا تجريبية بحجم حقيقي (منيو كبير + أشهر من الطلبات) بشكل حتمي:
+نفس الـ seed = نفس الداتا بالضبط، فأي سيناريو أداء بينعاد متل ما هو.
+
+كل الكتابة bulk_create على دفعات (batch_size).
+"""
+import random
+from dataclasses import dataclass
+from datetime import datetime, time as dtime, timedelta
+from pathlib import Path
+from typing import Callable, Dict, List
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import F, Value
+from django.db.models.functions import Least
+from django.utils import timezone
+
+from . import catalog as catalog_srv
+from .models import Category, Product, Offer, Order, OrderItem, TableState
+from .slugs import unique_slug
+
+# (عربي، لاتيني للـ slug)
+CATEGORY_WORDS = [
+    ("قهوة", "coffee"), ("شاي", "tea"), ("عصير", "juice"), ("أركيلة", "shisha"),
+    ("حلويات", "sweets"), ("فطور", "breakfast"), ("سندويش", "sandwich"), ("سلطات", "salads"),
+    ("مشروبات باردة", "cold-drinks"), ("ميلك شيك", "milkshake"), ("موهيتو", "mojito"), ("بيتزا", "pizza"),
+]
+ITEM_WORDS = [
+    ("إسبريسو", "espresso"), ("لاتيه", "latte"), ("كابتشينو", "cappuccino"), ("موكا", "mocha"),
+    ("نعناع", "mint"), ("ليمون", "lemon"), ("فريز", "strawberry"), ("مانجا", "mango"),
+    ("تفاحتين", "two-apples"), ("عنب", "grape"), ("شوكولا", "chocolate"), ("كراميل", "caramel"),
+    ("فانيلا", "vanilla"), ("جبنة", "cheese"), ("دجاج", "chicken"), ("زعتر", "zaatar"),
+    ("بندق", "hazelnut"), ("قرفة", "cinnamon"), ("هيل", "cardamom"), ("أناناس", "pineapple"),
+]
+SIZES = [("صغير", "small"), ("وسط", "medium"), ("كبير", "large"), ("دبل", "double"), ("", "")]
+DESCRIPTIONS = [
+    "مع حليب طازج", "بدون سكر", "محضّر على الطريقة العربية", "مع كريمة وصوص",
+    "تقديم بارد مع ثلج", "وصفة البيت الخاصة", "محمّص طازج يومياً", "",
+]
+
+# توزيع حالات الطلبات القديمة
+CLOSED_STATUS_WEIGHTS = [(Order.Status.DELIVERED, 92), (Order.Status.CANCELED, 8)]
+OPEN_STATUS_WEIGHTS = [(Order.Status.NEW, 40), (Order.Status.PREPARING, 40), (Order.Status.READY, 20)]
+# ساعات الضغط (من 10 الصبح لـ 2 بالليل) — الذروة بالعشا
+HOUR_WEIGHTS = {
+    10: 2, 11: 3, 12: 4, 13: 5, 14: 4, 15: 3, 16: 4, 17: 6, 18: 8, 19: 10,
+    20: 12, 21: 12, 22: 10, 23: 7, 0: 4, 1: 2,
+}
+
+
+@dataclass
+class DataSpec:
+    seed: int = 1
+    categories: int = 20
+    products: int = 400
+    offers: int = 30
+    images: bool = False
+    tables: int = 60
+    days: int = 90
+    orders_per_day: int = 150
+    open_tables: int = 15
+    batch_size: int = 2000
+    prefix: str = "gen"
+
+
+def _weighted(rnd: random.Random, weights):
+    values, w = zip(*weights)
+    return rnd.choices(values, weights=w, k=1)[0]
+
+
+def _image(folder: str, name: str) -> str:
+    from PIL import Image, ImageDraw
+
+    # random مستقل للصور حتى --images ما يغيّر باقي الداتا
+    rnd = random.Random(f"{folder}/{name}")
+    rel = f"{folder}/{name}.jpg"
+    path = Path(settings.MEDIA_ROOT) / rel
+    if not path.exists():
+        path.parent.mkdir(parents=True, exist_ok=True)
+        c1 = tuple(rnd.randint(60, 200) for _ in range(3))
+        c2 = tuple(rnd.randint(20, 120) for _ in range(3))
+        im = Image.new("RGB", (1200, 900), c1)
+        draw = ImageDraw.Draw(im)
+        for y in range(0, 900, 6):
+            t = y / 900
+            draw.rectangle([0, y, 1200, y + 6], fill=tuple(int(a + (b - a) * t) for a, b in zip(c1, c2)))
+        im.save(path, "JPEG", quality=85)
+    return rel
+
+
+def _bulk(model, objs: List, batch_size: int) -> List:
+    created = []
+    for i in range(0, len(objs), batch_size):
+        created.extend(model.objects.bulk_create(objs[i:i + batch_size], batch_size=batch_size))
+    return created
+
+
+def generate_menu(spec: DataSpec, log: Callable[[str], None] = lambda m: None):
+    rnd = random.Random(spec.seed)
+
+    cat_slugs = set(Category.objects.values_list("slug", flat=True))
+    cat_names = set(Category.objects.values_list("name", flat=True))
+    categories = []
+    for i in range(spec.categories):
+        ar, en = CATEGORY_WORDS[i % len(CATEGORY_WORDS)]
+        categories.append(Category(
+            name=unique_slug(ar, cat_names, sep=" "),
+            slug=unique_slug(f"{spec.prefix}-{en}", cat_slugs),
+            order=i,
+            is_active=rnd.random() > 0.05,
+        ))
+    categories = _bulk(Category, categories, spec.batch_size)
+    log(f"categories: {len(categories)}")
+
+    prod_slugs = set(Product.objects.values_list("slug", flat=True))
+    products = []
+    for i in range(spec.products):
+        cat = categories[i % len(categories)]
+        w_ar, w_en = rnd.choice(ITEM_WORDS)
+        s_ar, s_en = rnd.choice(SIZES)
+        name = " ".join(x for x in (w_ar, s_ar) if x)
+        products.append(Product(
+            category=cat,
+            name=name,
+            slug=unique_slug("-".join(x for x in (spec.prefix, w_en, s_en) if x), prod_slugs),
+            description=rnd.choice(DESCRIPTIONS),
+            price_syp=rnd.randrange(5000, 90000, 500),
+            image=_image("products", f"{spec.prefix}-{i}") if spec.images else None,
+            is_active=rnd.random() > 0.03,
+            is_featured=rnd.random() < 0.08,
+        ))
+    products = _bulk(Product, products, spec.batch_size)
+    log(f"products: {len(products)}")
+
+    offer_slugs = set(Offer.objects.values_list("slug", flat=True))
+    offers = []
+    for i in range(spec.offers):
+        (a_ar, a_en), (b_ar, b_en) = rnd.sample(ITEM_WORDS, 2)
+        offers.append(Offer(
+            title=f"عرض {a_ar} + {b_ar}",
+            subtitle="أركيلة + مشروب" if i % 3 == 0 else "",
+            price_syp=rnd.randrange(30000, 150000, 1000),
+            image=_image("offers", f"{spec.prefix}-{i}") if spec.images else None,
+            is_active=rnd.random() > 0.1,
+            order=i,
+            slug=unique_slug(f"{spec.prefix}-offer-{a_en}-{b_en}", offer_slugs),
+        ))
+    offers = _bulk(Offer, offers, spec.batch_size)
+    log(f"offers: {len(offers)}")
+    return categories, products, offers
+
+
+def _random_time(rnd: random.Random, day) -> datetime:
+    hour = _weighted(rnd, list(HOUR_WEIGHTS.items()))
+    # ساعات بعد نص الليل بتنحسب على نفس "يوم العمل"
+    d = day + timedelta(days=1) if hour < 10 else day
+    naive = datetime.combine(d, dtime(hour, rnd.randint(0, 59), rnd.randint(0, 59)))
+    return timezone.make_aware(naive)
+
+
+def generate_orders(spec: DataSpec, products: List[Product], offers: List[Offer],
+                    log: Callable[[str], None] = lambda m: None) -> int:
+    rnd = random.Random(spec.seed * 7919 + 1)
+    products = [p for p in products if p.is_active] or products
+    offers = [o for o in offers if o.is_active] or offers
+    today = timezone.localdate()
+    tables = [str(t) for t in range(1, spec.tables + 1)]
+
+    def make_items(order: Order) -> List[OrderItem]:
+        items = []
+        used = set()
+        for _ in range(rnd.choices([1, 2, 3, 4, 5, 6], weights=[20, 30, 22, 14, 9, 5])[0]):
+            if offers and rnd.random() < 0.15:
+                o = rnd.choice(offers)
+                if ("o", o.id) in used:
+                    continue
+                used.add(("o", o.id))
+                items.append(OrderItem(
+                    order=order, item_type=OrderItem.ItemType.OFFER, offer=o,
+                    name_snapshot=o.title, price_syp_snapshot=o.price_syp, qty=1,
+                    note_snapshot=rnd.choice(["", "مشروب: قهوة | أركيلة: تفاحتين"]),
+                ))
+            else:
+                p = rnd.choice(products)
+                if ("p", p.id) in used:
+                    continue
+                used.add(("p", p.id))
+                items.append(OrderItem(
+                    order=order, item_type=OrderItem.ItemType.PRODUCT, product=p,
+                    name_snapshot=p.name, price_syp_snapshot=p.price_syp,
+                    qty=rnd.choices([1, 2, 3, 4], weights=[60, 25, 10, 5])[0],
+                ))
+        return items
+
+    total_orders = 0
+    pending_orders: List[Order] = []
+    pending_items: List[List[OrderItem]] = []
+
+    def flush():
+        nonlocal total_orders
+        if not pending_orders:
+            return
+        created = Order.objects.bulk_create(pending_orders, batch_size=spec.batch_size)
+        items = []
+        for order, its in zip(created, pending_items):
+            for it in its:
+                it.order = order
+                items.append(it)
+        OrderItem.objects.bulk_create(items, batch_size=spec.batch_size)
+        # bulk_create بيحط updated_at = الآن (auto_now) → نرجعها لوقت الطلب (مو بالمستقبل)
+        ids = [o.id for o in created]
+        Order.objects.filter(id__in=ids).update(
+            updated_at=Least(F("created_at") + timedelta(minutes=25), Value(timezone.now()))
+        )
+        total_orders += len(created)
+        pending_orders.clear()
+        pending_items.clear()
+
+    with transaction.atomic():
+        for back in range(spec.days, 0, -1):
+            day = today - timedelta(days=back)
+            n = max(0, int(rnd.gauss(spec.orders_per_day, spec.orders_per_day * 0.15)))
+            for _ in range(n):
+                order = Order(
+                    table_no=rnd.choice(tables),
+                    status=_weighted(rnd, CLOSED_STATUS_WEIGHTS),
+                    created_at=_random_time(rnd, day),
+                )
+                its = make_items(order)
+                order.total_syp = sum(it.price_syp_snapshot * it.qty for it in its)
+                pending_orders.append(order)
+                pending_items.append(its)
+                if len(pending_orders) >= spec.batch_size:
+                    flush()
+        flush()
+
+        # الطلبات المفتوحة هلق (طلب واحد لكل طاولة) + سجل الطاولات
+        now = timezone.now()
+        open_tables = rnd.sample(tables, min(spec.open_tables, len(tables)))
+        for t in open_tables:
+            order = Order(
+                table_no=t,
+                status=_weighted(rnd, OPEN_STATUS_WEIGHTS),
+                created_at=now - timedelta(minutes=rnd.randint(1, 90)),
+            )
+            its = make_items(order)
+            order.total_syp = sum(it.price_syp_snapshot * it.qty for it in its)
+            pending_orders.append(order)
+            pending_items.append(its)
+        open_orders = list(pending_orders)
+        flush()
+        for o in open_orders:
+            TableState.objects.update_or_create(table_no=o.table_no, defaults={"order": o, "status": o.status})
+        # READY = كل الأسطر جاهزة (menu/prep.py)
+        OrderItem.objects.filter(
+            order__in=[o for o in open_orders if o.status == Order.Status.READY]
+        ).update(prepared_qty=F("qty"))
+
+    log(f"orders: {total_orders} ({len(open_orders)} open)")
+    return total_orders
+
+
+def generate(spec: DataSpec, log: Callable[[str], None] = lambda m: None) -> Dict[str, int]:
+    with transaction.atomic():
+        categories, products, offers = generate_menu(spec, log)
+    orders = generate_orders(spec, products, offers, log) if spec.days or spec.open_tables else 0
+    catalog_srv.invalidate()
+    return {
+        "categories": len(categories),
+        "products": len(products),
+        "offers": len(offers),
+        "orders": orders,
+    }
+
+
+def clear(log: Callable[[str], None] = lambda m: None) -> None:
+    with transaction.atomic():
+        TableState.objects.all().delete()
+        OrderItem.objects.all().delete()
+        Order.objects.all().delete()
+        Product.objects.all().delete()
+        Offer.objects.all().delete()
+        Category.objects.all().delete()
+    catalog_srv.invalidate()
+    log("cleared menu and orders")
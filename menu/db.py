@@ -0,0 +1,53 @@
+# menu/db.py
+"""
+إعادة محاولة الكتابات على SQLite عند "database is locked".
+
+مع WAL + busy_timeout نادراً ما منوصل لهون، بس تحت ضغط checkout من
+كذا worker ممكن الـ busy_timeout يخلص. بدل ما يطلع 500 للزبون منعيد
+الـ transaction كاملة بعد backoff قصير.
+"""
+import functools
+import logging
+import random
+import time
+
+from django.conf import settings
+from django.db import OperationalError, connection, transaction
+
+logger = logging.getLogger(__name__)
+
+
+def _is_locked(exc: Exception) -> bool:
+    return "is locked" in str(exc).lower()
+
+
+def atomic_retry(func=None, *, retries: int = None, backoff: float = None):
+    """
+    @atomic_retry
+    def write_order(...):
+        ...  # بيتنفذ جوّا transaction.atomic()
+
+    الإعادة بس إذا ما كنا أصلاً جوّا atomic block (وإلا ما منقدر نعيد
+    الـ transaction الخارجية).
+    """
+    def decorator(fn):
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            attempts = settings.DB_WRITE_RETRIES if retries is None else retries
+            delay = settings.DB_WRITE_RETRY_BACKOFF if backoff is None else backoff
+            attempt = 0
+            while True:
+                try:
+                    with transaction.atomic():
+                        return fn(*args, **kwargs)
+                except OperationalError as exc:
+                    if attempt >= attempts or connection.in_atomic_block or not _is_locked(exc):
+                        raise
+                    attempt += 1
+                    logger.warning("Retrying %s after %r (attempt %d)", fn.__name__, exc, attempt)
+                    time.sleep(delay * (2 ** (attempt - 1)) * (1 + random.random()))
+        return wrapper
+
+    if func is not None:
+        return decorator(func)
+    return decorator
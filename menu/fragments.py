@@ -0,0 +1,93 @@
+# menu/fragments.py
+"""
+كاش HTML جاهز بذاكرة الـ worker (LRU محدود بالحجم).
+
+أول استعمال: أقسام صفحة home (التصنيفات + العروض + المنتجات) لكل
+(بصمة الـ snapshot تبع المنيو، التصنيف، البحث). المفتاح فيه البصمة (Catalog.digest
+مو رقم النسخة، لأن النسخة مع LocMemCache ما بتتحرك بكل الـ workers)، فأي
+snapshot بداتا جديدة بيخلّي القديم ما ينطلب أبداً وبيطلع لحاله بالـ LRU.
+
+الحد بالبايت (FRAGMENT_CACHE_MAX_BYTES) مو بعدد العناصر: البحث (q) حر
+وصفحة تصنيف كبير أكبر بكتير من صغير.
+"""
+import threading
+from collections import OrderedDict
+from typing import Hashable, Optional, Tuple
+
+from django.conf import settings
+
+from . import metrics
+
+DEFAULT_MAX_BYTES = 8 * 1024 * 1024
+
+
+def _size(value) -> int:
+    if isinstance(value, str):
+        return len(value.encode())
+    return sum(_size(v) for v in value)
+
+
+class LRUCache:
+    def __init__(self, name: str, max_bytes: Optional[int] = None):
+        self.name = name
+        self._max_bytes = max_bytes
+        self._items: "OrderedDict[Hashable, Tuple[object, int]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    @property
+    def max_bytes(self) -> int:
+        if self._max_bytes is not None:
+            return self._max_bytes
+        return int(getattr(settings, "FRAGMENT_CACHE_MAX_BYTES", DEFAULT_MAX_BYTES))
+
+    def get(self, key: Hashable):
+        with self._lock:
+            item = self._items.get(key)
+            if item is not None:
+                self._items.move_to_end(key)
+                self.hits += 1
+            else:
+                self.misses += 1
+        metrics.cache_lookup(self.name, item is not None)
+        return item[0] if item is not None else None
+
+    def set(self, key: Hashable, value) -> None:
+        size = _size(value)
+        limit = self.max_bytes
+        if size > limit:
+            return
+        with self._lock:
+            old = self._items.pop(key, None)
+            if old is not None:
+                self.bytes -= old[1]
+            self._items[key] = (value, size)
+            self.bytes += size
+            while self.bytes > limit:
+                _, (_, evicted) = self._items.popitem(last=False)
+                self.bytes -= evicted
+                self.evictions += 1
+
+    def clear(self) -> None:
+        with self._lock:
+            self._items.clear()
+            self.bytes = 0
+
+    def __len__(self) -> int:
+        return len(self._items)
+
+    def stats(self) -> dict:
+        return {
+            "items": len(self._items),
+            "bytes": self.bytes,
+            "max_bytes": self.max_bytes,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+        }
+
+
+home_sections = LRUCache("home_sections")
@@ -0,0 +1,118 @@
+# menu/history.py
+"""
+سجل الطلبات بصفحات keyset على (created_at, id) بدل OFFSET:
+الصفحة رقم 500 بنفس سرعة الصفحة الأولى لأن كل صفحة بتبلش من آخر
+صف بالصفحة اللي قبلها (index seek) بدون ما نعدّ كل اللي قبلها.
+
+الفلاتر (الحالة / الطاولة / المدة) كلها مغطاة بـ indexes مركّبة على Order.
+"""
+from dataclasses import dataclass
+from datetime import date, datetime, time as dtime, timedelta
+from typing import List, Optional, Tuple
+from urllib.parse import urlencode
+
+from django.db.models import Q
+from django.utils import timezone
+
+from .live import Cursor, decode_cursor, encode_cursor
+from .models import Order
+
+PAGE_SIZE = 50
+OPEN_STATUSES = [s for s in Order.Status.values if s not in Order.CLOSED_STATUSES]
+
+RANGES = {
+    "today": 0,
+    "yesterday": 1,
+    "7d": 7,
+    "30d": 30,
+}
+
+
+@dataclass
+class HistoryFilter:
+    status: str = ""          # "" = كل الطلبات المغلقة، "all" = الكل
+    table_no: str = ""
+    date_from: Optional[date] = None
+    date_to: Optional[date] = None
+    range: str = ""
+
+    def querystring(self, **extra) -> str:
+        params = {
+            "status": self.status,
+            "table": self.table_no,
+            "range": self.range,
+            "from": self.date_from.isoformat() if self.date_from and not self.range else "",
+            "to": self.date_to.isoformat() if self.date_to and not self.range else "",
+        }
+        params.update(extra)
+        return urlencode({k: v for k, v in params.items() if v})
+
+
+def _parse_date(raw: str) -> Optional[date]:
+    try:
+        return date.fromisoformat((raw or "").strip())
+    except ValueError:
+        return None
+
+
+def parse_filter(params) -> HistoryFilter:
+    status = (params.get("status") or "").strip()
+    if status not in Order.Status.values and status != "all":
+        status = ""
+
+    f = HistoryFilter(
+        status=status,
+        table_no=(params.get("table") or "").strip().lstrip("#")[:20],
+        range=(params.get("range") or "").strip(),
+    )
+    if f.range in RANGES:
+        today = timezone.localdate()
+        days = RANGES[f.range]
+        f.date_from = today - timedelta(days=days)
+        f.date_to = f.date_from if f.range == "yesterday" else today
+    else:
+        f.range = ""
+        f.date_from = _parse_date(params.get("from"))
+        f.date_to = _parse_date(params.get("to"))
+    return f
+
+
+def _day_start(d: date) -> datetime:
+    return timezone.make_aware(datetime.combine(d, dtime.min))
+
+
+def filtered(f: HistoryFilter):
+    qs = Order.objects.all()
+    if f.status == "":
+        # "مو مفتوح" بدل status IN (المغلقة): الـ IN على index الحالة بيجبر SQLite
+        # يرتّب كل الصفوف قبل LIMIT، أما هيك بيمشي على (created_at, id) مباشرة
+        qs = qs.exclude(status__in=OPEN_STATUSES)
+    elif f.status != "all":
+        qs = qs.filter(status=f.status)
+    if f.table_no:
+        qs = qs.filter(table_no=f.table_no)
+    if f.date_from:
+        qs = qs.filter(created_at__gte=_day_start(f.date_from))
+    if f.date_to:
+        qs = qs.filter(created_at__lt=_day_start(f.date_to + timedelta(days=1)))
+    return qs
+
+
+def page(f: HistoryFilter, cursor: Optional[Cursor] = None, limit: int = PAGE_SIZE) -> Tuple[List[Order], str]:
+    """
+    (طلبات الصفحة من الأحدث للأقدم، cursor الصفحة الجاية أو "").
+    """
+    qs = filtered(f)
+    if cursor:
+        ts, pk = cursor
+        qs = qs.filter(Q(created_at__lt=ts) | Q(created_at=ts, id__lt=pk))
+
+    orders = list(qs.order_by("-created_at", "-id").prefetch_related("items")[: limit + 1])
+    more = len(orders) > limit
+    orders = orders[:limit]
+    next_cursor = encode_cursor((orders[-1].created_at, orders[-1].id)) if more else ""
+    return orders, next_cursor
+
+
+def parse_cursor(raw: str) -> Optional[Cursor]:
+    return decode_cursor(raw) if raw else None
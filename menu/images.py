@@ -0,0 +1,251 @@
+# menu/images.py
+"""
+نسخ مصغّرة (WebP / JPEG) بعدة عروض لصور المنتجات والعروض.
+
+الصور المرفوعة (وصور الـ fallback بـ static/img) كبيرة جداً على الموبايل،
+فمنولّد نسخ بعروض ثابتة ومنخزنها تحت MEDIA_ROOT/derivatives/<hash>/
+حيث الـ hash مأخوذ من محتوى الصورة الأصلية — أي صورة جديدة = مسار جديد،
+وما في داعي لأي invalidation.
+
+التوليد مسبق، مو وقت الـ render:
+- عند حفظ Product/Offer (MENU_IMAGE_EAGER)، بعد الـ commit.
+- `python manage.py build_images` لكل الصور + صور الـ fallback
+  (بعد import_catalog أو أول نشر).
+الـ template tag بيعمل lookup بس: إذا النسخ جاهزة (manifest.json موجود)
+بيرجّع srcset، وإلا الصورة الأصلية.
+"""
+import hashlib
+import json
+import logging
+import os
+import threading
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+from django.conf import settings
+from django.contrib.staticfiles import finders
+from django.db import transaction
+from django.templatetags.static import static
+
+from . import metrics
+from .models import Product, Offer
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_WIDTHS = (320, 640, 960)
+FORMATS = (
+    # (ext, PIL format, save options)
+    ("webp", "WEBP", {"quality": 78, "method": 4}),
+    ("jpg", "JPEG", {"quality": 80, "optimize": True, "progressive": True}),
+)
+DERIVATIVES_DIR = "derivatives"
+MANIFEST = "manifest.json"
+# صور static/img اللي بتستعملها الـ templates كـ fallback
+FALLBACK_STATICS = ("img/product-1.jpg", "img/product-2.jpg", "img/product-3.jpg")
+
+
+@dataclass
+class ResponsiveImage:
+    src: str
+    # {"webp": [(url, width), ...], "jpg": [...]}
+    srcsets: Dict[str, List[Tuple[str, int]]] = field(default_factory=dict)
+
+    def srcset(self, ext: str) -> str:
+        return ", ".join(f"{url} {w}w" for url, w in self.srcsets.get(ext, []))
+
+
+_lock = threading.Lock()
+_gen_locks: Dict[str, threading.Lock] = {}
+# (path, mtime_ns, size) → ResponsiveImage (بس الجاهزة)
+_memo: Dict[Tuple[str, int, int], ResponsiveImage] = {}
+# (path, mtime_ns, size) → content hash
+_digests: Dict[Tuple[str, int, int], str] = {}
+
+
+def _widths() -> Tuple[int, ...]:
+    return tuple(getattr(settings, "MENU_IMAGE_WIDTHS", DEFAULT_WIDTHS))
+
+
+def _root() -> Path:
+    return Path(settings.MEDIA_ROOT) / DERIVATIVES_DIR
+
+
+def _url(rel: str) -> str:
+    return f"{settings.MEDIA_URL.rstrip('/')}/{DERIVATIVES_DIR}/{rel}"
+
+
+def _content_hash(path: str) -> str:
+    h = hashlib.sha1()
+    with open(path, "rb") as fh:
+        for chunk in iter(lambda: fh.read(1 << 16), b""):
+            h.update(chunk)
+    return h.hexdigest()[:20]
+
+
+def _out_dir(digest: str) -> Path:
+    return _root() / digest[:2] / digest
+
+
+def _digest(path: str, key: Tuple[str, int, int]) -> str:
+    digest = _digests.get(key)
+    if digest is None:
+        digest = _digests[key] = _content_hash(path)
+    return digest
+
+
+def _resolve(source) -> Tuple[Optional[str], Optional[str]]:
+    """
+    source: FieldFile (Product.image / Offer.image) أو مسار static مثل "img/product-3.jpg"
+    يرجّع (المسار على الديسك، الـ URL الأصلي)
+    """
+    if not source:
+        return None, None
+    if isinstance(source, str):
+        return finders.find(source), static(source)
+    try:
+        return source.path, source.url
+    except (NotImplementedError, ValueError):
+        # storage بدون مسار محلي (S3...) → منرجع الأصل بدون نسخ
+        return None, getattr(source, "url", None)
+
+
+def _generate(src_path: str, digest: str) -> Dict[str, List[Tuple[str, int]]]:
+    from PIL import Image, ImageOps
+
+    out_dir = _out_dir(digest)
+    out_dir.mkdir(parents=True, exist_ok=True)
+    srcsets: Dict[str, List[Tuple[str, int]]] = {ext: [] for ext, _, _ in FORMATS}
+
+    with Image.open(src_path) as im:
+        im = ImageOps.exif_transpose(im)
+        if im.mode in ("RGBA", "LA", "P"):
+            im = im.convert("RGBA")
+            bg = Image.new("RGB", im.size, (255, 255, 255))
+            bg.paste(im, mask=im.getchannel("A"))
+            im = bg
+        elif im.mode != "RGB":
+            im = im.convert("RGB")
+
+        orig_w, orig_h = im.size
+        # ما منكبّر الصورة: العروض الأكبر من الأصل بتنستبدل بعرض الأصل
+        widths = sorted({min(w, orig_w) for w in _widths()})
+
+        for w in widths:
+            resized = None
+            for ext, fmt, options in FORMATS:
+                target = out_dir / f"{w}.{ext}"
+                if not target.exists():
+                    if resized is None:
+                        h = max(1, round(orig_h * w / orig_w))
+                        resized = im if w == orig_w else im.resize((w, h), Image.LANCZOS)
+                    tmp = target.with_name(f".{target.name}.{os.getpid()}.tmp")
+                    resized.save(tmp, fmt, **options)
+                    os.replace(tmp, target)
+                srcsets[ext].append((_url(f"{digest[:2]}/{digest}/{w}.{ext}"), w))
+
+    # الـ manifest آخر شي: وجوده يعني كل النسخ جاهزة
+    tmp = out_dir / f".{MANIFEST}.{os.getpid()}.tmp"
+    tmp.write_text(json.dumps(srcsets))
+    os.replace(tmp, out_dir / MANIFEST)
+    return srcsets
+
+
+def _image(url: str, srcsets: Dict[str, List[Tuple[str, int]]]) -> ResponsiveImage:
+    jpegs = srcsets.get("jpg") or []
+    # src الافتراضي: أصغر نسخة JPEG ≥ 640 (أو أكبر شي متوفر)
+    src = next((u for u, w in jpegs if w >= 640), jpegs[-1][0] if jpegs else url)
+    return ResponsiveImage(src=src, srcsets=srcsets)
+
+
+def _stat_key(path: str) -> Optional[Tuple[str, int, int]]:
+    try:
+        st = os.stat(path)
+    except OSError:
+        return None
+    return (path, st.st_mtime_ns, st.st_size)
+
+
+def responsive(source) -> Optional[ResponsiveImage]:
+    """
+    lookup بس (بيتنادى وقت الـ render): ResponsiveImage إذا النسخ جاهزة،
+    وإلا الصورة الأصلية بدون srcset. ما في توليد هون.
+    """
+    path, url = _resolve(source)
+    if not url:
+        return None
+    key = _stat_key(path) if path else None
+    if key is None:
+        return ResponsiveImage(src=url)
+
+    cached = _memo.get(key)
+    metrics.cache_lookup("images", cached is not None)
+    if cached is not None:
+        return cached
+
+    try:
+        manifest = _out_dir(_digest(path, key)) / MANIFEST
+        srcsets = json.loads(manifest.read_text())
+    except FileNotFoundError:
+        return ResponsiveImage(src=url)
+    except (OSError, ValueError):
+        logger.warning("Unreadable image derivatives for %s", path, exc_info=True)
+        return ResponsiveImage(src=url)
+
+    img = _memo[key] = _image(url, {ext: [tuple(row) for row in rows] for ext, rows in srcsets.items()})
+    return img
+
+
+def generate(source) -> Optional[ResponsiveImage]:
+    """
+    بيولّد النسخ (إذا لسا ما انعملت) وبيرجّع ResponsiveImage.
+    للحفظ و build_images، مو للـ templates.
+    """
+    path, url = _resolve(source)
+    key = _stat_key(path) if path else None
+    if not url or key is None:
+        return None
+
+    try:
+        digest = _digest(path, key)
+        with _lock:
+            gen_lock = _gen_locks.setdefault(digest, threading.Lock())
+        with gen_lock:
+            if not (_out_dir(digest) / MANIFEST).exists():
+                _generate(path, digest)
+    except Exception:
+        logger.warning("Could not generate image derivatives for %s", path, exc_info=True)
+        return None
+    _memo.pop(key, None)
+    return responsive(source)
+
+
+def build_all() -> Tuple[int, int]:
+    """
+    كل صور المنتجات والعروض + صور الـ fallback → (جاهزة، فشلت).
+    """
+    sources = list(FALLBACK_STATICS)
+    for model in (Product, Offer):
+        sources.extend(obj.image for obj in model.objects.exclude(image="").only("id", "image"))
+    ok = failed = 0
+    for source in sources:
+        img = generate(source)
+        if img is not None and img.srcsets:
+            ok += 1
+        else:
+            failed += 1
+    return ok, failed
+
+
+def _on_image_owner_save(sender, instance, **kwargs):
+    if not getattr(settings, "MENU_IMAGE_EAGER", True) or not instance.image:
+        return
+    image = instance.image
+    transaction.on_commit(lambda: generate(image))
+
+
+def connect_signals() -> None:
+    from django.db.models.signals import post_save
+
+    for model in (Product, Offer):
+        post_save.connect(_on_image_owner_save, sender=model, dispatch_uid=f"images-save-{model.__name__}")
@@ -0,0 +1,138 @@
+# menu/live.py
+"""
+تحديثات حيّة للوحة الطلبات (delta feed).
+
+- cursor = (updated_at, id) لآخر طلب شافه العميل → منرجع بس الطلبات اللي
+  تغيّرت بعده (keyset على index (updated_at, id)).
+- أي تغيير على طلب بنفس الـ worker بيصحّي المنتظرين فوراً (عدّاد بالذاكرة)،
+  والتغييرات من workers تانية بتنلقط بفحص DB كل LIVE_POLL_INTERVAL ثانية.
+  يعني وقت ما في شي جديد الكلفة تقريباً صفر.
+"""
+import asyncio
+import threading
+import time
+from datetime import datetime, timezone as dt_timezone
+from typing import List, Optional, Tuple
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Q
+
+from .models import Order
+
+DEFAULT_POLL_INTERVAL = 2.0  # ثواني بين فحوصات الـ DB أثناء الانتظار
+MAX_WAIT = 25.0
+MAX_BATCH = 200
+
+Cursor = Tuple[datetime, int]
+
+_cond = threading.Condition()
+_seq = 0
+
+
+def poll_interval() -> float:
+    return float(getattr(settings, "LIVE_POLL_INTERVAL", DEFAULT_POLL_INTERVAL))
+
+
+# -----------------------------
+# إشعارات داخل الـ process
+# -----------------------------
+def current_seq() -> int:
+    return _seq
+
+
+def notify() -> None:
+    global _seq
+    with _cond:
+        _seq += 1
+        _cond.notify_all()
+
+
+def wait_for_change(seq: int, timeout: float) -> int:
+    with _cond:
+        _cond.wait_for(lambda: _seq != seq, timeout=timeout)
+        return _seq
+
+
+async def await_change(seq: int, timeout: float, step: float = 0.25) -> int:
+    # نسخة async: فحص العدّاد بالذاكرة بدون ما نحجز thread
+    deadline = time.monotonic() + timeout
+    while _seq == seq:
+        remaining = deadline - time.monotonic()
+        if remaining <= 0:
+            break
+        await asyncio.sleep(min(step, remaining))
+    return _seq
+
+
+def _on_order_change(sender, **kwargs):
+    transaction.on_commit(notify)
+
+
+def connect_signals() -> None:
+    from django.db.models.signals import post_save, post_delete
+
+    post_save.connect(_on_order_change, sender=Order, dispatch_uid="live-order-save")
+    post_delete.connect(_on_order_change, sender=Order, dispatch_uid="live-order-delete")
+
+
+# -----------------------------
+# cursor
+# -----------------------------
+def encode_cursor(cursor: Optional[Cursor]) -> str:
+    if not cursor:
+        return ""
+    ts, pk = cursor
+    micros = int(ts.timestamp()) * 1_000_000 + ts.microsecond
+    return f"{micros}-{int(pk)}"
+
+
+def decode_cursor(raw: str) -> Optional[Cursor]:
+    try:
+        micros, pk = (raw or "").split("-", 1)
+        micros, pk = int(micros), int(pk)
+        # رقم ضخم من الـ URL → OverflowError/OSError (أو ValueError بعد سنة 9999)
+        ts = datetime.fromtimestamp(micros // 1_000_000, tz=dt_timezone.utc).replace(microsecond=micros % 1_000_000)
+    except (ValueError, OverflowError, OSError):
+        return None
+    return ts, pk
+
+
+def latest_cursor() -> Optional[Cursor]:
+    row = Order.objects.order_by("-updated_at", "-id").values_list("updated_at", "id").first()
+    return tuple(row) if row else None
+
+
+def _after(cursor: Optional[Cursor]):
+    qs = Order.objects.all()
+    if cursor:
+        ts, pk = cursor
+        qs = qs.filter(Q(updated_at__gt=ts) | Q(updated_at=ts, id__gt=pk))
+    return qs.order_by("updated_at", "id")
+
+
+def changed_orders(cursor: Optional[Cursor]) -> List[Order]:
+    return list(_after(cursor).prefetch_related("items")[:MAX_BATCH])
+
+
+def has_changes(cursor: Optional[Cursor]) -> bool:
+    return _after(cursor).exists()
+
+
+async def ahas_changes(cursor: Optional[Cursor]) -> bool:
+    return await _after(cursor).aexists()
+
+
+def wait_for_orders(cursor: Optional[Cursor], timeout: float) -> bool:
+    """
+    long-poll: يرجع True أول ما يصير في تغيير بعد cursor، أو False بعد timeout.
+    """
+    deadline = time.monotonic() + min(max(timeout, 0.0), MAX_WAIT)
+    while True:
+        seq = current_seq()
+        if has_changes(cursor):
+            return True
+        remaining = deadline - time.monotonic()
+        if remaining <= 0:
+            return False
+        wait_for_change(seq, min(poll_interval(), remaining))
@@ -0,0 +1,231 @@
+# menu/loadtest.py
+"""
+محاكاة "ساعة الذروة" من أول مسح الـ QR لحد تتبع الطلب، مع لوحة الموظفين.
+
+كل طاولة افتراضية (thread) بتعمل:
+  /?t=N → home (تصنيف + بحث) → منتج → إضافة للسلة → عروض → تخصيص عرض
+  → السلة → checkout → polling على order_status (مع ETag)
+وبالتوازي موظفين بيفتحوا panel/ وبيسحبوا panel/feed/.
+
+النتيجة: p50/p95/p99 لكل URL name، عدد الاستعلامات لكل طلب، والـ throughput.
+"""
+import json
+import random
+import statistics
+import threading
+import time
+from collections import defaultdict
+from dataclasses import dataclass, asdict
+from typing import Dict, List, Optional
+
+from django.contrib.auth import get_user_model
+from django.db import connection
+from django.test import Client
+from django.test.utils import CaptureQueriesContext
+from django.urls import resolve, reverse
+
+from . import datagen
+from .models import Category, Product, Offer
+
+
+@dataclass
+class LoadConfig:
+    tables: int = 20
+    concurrency: int = 8
+    iterations: int = 2          # كم جولة لكل طاولة
+    staff: int = 2               # تابات لوحة الإدارة
+    staff_polls: int = 30
+    status_polls: int = 3
+    categories: int = 8
+    products: int = 120
+    offers: int = 10
+    seed: int = 42
+
+
+class Recorder:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.samples: Dict[str, List[float]] = defaultdict(list)
+        self.queries: Dict[str, List[int]] = defaultdict(list)
+        self.errors: Dict[str, int] = defaultdict(int)
+
+    def request(self, client: Client, method: str, path: str, data=None, **extra):
+        name = resolve(path.split("?", 1)[0]).url_name or path
+        with CaptureQueriesContext(connection) as ctx:
+            t0 = time.perf_counter()
+            response = getattr(client, method)(path, data or {}, **extra)
+            elapsed = time.perf_counter() - t0
+        with self._lock:
+            self.samples[name].append(elapsed)
+            self.queries[name].append(len(ctx.captured_queries))
+            if response.status_code >= 400:
+                self.errors[name] += 1
+        return response
+
+
+def seed_menu(config: LoadConfig) -> None:
+    """
+    منيو بالحجم المطلوب من مولّد الداتا (حتمي حسب config.seed)، بدون تاريخ طلبات.
+    """
+    datagen.generate(datagen.DataSpec(
+        seed=config.seed,
+        categories=config.categories,
+        products=config.products,
+        offers=config.offers,
+        days=0,
+        open_tables=0,
+    ))
+
+
+def _table_flow(rec: Recorder, config: LoadConfig, table_no: int, rnd: random.Random) -> None:
+    client = Client()
+    cats = list(Category.objects.filter(is_active=True).values_list("slug", flat=True))
+    products = list(
+        Product.objects.filter(is_active=True, category__is_active=True).values_list("slug", flat=True)
+    )
+    offers = list(Offer.objects.filter(is_active=True).values_list("id", "slug"))
+
+    rec.request(client, "get", f"{reverse('landing')}?t={table_no}")
+    for _ in range(config.iterations):
+        rec.request(client, "get", reverse("home"))
+        if cats:
+            rec.request(client, "get", reverse("home"), {"cat": rnd.choice(cats)})
+        rec.request(client, "get", reverse("home"), {"q": rnd.choice(["قهوه", "حليب", "قهو", "1"])})
+
+        if products:
+            slug = rnd.choice(products)
+            rec.request(client, "get", reverse("product_details", args=[slug]))
+            rec.request(client, "post", reverse("cart_add", args=[slug]), {"qty": rnd.randint(1, 3)})
+
+        rec.request(client, "get", reverse("offers"))
+        if offers:
+            oid, oslug = rnd.choice(offers)
+            rec.request(client, "get", reverse("offer_customize", args=[oslug]))
+            rec.request(client, "post", reverse("cart_add_offer", args=[oid]), {"qty": 1, "drink": "قهوة"})
+
+        page = rec.request(client, "get", reverse("cart"))
+        token = page.context.get("submit_token", "") if page.context else ""
+        response = rec.request(client, "post", reverse("checkout"), {
+            "table_no": str(table_no), "note": "", "submit_token": token,
+        })
+        status_url = response.get("Location")
+        if not status_url:
+            continue
+
+        etag = None
+        for _ in range(config.status_polls):
+            extra = {"HTTP_IF_NONE_MATCH": etag} if etag else {}
+            r = rec.request(client, "get", status_url, **extra)
+            etag = r.get("ETag") or etag
+
+
+def _staff_flow(rec: Recorder, config: LoadConfig, user) -> None:
+    client = Client()
+    client.force_login(user)
+    page = rec.request(client, "get", reverse("admin_dashboard"))
+    cursor = page.context.get("cursor", "") if page.context else ""
+    for _ in range(config.staff_polls):
+        r = rec.request(client, "get", reverse("admin_feed"), {"cursor": cursor})
+        if r.status_code == 200:
+            cursor = r.json().get("cursor") or cursor
+        time.sleep(0.05)
+
+
+def _percentile(sorted_values: List[float], pct: float) -> float:
+    if not sorted_values:
+        return 0.0
+    if len(sorted_values) == 1:
+        return sorted_values[0]
+    return statistics.quantiles(sorted_values, n=100, method="inclusive")[int(pct) - 1]
+
+
+def run(config: LoadConfig) -> dict:
+    rnd = random.Random(config.seed)
+    rec = Recorder()
+
+    User = get_user_model()
+    staff_user, _ = User.objects.get_or_create(username="loadtest-staff", defaults={"is_staff": True})
+
+    tables = list(range(1, config.tables + 1))
+    work = threading.Lock()
+
+    def table_worker(worker_seed: int):
+        wrnd = random.Random(worker_seed)
+        try:
+            while True:
+                with work:
+                    if not tables:
+                        return
+                    table_no = tables.pop(0)
+                _table_flow(rec, config, table_no, wrnd)
+        finally:
+            connection.close()
+
+    def staff_worker():
+        try:
+            _staff_flow(rec, config, staff_user)
+        finally:
+            connection.close()
+
+    threads = [
+        threading.Thread(target=table_worker, args=(rnd.randint(0, 1 << 30),))
+        for _ in range(config.concurrency)
+    ] + [threading.Thread(target=staff_worker) for _ in range(config.staff)]
+
+    t0 = time.perf_counter()
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    wall = time.perf_counter() - t0
+
+    urls = {}
+    total = 0
+    for name, samples in sorted(rec.samples.items()):
+        s = sorted(samples)
+        q = rec.queries[name]
+        total += len(s)
+        urls[name] = {
+            "count": len(s),
+            "p50_ms": round(_percentile(s, 50) * 1000, 2),
+            "p95_ms": round(_percentile(s, 95) * 1000, 2),
+            "p99_ms": round(_percentile(s, 99) * 1000, 2),
+            "queries_avg": round(sum(q) / len(q), 2),
+            "queries_max": max(q),
+            "errors": rec.errors.get(name, 0),
+        }
+
+    return {
+        "config": asdict(config),
+        "wall_s": round(wall, 3),
+        "requests": total,
+        "throughput_rps": round(total / wall, 1) if wall else 0.0,
+        "urls": urls,
+    }
+
+
+def compare(report: dict, baseline: dict, threshold: float = 0.2) -> List[str]:
+    """
+    مقارنة مع baseline محفوظ: يرجّع أسطر التراجع (latency أو queries).
+    """
+    regressions = []
+    for name, cur in report["urls"].items():
+        base = baseline.get("urls", {}).get(name)
+        if not base:
+            continue
+        if base["p95_ms"] and cur["p95_ms"] > base["p95_ms"] * (1 + threshold):
+            regressions.append(f"{name}: p95 {base['p95_ms']}ms → {cur['p95_ms']}ms")
+        if cur["queries_avg"] > base["queries_avg"] + 0.5:
+            regressions.append(f"{name}: queries {base['queries_avg']} → {cur['queries_avg']}")
+    base_rps = baseline.get("throughput_rps") or 0
+    if base_rps and report["throughput_rps"] < base_rps * (1 - threshold):
+        regressions.append(f"throughput {base_rps} → {report['throughput_rps']} req/s")
+    return regressions
+
+
+def load_baseline(path) -> Optional[dict]:
+    try:
+        with open(path, encoding="utf-8") as fh:
+            return json.load(fh)
+    except FileNotFoundError:
+        return None
@@ -0,0 +1,203 @@
+"""
+مقارنة سعة الاتصالات المتزامنة بين WSGI (gunicorn sync) و ASGI (uvicorn worker):
+
+    python manage.py bench_asgi                              # بيشغّل السيرفرين لحاله
+    python manage.py bench_asgi --workers 2 --connections 200 --wait 10
+    python manage.py bench_asgi --url http://127.0.0.1:8000  # سيرفر شغّال أصلاً
+
+السيناريو (نفسه للطرفين):
+- N زبون فاتحين صفحة حالة الطلب بـ long-poll (?wait=W مع If-None-Match)
+  → كل واحد بيضل معلّق W ثانية إذا الطلب ما تغيّر.
+- بنفس الوقت زبون جديد بيفتح home/ كم مرة (probe).
+
+مع sync workers كل long-poll بيحجز worker كامل: بس <workers> منهم بيتخدموا سوا
+والباقي بيستنوا بالدور، والـ probe بيستنى معهم. مع ASGI كلهم معلّقين سوا
+والـ probe بيرجع فوراً.
+
+بيستعمل نفس الـ DB تبع الإعدادات؛ لازم يكون في طلب واحد عالأقل (gen_data).
+"""
+import asyncio
+import importlib.util
+import os
+import socket
+import subprocess
+import sys
+import time
+from urllib.parse import urlsplit
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from menu.models import Order
+
+SERVERS = {
+    "wsgi": ["arabella.wsgi:application"],
+    "asgi": ["arabella.asgi:application", "-k", "uvicorn_worker.UvicornWorker"],
+}
+
+
+async def _get(host: str, port: int, path: str, headers=None, timeout: float = 30.0):
+    """
+    GET بسيط (HTTP/1.1، Connection: close) → (status, headers, seconds).
+    """
+    t0 = time.perf_counter()
+
+    async def run():
+        reader, writer = await asyncio.open_connection(host, port)
+        try:
+            lines = [f"GET {path} HTTP/1.1", f"Host: {host}:{port}", "Connection: close"]
+            lines += [f"{k}: {v}" for k, v in (headers or {}).items()]
+            writer.write(("\r\n".join(lines) + "\r\n\r\n").encode())
+            await writer.drain()
+
+            status = int((await reader.readline()).split()[1])
+            resp_headers = {}
+            while True:
+                line = (await reader.readline()).decode("latin-1").strip()
+                if not line:
+                    break
+                k, _, v = line.partition(":")
+                resp_headers[k.strip().lower()] = v.strip()
+            await reader.read()
+            return status, resp_headers
+        finally:
+            writer.close()
+
+    status, resp_headers = await asyncio.wait_for(run(), timeout)
+    return status, resp_headers, time.perf_counter() - t0
+
+
+def _pct(values, q: float) -> float:
+    if not values:
+        return 0.0
+    values = sorted(values)
+    return values[min(len(values) - 1, int(q * len(values)))]
+
+
+async def _scenario(host: str, port: int, order_id: int, connections: int, wait: float, probes: int,
+                    timeout: float) -> dict:
+    status, headers, _ = await _get(host, port, f"/order/status/{order_id}/", timeout=timeout)
+    etag = headers.get("etag")
+    if status != 200 or not etag:
+        raise CommandError(f"order/status/{order_id}/ returned {status} without an ETag")
+
+    path = f"/order/status/{order_id}/?wait={wait:g}"
+    holds = [
+        asyncio.create_task(_get(host, port, path, {"If-None-Match": etag}, timeout=timeout))
+        for _ in range(connections)
+    ]
+    await asyncio.sleep(1.0)  # خلّي الاتصالات تفتح قبل الـ probes
+
+    probe_times, probe_errors = [], 0
+    for _ in range(probes):
+        try:
+            status, _, elapsed = await _get(host, port, "/home/", timeout=timeout)
+        except (OSError, asyncio.TimeoutError):
+            probe_errors += 1
+            continue
+        if status == 200:
+            probe_times.append(elapsed)
+        else:
+            probe_errors += 1
+
+    results = await asyncio.gather(*holds, return_exceptions=True)
+    done = [r[2] for r in results if not isinstance(r, BaseException) and r[0] in (200, 304)]
+    # خُدم بالتوازي = رجع بعد W ثانية تقريباً (مو بعد ما استنى دور)
+    parallel = sum(1 for t in done if t <= wait + 2.0)
+    return {
+        "connections": connections,
+        "parallel": parallel,
+        "queued": len(done) - parallel,
+        "failed": connections - len(done),
+        "hold_p50": _pct(done, 0.50),
+        "hold_max": max(done, default=0.0),
+        "probe_p50": _pct(probe_times, 0.50) * 1000,
+        "probe_p95": _pct(probe_times, 0.95) * 1000,
+        "probe_errors": probe_errors,
+    }
+
+
+def _free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def _wait_ready(port: int, proc: subprocess.Popen, timeout: float = 20.0) -> None:
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if proc.poll() is not None:
+            raise CommandError(f"server exited with code {proc.returncode}")
+        try:
+            with socket.create_connection(("127.0.0.1", port), timeout=0.5):
+                return
+        except OSError:
+            time.sleep(0.2)
+    raise CommandError("server did not start in time")
+
+
+class Command(BaseCommand):
+    help = "Compare concurrent long-poll capacity of the WSGI (sync workers) and ASGI (uvicorn) deployments."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--url", help="benchmark an already running server instead of spawning both")
+        parser.add_argument("--servers", default="wsgi,asgi", help="which servers to spawn (wsgi,asgi)")
+        parser.add_argument("--workers", type=int, default=2, help="gunicorn workers per server")
+        parser.add_argument("--connections", type=int, default=100, help="concurrent long-polls")
+        parser.add_argument("--wait", type=float, default=10.0, help="long-poll wait in seconds")
+        parser.add_argument("--probes", type=int, default=5, help="home/ requests while the long-polls are held")
+        parser.add_argument("--timeout", type=float, default=0, help="per-request timeout (default 3 x wait)")
+        parser.add_argument("--order", type=int, help="order id to poll (default: latest)")
+
+    def handle(self, *args, **opts):
+        order_id = opts["order"] or Order.objects.order_by("-id").values_list("id", flat=True).first()
+        if order_id is None:
+            raise CommandError("no orders to poll; run `python manage.py gen_data` first")
+        timeout = opts["timeout"] or opts["wait"] * 3
+        scenario = (order_id, opts["connections"], opts["wait"], opts["probes"], timeout)
+
+        rows = []
+        if opts["url"]:
+            parts = urlsplit(opts["url"])
+            rows.append((parts.netloc, asyncio.run(_scenario(parts.hostname, parts.port or 80, *scenario))))
+        else:
+            for name in [s.strip() for s in opts["servers"].split(",") if s.strip()]:
+                if name not in SERVERS:
+                    raise CommandError(f"unknown server {name!r} (choose from {', '.join(SERVERS)})")
+                rows.append((name, self._spawn_and_run(name, opts, scenario)))
+
+        self.stdout.write(
+            f"{'server':<22}{'conns':>7}{'parallel':>10}{'queued':>8}{'failed':>8}"
+            f"{'hold p50 s':>12}{'hold max s':>12}{'probe p50 ms':>14}{'probe p95 ms':>14}{'probe err':>11}"
+        )
+        for name, r in rows:
+            self.stdout.write(
+                f"{name:<22}{r['connections']:>7}{r['parallel']:>10}{r['queued']:>8}{r['failed']:>8}"
+                f"{r['hold_p50']:>12.2f}{r['hold_max']:>12.2f}{r['probe_p50']:>14.1f}{r['probe_p95']:>14.1f}"
+                f"{r['probe_errors']:>11}"
+            )
+
+    def _spawn_and_run(self, name: str, opts, scenario) -> dict:
+        if name == "asgi" and importlib.util.find_spec("uvicorn_worker") is None:
+            raise CommandError("the asgi server needs uvicorn-worker (pip install uvicorn-worker)")
+
+        port = _free_port()
+        env = dict(os.environ, ARABELLA_ASYNC_VIEWS="1" if name == "asgi" else "0")
+        cmd = [
+            sys.executable, "-m", "gunicorn", *SERVERS[name],
+            "-w", str(opts["workers"]),
+            "-b", f"127.0.0.1:{port}",
+            "--timeout", str(int(opts["wait"]) + 30),
+            "--log-level", "warning",
+        ]
+        self.stderr.write(f"starting {name}: {' '.join(cmd[2:])}")
+        proc = subprocess.Popen(cmd, cwd=settings.BASE_DIR, env=env)
+        try:
+            _wait_ready(port, proc)
+            return asyncio.run(_scenario("127.0.0.1", port, *scenario))
+        finally:
+            proc.terminate()
+            try:
+                proc.wait(timeout=10)
+            except subprocess.TimeoutExpired:
+                proc.kill()
@@ -0,0 +1,227 @@
+"""
+مقارنة throughput الـ checkout المتزامن بين profiles الـ SQLite (DB_PROFILE):
+
+    python manage.py bench_checkout --writers 8 --readers 4 --duration 5
+
+كل profile بياخد ملف DB مؤقت (migrate كامل) مع نفس إعدادات
+settings.SQLITE_PROFILES[profile]، وبعدين منشغّل processes (متل gunicorn
+workers) كل واحد فيه Django test Client:
+
+- writers: زبون جديد → ?t= طاولة عشوائية → cart_add → صفحة السلة → POST checkout
+  (نفس views.checkout: حجز التوكن، دمج الأسطر، atomic_retry، حفظ الـ session).
+  الوقت المقاس هو POST الـ checkout بس.
+- readers: موظف مسجّل دخول بيفتح لوحة الطلبات.
+
+- plain: إعدادات Django الافتراضية (rollback journal، اتصال لكل طلب)
+- production: SQLITE_PRAGMAS + BEGIN IMMEDIATE + اتصال دائم
+"""
+import copy
+import logging
+import multiprocessing
+import queue
+import random
+import statistics
+import tempfile
+import time
+import traceback
+from pathlib import Path
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections
+from django.test import Client
+from django.test.utils import setup_test_environment, teardown_test_environment
+from django.urls import reverse
+
+from menu.models import Category, Product
+
+PROFILES = tuple(settings.SQLITE_PROFILES)
+PRODUCTS = 20
+STAFF_USERNAME = "bench-staff"
+
+
+def _use_database(path: Path, profile: str) -> dict:
+    """
+    بيوجّه اتصال default لملف مؤقت بإعدادات الـ profile، وبيرجّع القديم.
+    """
+    connections.close_all()
+    db = connections["default"]
+    saved = db.settings_dict
+    config = copy.deepcopy(saved)
+    config.update(NAME=str(path), OPTIONS={}, CONN_MAX_AGE=0, CONN_HEALTH_CHECKS=False)
+    config.update(copy.deepcopy(settings.SQLITE_PROFILES[profile]))
+    db.settings_dict = connections.settings["default"] = config
+    return saved
+
+
+def _restore_database(saved: dict) -> None:
+    connections.close_all()
+    connections["default"].settings_dict = connections.settings["default"] = saved
+
+
+def _seed() -> None:
+    call_command("migrate", verbosity=0, interactive=False)
+    cat = Category.objects.create(name="bench", slug="bench")
+    Product.objects.bulk_create(
+        Product(category=cat, name=f"p{i}", slug=f"p{i}", price_syp=1000 + i) for i in range(PRODUCTS)
+    )
+    get_user_model().objects.create_user(STAFF_USERNAME, is_staff=True)
+
+
+def _checkout(rnd: random.Random, tables: int) -> tuple:
+    """
+    زبون واحد من أول QR لتأكيد الطلب → (نجح؟، ثواني POST الـ checkout أو None
+    إذا وقف قبله).
+    """
+    client = Client(raise_request_exception=False)
+    table_no = str(rnd.randint(1, tables))
+    client.get(reverse("landing"), {"t": table_no})
+    for _ in range(rnd.randint(1, 3)):
+        client.post(reverse("cart_add", args=[f"p{rnd.randrange(PRODUCTS)}"]), {"qty": rnd.randint(1, 2)})
+    cart = client.get(reverse("cart"))
+    if cart.status_code != 200:
+        return False, None
+    token = cart.context["submit_token"]
+
+    t0 = time.perf_counter()
+    response = client.post(reverse("checkout"), {"table_no": table_no, "note": "", "submit_token": token})
+    elapsed = time.perf_counter() - t0
+    ok = response.status_code == 302 and "/order/status/" in response.url
+    return ok, elapsed
+
+
+def _writer(duration, tables, seed, out):
+    rnd = random.Random(seed)
+    latencies, ok, errors, failure = [], 0, 0, None
+    try:
+        deadline = time.monotonic() + duration
+        while time.monotonic() < deadline:
+            # 500 من الـ view (مثلاً "database is locked" بعد كل المحاولات) → done=False
+            done, elapsed = _checkout(rnd, tables)
+            if elapsed is not None:
+                latencies.append(elapsed)
+            if done:
+                ok += 1
+            else:
+                errors += 1
+    except Exception:
+        failure = traceback.format_exc()
+    finally:
+        connections.close_all()
+    out.put(("w", ok, errors, latencies, failure))
+
+
+def _reader(duration, out):
+    ok, errors, failure = 0, 0, None
+    try:
+        client = Client(raise_request_exception=False)
+        client.force_login(get_user_model().objects.get(username=STAFF_USERNAME))
+        deadline = time.monotonic() + duration
+        while time.monotonic() < deadline:
+            if client.get(reverse("admin_dashboard")).status_code == 200:
+                ok += 1
+            else:
+                errors += 1
+    except Exception:
+        failure = traceback.format_exc()
+    finally:
+        connections.close_all()
+    out.put(("r", ok, errors, [], failure))
+
+
+def _collect(out, procs, timeout: float) -> list:
+    """
+    نتيجة من كل process. إذا process مات بدون نتيجة (kill، segfault ...)
+    أو خلص الوقت → CommandError بدل out.get() بيعلّق.
+    """
+    results = []
+    deadline = time.monotonic() + timeout
+    while len(results) < len(procs):
+        try:
+            results.append(out.get(timeout=1.0))
+            continue
+        except queue.Empty:
+            pass
+        dead = [p for p in procs if p.exitcode not in (None, 0)]
+        if dead or time.monotonic() > deadline:
+            for p in procs:
+                if p.is_alive():
+                    p.terminate()
+            reason = f"exit codes {[p.exitcode for p in dead]}" if dead else "timed out"
+            raise CommandError(f"benchmark workers did not report ({reason})")
+    return results
+
+
+class Command(BaseCommand):
+    help = "Benchmark concurrent checkouts through the real views for each SQLite profile (DB_PROFILE)."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--writers", type=int, default=8, help="checkout processes")
+        parser.add_argument("--readers", type=int, default=4, help="dashboard processes")
+        parser.add_argument("--duration", type=float, default=5.0, help="seconds per profile")
+        parser.add_argument("--tables", type=int, default=30)
+        parser.add_argument("--profiles", default=",".join(PROFILES))
+
+    def handle(self, *args, **opts):
+        profiles = [p.strip() for p in opts["profiles"].split(",") if p.strip()]
+        unknown = sorted(set(profiles) - set(PROFILES))
+        if unknown:
+            raise CommandError(f"unknown profile(s) {unknown}; choose from {list(PROFILES)}")
+        ctx = multiprocessing.get_context("fork")
+
+        self.stdout.write(
+            f"{'profile':<12}{'checkouts/s':>12}{'reads/s':>10}{'errors':>8}{'p50 ms':>9}{'p95 ms':>9}{'p99 ms':>9}"
+        )
+        # Client + context الـ templates (submit_token)، والـ metrics لملف مؤقت.
+        # سجلات الطلبات البطيئة والـ retry والـ 500 (بتنعد كأخطاء) بتغطّي الجدول → مسكّرة هون
+        setup_test_environment()
+        saved_metrics_db = settings.METRICS_DB
+        logging.disable(logging.ERROR)
+        try:
+            with tempfile.TemporaryDirectory() as tmp:
+                settings.METRICS_DB = str(Path(tmp) / "metrics.sqlite3")
+                for profile in profiles:
+                    self._run_profile(ctx, Path(tmp) / f"{profile}.sqlite3", profile, opts)
+        finally:
+            logging.disable(logging.NOTSET)
+            settings.METRICS_DB = saved_metrics_db
+            teardown_test_environment()
+
+    def _run_profile(self, ctx, path: Path, profile: str, opts) -> None:
+        saved = _use_database(path, profile)
+        try:
+            _seed()
+            # ولا اتصال مفتوح قبل الـ fork: كل process بيفتح تبعه
+            connections.close_all()
+
+            out = ctx.Queue()
+            procs = [
+                ctx.Process(target=_writer, args=(opts["duration"], opts["tables"], i, out))
+                for i in range(opts["writers"])
+            ] + [
+                ctx.Process(target=_reader, args=(opts["duration"], out))
+                for _ in range(opts["readers"])
+            ]
+            for p in procs:
+                p.start()
+            results = _collect(out, procs, timeout=opts["duration"] + 60)
+            for p in procs:
+                p.join()
+        finally:
+            _restore_database(saved)
+
+        failures = [r[4] for r in results if r[4]]
+        if failures:
+            raise CommandError(f"{len(failures)} benchmark worker(s) failed:\n{failures[0]}")
+
+        writes = sum(r[1] for r in results if r[0] == "w")
+        reads = sum(r[1] for r in results if r[0] == "r")
+        errors = sum(r[2] for r in results)
+        lat = sorted(x * 1000 for r in results for x in r[3]) or [0.0]
+        q = statistics.quantiles(lat, n=100) if len(lat) > 1 else lat * 99
+        self.stdout.write(
+            f"{profile:<12}{writes / opts['duration']:>12.1f}{reads / opts['duration']:>10.1f}"
+            f"{errors:>8}{q[49]:>9.1f}{q[94]:>9.1f}{q[98]:>9.1f}"
+        )
@@ -0,0 +1,22 @@
+"""
+توليد نسخ الصور (WebP / JPEG بعدة عروض) لكل المنتجات والعروض وصور الـ fallback:
+
+    python manage.py build_images
+
+الـ templates ما بتولّد شي وقت الـ render؛ صورة بدون نسخ بتنعرض بحجمها الأصلي.
+الحفظ من الأدمن بيولّد لحاله (MENU_IMAGE_EAGER)، فهاد بس للنشر الأول
+وبعد import_catalog (الـ bulk ما بيطلق signals). الموجود أصلاً بينتخطى.
+"""
+from django.core.management.base import BaseCommand
+
+from menu import images
+
+
+class Command(BaseCommand):
+    help = "Generate responsive image derivatives for all product, offer and fallback images."
+
+    def handle(self, *args, **opts):
+        ok, failed = images.build_all()
+        self.stdout.write(self.style.SUCCESS(f"{ok} images ready"))
+        if failed:
+            self.stderr.write(self.style.WARNING(f"{failed} images could not be processed (see log)"))
@@ -0,0 +1,28 @@
+"""
+تصدير المنيو كامل (تصنيفات + منتجات + عروض):
+
+    python manage.py export_catalog > menu.json
+    python manage.py export_catalog --format csv -o menu.csv
+"""
+from django.core.management.base import BaseCommand
+
+from menu import catalog_io
+
+
+class Command(BaseCommand):
+    help = "Export the full catalog (categories, products, offers) as JSON or CSV."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--format", choices=["json", "csv"], help="default: from --output suffix, else json")
+        parser.add_argument("-o", "--output", help="file path (default: stdout)")
+
+    def handle(self, *args, **opts):
+        fmt = opts["format"] or catalog_io.detect_format(opts["output"])
+        text = catalog_io.dumps(catalog_io.export_data(), fmt)
+
+        if not opts["output"]:
+            self.stdout.write(text, ending="")
+            return
+        with open(opts["output"], "w", encoding="utf-8", newline="") as fh:
+            fh.write(text)
+        self.stderr.write(self.style.SUCCESS(f"Wrote {opts['output']}"))
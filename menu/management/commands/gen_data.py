@@ -0,0 +1,57 @@
+"""
+توليد داتا تجريبية حتمية (نفس --seed = نفس الداتا):
+
+    python manage.py gen_data --products 2000 --days 120 --orders-per-day 300 --tables 80
+    python manage.py gen_data --clear --images
+"""
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from menu import datagen
+
+
+class Command(BaseCommand):
+    help = "Generate a deterministic synthetic menu and order history for performance work."
+
+    def add_arguments(self, parser):
+        d = datagen.DataSpec()
+        parser.add_argument("--seed", type=int, default=d.seed)
+        parser.add_argument("--categories", type=int, default=d.categories)
+        parser.add_argument("--products", type=int, default=d.products)
+        parser.add_argument("--offers", type=int, default=d.offers)
+        parser.add_argument("--images", action="store_true", help="generate JPEG images for products and offers")
+        parser.add_argument("--tables", type=int, default=d.tables)
+        parser.add_argument("--days", type=int, default=d.days, help="days of closed order history")
+        parser.add_argument("--orders-per-day", type=int, default=d.orders_per_day)
+        parser.add_argument("--open-tables", type=int, default=d.open_tables, help="tables with an open order now")
+        parser.add_argument("--batch-size", type=int, default=d.batch_size)
+        parser.add_argument("--prefix", default=d.prefix, help="slug prefix for generated rows")
+        parser.add_argument("--clear", action="store_true", help="delete ALL menu rows and orders first")
+
+    def handle(self, *args, **opts):
+        if opts["categories"] < 1 and (opts["products"] or opts["offers"]):
+            raise CommandError("--categories must be at least 1")
+        spec = datagen.DataSpec(
+            seed=opts["seed"],
+            categories=opts["categories"],
+            products=opts["products"],
+            offers=opts["offers"],
+            images=opts["images"],
+            tables=opts["tables"],
+            days=opts["days"],
+            orders_per_day=opts["orders_per_day"],
+            open_tables=opts["open_tables"],
+            batch_size=opts["batch_size"],
+            prefix=opts["prefix"],
+        )
+        log = lambda m: self.stdout.write(f"  {m}")
+
+        t0 = time.perf_counter()
+        if opts["clear"]:
+            datagen.clear(log)
+        counts = datagen.generate(spec, log)
+        self.stdout.write(self.style.SUCCESS(
+            f"Done in {time.perf_counter() - t0:.1f}s: "
+            + ", ".join(f"{k}={v}" for k, v in counts.items())
+        ))
@@ -0,0 +1,53 @@
+"""
+استيراد المنيو من JSON أو CSV (upsert حسب slug، كله بـ transaction وحدة):
+
+    python manage.py import_catalog menu.json
+    python manage.py import_catalog menu.csv --images ./photos
+    python manage.py import_catalog menu.csv --dry-run
+
+الصور الجديدة بتحتاج نسخها: بيشغّل build_images بالآخر (إلا مع --no-build-images).
+"""
+from pathlib import Path
+
+from django.core.management import call_command
+from django.core.management.base import BaseCommand, CommandError
+from django.db import IntegrityError
+
+from menu import catalog_io
+
+
+class Command(BaseCommand):
+    help = "Import (upsert by slug) categories, products and offers from a JSON or CSV file."
+
+    def add_arguments(self, parser):
+        parser.add_argument("path", help="JSON or CSV file")
+        parser.add_argument("--format", choices=["json", "csv"], help="default: from the file suffix")
+        parser.add_argument("--images", help="directory to take image files from (matched by file name)")
+        parser.add_argument("--dry-run", action="store_true", help="validate and report, write nothing")
+        parser.add_argument("--no-build-images", action="store_true", help="skip generating image derivatives")
+
+    def handle(self, *args, **opts):
+        path = Path(opts["path"])
+        if not path.is_file():
+            raise CommandError(f"file not found: {path}")
+        images = Path(opts["images"]) if opts["images"] else None
+        if images is not None and not images.is_dir():
+            raise CommandError(f"not a directory: {images}")
+
+        fmt = opts["format"] or catalog_io.detect_format(path.name)
+        try:
+            data = catalog_io.loads(path.read_text(encoding="utf-8"), fmt)
+            result = catalog_io.import_data(data, images_dir=images, dry_run=opts["dry_run"])
+        except ValueError as e:
+            raise CommandError(f"cannot parse {path}: {e}")
+        except catalog_io.CatalogImportError as e:
+            for err in e.errors:
+                self.stderr.write(f"  {err}")
+            raise CommandError(f"{len(e.errors)} error(s), nothing imported")
+        except IntegrityError as e:
+            raise CommandError(f"nothing imported: {e}")
+
+        prefix = "[dry-run] " if opts["dry_run"] else ""
+        self.stdout.write(self.style.SUCCESS(f"{prefix}{result.summary()}"))
+        if not opts["dry_run"] and not opts["no_build_images"]:
+            call_command("build_images", stdout=self.stdout, stderr=self.stderr)
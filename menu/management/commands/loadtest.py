@@ -0,0 +1,84 @@
+"""
+    python manage.py loadtest --tables 30 --concurrency 10 --save loadtest-baseline.json
+    python manage.py loadtest --compare loadtest-baseline.json
+
+بيشتغل على DB اختبار مؤقتة (ملف SQLite بنفس إعدادات الـ profile)،
+فما بيلمس db.sqlite3.
+"""
+import json
+import tempfile
+from pathlib import Path
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test.utils import setup_test_environment, teardown_test_environment
+
+from ... import loadtest
+
+
+class Command(BaseCommand):
+    help = "Simulate a dinner rush through the customer and staff flows and report per-URL latency."
+
+    def add_arguments(self, parser):
+        defaults = loadtest.LoadConfig()
+        parser.add_argument("--tables", type=int, default=defaults.tables)
+        parser.add_argument("--concurrency", type=int, default=defaults.concurrency)
+        parser.add_argument("--iterations", type=int, default=defaults.iterations)
+        parser.add_argument("--staff", type=int, default=defaults.staff)
+        parser.add_argument("--staff-polls", type=int, default=defaults.staff_polls)
+        parser.add_argument("--status-polls", type=int, default=defaults.status_polls)
+        parser.add_argument("--categories", type=int, default=defaults.categories)
+        parser.add_argument("--products", type=int, default=defaults.products)
+        parser.add_argument("--offers", type=int, default=defaults.offers)
+        parser.add_argument("--seed", type=int, default=defaults.seed)
+        parser.add_argument("--save", help="write the JSON report here (baseline)")
+        parser.add_argument("--compare", help="compare against a saved JSON baseline")
+        parser.add_argument("--threshold", type=float, default=0.2, help="allowed regression ratio (default 0.2)")
+
+    def handle(self, *args, **opts):
+        config = loadtest.LoadConfig(**{
+            f: opts[f] for f in loadtest.LoadConfig.__dataclass_fields__
+        })
+
+        baseline = None
+        if opts["compare"]:
+            baseline = loadtest.load_baseline(opts["compare"])
+            if baseline is None:
+                raise CommandError(f"Baseline {opts['compare']} not found")
+
+        setup_test_environment()
+        with tempfile.TemporaryDirectory() as tmp:
+            # ملف حقيقي (مو :memory:) حتى الـ threads تتصرف متل workers فعليين
+            connection.settings_dict.setdefault("TEST", {})["NAME"] = str(Path(tmp) / "loadtest.sqlite3")
+            old_name = connection.creation.create_test_db(verbosity=0, autoclobber=True, serialize=False)
+            try:
+                loadtest.seed_menu(config)
+                report = loadtest.run(config)
+            finally:
+                connection.creation.destroy_test_db(old_name, verbosity=0)
+                teardown_test_environment()
+
+        self._print(report)
+
+        if opts["save"]:
+            with open(opts["save"], "w", encoding="utf-8") as fh:
+                json.dump(report, fh, ensure_ascii=False, indent=2)
+            self.stdout.write(f"saved → {opts['save']}")
+
+        if baseline is not None:
+            regressions = loadtest.compare(report, baseline, opts["threshold"])
+            if regressions:
+                for line in regressions:
+                    self.stdout.write(self.style.ERROR(f"REGRESSION {line}"))
+                raise CommandError(f"{len(regressions)} regression(s) against {opts['compare']}")
+            self.stdout.write(self.style.SUCCESS("no regressions against baseline"))
+
+    def _print(self, report):
+        w = self.stdout.write
+        w(f"{'url':<22}{'count':>7}{'p50':>9}{'p95':>9}{'p99':>9}{'q/req':>8}{'q max':>7}{'err':>5}")
+        for name, row in report["urls"].items():
+            w(
+                f"{name:<22}{row['count']:>7}{row['p50_ms']:>9.1f}{row['p95_ms']:>9.1f}{row['p99_ms']:>9.1f}"
+                f"{row['queries_avg']:>8.1f}{row['queries_max']:>7}{row['errors']:>5}"
+            )
+        w(f"{report['requests']} requests in {report['wall_s']}s → {report['throughput_rps']} req/s")
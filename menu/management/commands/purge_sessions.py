@@ -0,0 +1,40 @@
+"""
+مسح الـ sessions المنتهية من django_session على دفعات (بدل clearsessions اللي
+بيمسح كلشي بـ DELETE واحد وبيقفل الكتابة):
+
+    python manage.py purge_sessions                  # cron كل ربع ساعة مثلاً
+    python manage.py purge_sessions --batch 200 --pause 0.1
+    python manage.py purge_sessions --stats          # حجم الجدول بس
+"""
+from django.core.management.base import BaseCommand
+
+from menu import sessions
+
+
+def _size(n) -> str:
+    return "n/a" if n is None else f"{n / 1024:.1f} KiB"
+
+
+class Command(BaseCommand):
+    help = "Delete expired sessions in small batches (and stale checkout claims) and report session table size."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch", type=int, help="rows per delete (default SESSION_PURGE_BATCH)")
+        parser.add_argument("--pause", type=float, default=0.0, help="seconds to sleep between batches")
+        parser.add_argument("--stats", action="store_true", help="only print table stats, delete nothing")
+
+    def handle(self, *args, **opts):
+        before = sessions.stats()
+        self.stdout.write(
+            f"sessions: {before.total} rows, {before.expired} expired, table {_size(before.table_bytes)}"
+        )
+        if opts["stats"]:
+            return
+
+        purged = sessions.purge_expired(batch_size=opts["batch"], pause=opts["pause"])
+        claims = sessions.purge_checkout_claims()
+        after = sessions.stats()
+        self.stdout.write(self.style.SUCCESS(
+            f"purged {purged} expired sessions and {claims} checkout claims; "
+            f"{after.total} rows left, table {_size(after.table_bytes)}"
+        ))
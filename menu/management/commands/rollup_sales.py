@@ -0,0 +1,38 @@
+"""
+إعادة بناء جداول المبيعات اليومية من الطلبات المسلّمة:
+
+    python manage.py rollup_sales                      # كل التاريخ
+    python manage.py rollup_sales --since 2026-01-01 --until 2026-01-31
+"""
+import time
+from datetime import date
+
+from django.core.management.base import BaseCommand, CommandError
+
+from menu import rollups
+
+
+def _date(raw):
+    if not raw:
+        return None
+    try:
+        return date.fromisoformat(raw)
+    except ValueError:
+        raise CommandError(f"invalid date: {raw!r} (expected YYYY-MM-DD)")
+
+
+class Command(BaseCommand):
+    help = "Rebuild the daily sales rollups from delivered orders."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--since", help="first day (YYYY-MM-DD), inclusive")
+        parser.add_argument("--until", help="last day (YYYY-MM-DD), inclusive")
+
+    def handle(self, *args, **opts):
+        since, until = _date(opts["since"]), _date(opts["until"])
+        if since and until and since > until:
+            raise CommandError("--since is after --until")
+
+        t0 = time.perf_counter()
+        rollups.backfill(since, until, log=lambda m: self.stdout.write(f"  {m}"))
+        self.stdout.write(self.style.SUCCESS(f"Done in {time.perf_counter() - t0:.1f}s"))
@@ -0,0 +1,268 @@
+# menu/metrics.py
+"""
+Metrics بصيغة Prometheus بدون APM خارجي.
+
+- كل worker بيجمّع counters/histograms بالذاكرة (dict + lock، شبه مجاني).
+- كل METRICS_FLUSH_INTERVAL ثانية thread بالخلفية (ووقت الـ scrape) بيضيف
+  الفروقات على ملف SQLite مشترك (UPSERT value = value + delta) → المجموع من
+  كل workers gunicorn. الطلب نفسه (وحتى الـ event loop مع ASGI) ما بيلمس الملف.
+- الـ gauges (الطلبات المفتوحة حسب الحالة، حجم الـ sessions) بتنحسب وقت الـ scrape
+  باستعلام GROUP BY واحد.
+"""
+import logging
+import os
+import sqlite3
+import threading
+import time
+from collections import defaultdict
+from typing import Dict, List, Optional, Tuple
+
+from django.conf import settings
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_FLUSH_INTERVAL = 5.0
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+# الوقت بكل حالة طلب (ثواني): من دقيقة لساعتين
+STATUS_BUCKETS = (60, 180, 300, 600, 900, 1200, 1800, 2700, 3600, 7200)
+
+BUCKETS = {
+    "arabella_order_status_duration_seconds": STATUS_BUCKETS,
+}
+
+Labels = Tuple[Tuple[str, str], ...]
+
+HELP = {
+    "arabella_http_request_duration_seconds": ("histogram", "Request latency per URL name."),
+    "arabella_checkout_duration_seconds": ("histogram", "Checkout view duration."),
+    "arabella_order_status_duration_seconds": ("histogram", "Time an order spent in a status before moving on."),
+    "arabella_orders_created_total": ("counter", "Orders opened (a new open order for a table)."),
+    "arabella_cache_requests_total": ("counter", "In-process cache lookups by cache and result."),
+    "arabella_open_orders": ("gauge", "Open orders by status."),
+    "arabella_sessions": ("gauge", "Rows in the session store by state (live / expired)."),
+    "arabella_session_table_bytes": ("gauge", "Disk size of the session table."),
+    "arabella_sessions_purged_total": ("counter", "Expired sessions deleted by the purge job."),
+}
+
+_lock = threading.Lock()
+_counters: Dict[Tuple[str, Labels], float] = defaultdict(float)
+_histograms: Dict[Tuple[str, Labels], List[float]] = {}  # [bucket counts..., +Inf, sum]
+_pending: List[Tuple[str, str, str, float]] = []
+_flusher_pid: Optional[int] = None
+_local = threading.local()
+
+
+def enabled() -> bool:
+    return bool(getattr(settings, "METRICS_ENABLED", True))
+
+
+def _labels(labels: dict) -> Labels:
+    return tuple(sorted((k, str(v)) for k, v in labels.items()))
+
+
+def inc(name: str, value: float = 1.0, **labels) -> None:
+    if not enabled():
+        return
+    with _lock:
+        _counters[(name, _labels(labels))] += value
+    _start_flusher()
+
+
+def observe(name: str, seconds: float, **labels) -> None:
+    if not enabled():
+        return
+    key = (name, _labels(labels))
+    with _lock:
+        bounds = BUCKETS.get(name, LATENCY_BUCKETS)
+        h = _histograms.get(key)
+        if h is None:
+            h = _histograms[key] = [0.0] * (len(bounds) + 2)
+        for i, le in enumerate(bounds):
+            if seconds <= le:
+                h[i] += 1
+                break
+        else:
+            h[len(bounds)] += 1
+        h[-1] += seconds
+    _start_flusher()
+
+
+def cache_lookup(cache_name: str, hit: bool) -> None:
+    inc("arabella_cache_requests_total", cache=cache_name, result="hit" if hit else "miss")
+
+
+# -----------------------------
+# الملف المشترك بين الـ workers
+# -----------------------------
+def _db() -> sqlite3.Connection:
+    path = str(getattr(settings, "METRICS_DB", settings.BASE_DIR / "metrics.sqlite3"))
+    conn = getattr(_local, "conn", None)
+    if conn is None or _local.path != path:
+        conn = sqlite3.connect(path, timeout=5, isolation_level=None)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        conn.execute(
+            "CREATE TABLE IF NOT EXISTS samples ("
+            " name TEXT NOT NULL, labels TEXT NOT NULL, le TEXT NOT NULL, value REAL NOT NULL,"
+            " PRIMARY KEY (name, labels, le))"
+        )
+        _local.conn, _local.path = conn, path
+    return conn
+
+
+def _encode(labels: Labels) -> str:
+    return ",".join(f'{k}="{_escape(v)}"' for k, v in labels)
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def flush_interval() -> float:
+    return float(getattr(settings, "METRICS_FLUSH_INTERVAL", DEFAULT_FLUSH_INTERVAL))
+
+
+def _start_flusher() -> None:
+    """
+    بيشغّل thread الـ flush مرة بكل process (بعد fork الـ thread ما بينتقل للـ worker).
+    """
+    global _flusher_pid
+    pid = os.getpid()
+    if _flusher_pid == pid:
+        return
+    with _lock:
+        if _flusher_pid == pid:
+            return
+        _flusher_pid = pid
+        threading.Thread(target=_run, name="metrics-flush", daemon=True).start()
+
+
+def _run() -> None:
+    while True:
+        time.sleep(max(flush_interval(), 0.5))
+        try:
+            flush()
+        except Exception:
+            logger.exception("metrics flush failed")
+
+
+def flush() -> None:
+    """
+    نقل الفروقات من الذاكرة للملف المشترك (transaction وحدة).
+    لو الملف مقفول، الفروقات بترجع للدفعة الجاية.
+    """
+    with _lock:
+        rows = list(_pending)
+        _pending.clear()
+        rows.extend((name, _encode(labels), "", value) for (name, labels), value in _counters.items() if value)
+        for (name, labels), h in _histograms.items():
+            enc = _encode(labels)
+            bounds = [repr(float(le)) for le in BUCKETS.get(name, LATENCY_BUCKETS)] + ["+Inf"]
+            rows.extend((name, enc, le, count) for le, count in zip(bounds, h[:-1]) if count)
+            rows.append((name, enc, "sum", h[-1]))
+        _counters.clear()
+        _histograms.clear()
+    if not rows:
+        return
+
+    try:
+        conn = _db()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            conn.executemany(
+                "INSERT INTO samples (name, labels, le, value) VALUES (?, ?, ?, ?) "
+                "ON CONFLICT (name, labels, le) DO UPDATE SET value = value + excluded.value",
+                rows,
+            )
+            conn.execute("COMMIT")
+        except sqlite3.Error:
+            conn.execute("ROLLBACK")
+            raise
+    except sqlite3.Error:
+        with _lock:
+            _pending.extend(rows)
+
+
+def _stored() -> Dict[str, Dict[str, Dict[str, float]]]:
+    """
+    {name: {labels: {le: value}}} من الملف المشترك.
+    """
+    data: Dict[str, Dict[str, Dict[str, float]]] = defaultdict(lambda: defaultdict(dict))
+    for name, labels, le, value in _db().execute("SELECT name, labels, le, value FROM samples"):
+        data[name][labels][le] = value
+    return data
+
+
+def _gauges() -> List[Tuple[str, str, float]]:
+    from django.db.models import Count
+
+    from .models import Order, TableState
+
+    rows = []
+    open_by_status = dict(
+        TableState.objects.filter(order__isnull=False)
+        .values_list("status")
+        .annotate(n=Count("pk"))
+    )
+    for status in Order.Status.values:
+        if status in Order.CLOSED_STATUSES:
+            continue
+        rows.append(("arabella_open_orders", _encode(_labels({"status": status})), open_by_status.get(status, 0)))
+
+    from . import sessions
+
+    if sessions.db_backed():
+        st = sessions.stats()
+        rows.append(("arabella_sessions", _encode(_labels({"state": "live"})), st.total - st.expired))
+        rows.append(("arabella_sessions", _encode(_labels({"state": "expired"})), st.expired))
+        if st.table_bytes is not None:
+            rows.append(("arabella_session_table_bytes", "", st.table_bytes))
+    return rows
+
+
+def _series(name: str, labels: str, value: float, extra: str = "") -> str:
+    parts = ",".join(x for x in (labels, extra) if x)
+    value = int(value) if float(value).is_integer() else repr(float(value))
+    return f"{name}{{{parts}}} {value}" if parts else f"{name} {value}"
+
+
+def render() -> str:
+    """
+    نص Prometheus (text format 0.0.4) لكل الـ workers.
+    """
+    flush()
+    stored = _stored()
+    out: List[str] = []
+
+    def header(name):
+        kind, help_text = HELP.get(name, ("untyped", name))
+        out.append(f"# HELP {name} {help_text}")
+        out.append(f"# TYPE {name} {kind}")
+
+    for name in sorted(stored):
+        header(name)
+        kind = HELP.get(name, ("untyped",))[0]
+        for labels, values in sorted(stored[name].items()):
+            if kind != "histogram":
+                out.append(_series(name, labels, values.get("", 0)))
+                continue
+            # كل الـ buckets (حتى الفاضية) حتى تبقى السلاسل ثابتة
+            by_le = {float(le): v for le, v in values.items() if le not in ("+Inf", "sum")}
+            bounds = sorted(set(by_le) | set(BUCKETS.get(name, LATENCY_BUCKETS)))
+            running = 0.0
+            for le in bounds:
+                running += by_le.get(le, 0)
+                out.append(_series(f"{name}_bucket", labels, running, f'le="{le:g}"'))
+            running += values.get("+Inf", 0)
+            out.append(_series(f"{name}_bucket", labels, running, 'le="+Inf"'))
+            out.append(_series(f"{name}_sum", labels, values.get("sum", 0)))
+            out.append(_series(f"{name}_count", labels, running))
+
+    gauges = defaultdict(list)
+    for name, labels, value in _gauges():
+        gauges[name].append((labels, value))
+    for name, rows in gauges.items():
+        header(name)
+        out.extend(_series(name, labels, value) for labels, value in rows)
+
+    return "\n".join(out) + "\n"
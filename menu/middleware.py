@@ -0,0 +1,300 @@
+# menu/middleware.py
+"""
+قياس وين بيروح وقت كل طلب:
+
+- Server-Timing header: total / db (مع عدد الاستعلامات) / tpl / session
+  → بيبين مباشرة بالـ DevTools (Network → Timing).
+- histogram لوقت الطلب حسب URL name (menu/metrics.py).
+- لو الطلب أبطأ من PROFILING_SLOW_MS → سطر JSON بالـ logger "menu.slow_requests"
+  فيه أبطأ الاستعلامات، ولو الطلب كان ضمن العيّنة (PROFILING_SAMPLE_RATE)
+  منحفظ dump تبع cProfile بـ PROFILING_DUMP_DIR.
+
+الكلفة لما ما في عيّنة: execute_wrapper واحد + كم perf_counter.
+
+مع ASGI (ASYNC_VIEWS) الـ middleware بيشتغل async كمان حتى ما ينلف كل view
+بـ async_to_sync. بهالحالة الاستعلامات بتتنفذ على thread تاني (sync_to_async)
+فما منقدر نقيسها من هون: الـ Server-Timing بدون db، وما في cProfile.
+"""
+import cProfile
+import contextvars
+import functools
+import json
+import logging
+import random
+import time
+from collections import defaultdict
+from importlib import import_module
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connection
+from django.urls import Resolver404, resolve
+from whitenoise.middleware import WhiteNoiseMiddleware as _WhiteNoiseMiddleware
+
+from . import cart, metrics, table
+
+logger = logging.getLogger("menu.slow_requests")
+
+DEFAULT_SLOW_MS = 500
+DEFAULT_SAMPLE_RATE = 0.01
+DEFAULT_TOP_QUERIES = 5
+
+
+class _Timings:
+    __slots__ = ("db", "queries", "tpl", "session", "_depth")
+
+    def __init__(self):
+        self.db = 0.0
+        self.queries: List[Tuple[float, str]] = []
+        self.tpl = 0.0
+        self.session = 0.0
+        self._depth: Dict[str, int] = defaultdict(int)
+
+
+_current: contextvars.ContextVar[Optional[_Timings]] = contextvars.ContextVar("request_timings", default=None)
+_instrumented = set()
+
+
+def _instrument(cls, attr: str, bucket: str) -> None:
+    """
+    لف method (render / load / save) ليضيف وقتها على الطلب الحالي.
+    النداءات المتداخلة بتنحسب مرة وحدة.
+    """
+    key = (cls, attr)
+    if key in _instrumented:
+        return
+    _instrumented.add(key)
+    original = getattr(cls, attr)
+
+    @functools.wraps(original)
+    def timed(*args, **kwargs):
+        t = _current.get()
+        if t is None or t._depth[bucket]:
+            return original(*args, **kwargs)
+        t._depth[bucket] += 1
+        t0 = time.perf_counter()
+        try:
+            return original(*args, **kwargs)
+        finally:
+            setattr(t, bucket, getattr(t, bucket) + time.perf_counter() - t0)
+            t._depth[bucket] -= 1
+
+    setattr(cls, attr, timed)
+
+
+def _ms(seconds: float) -> float:
+    return round(seconds * 1000, 2)
+
+
+class RequestProfilingMiddleware:
+    """
+    لازم يكون أول عنصر بـ MIDDLEWARE حتى يشمل حفظ الـ session.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        if not getattr(settings, "PROFILING_ENABLED", True):
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        self.server_timing = getattr(settings, "PROFILING_SERVER_TIMING", True)
+        self.slow_s = float(getattr(settings, "PROFILING_SLOW_MS", DEFAULT_SLOW_MS)) / 1000
+        self.sample_rate = float(getattr(settings, "PROFILING_SAMPLE_RATE", DEFAULT_SAMPLE_RATE))
+        self.top_n = int(getattr(settings, "PROFILING_TOP_QUERIES", DEFAULT_TOP_QUERIES))
+        dump_dir = getattr(settings, "PROFILING_DUMP_DIR", None)
+        self.dump_dir = Path(dump_dir) if dump_dir else None
+
+        from django.template.backends.django import Template
+
+        _instrument(Template, "render", "tpl")
+        store = import_module(settings.SESSION_ENGINE).SessionStore
+        _instrument(store, "load", "session")
+        _instrument(store, "save", "session")
+
+        self.is_async = iscoroutinefunction(get_response)
+        if self.is_async:
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if self.is_async:
+            return self.__acall__(request)
+
+        timings = _Timings()
+        token = _current.set(timings)
+
+        def record(execute, sql, params, many, context):
+            t0 = time.perf_counter()
+            try:
+                return execute(sql, params, many, context)
+            finally:
+                elapsed = time.perf_counter() - t0
+                timings.db += elapsed
+                timings.queries.append((elapsed, sql))
+
+        profiler = cProfile.Profile() if self.dump_dir and random.random() < self.sample_rate else None
+        t0 = time.perf_counter()
+        try:
+            with connection.execute_wrapper(record):
+                if profiler is not None:
+                    response = profiler.runcall(self.get_response, request)
+                else:
+                    response = self.get_response(request)
+        finally:
+            _current.reset(token)
+        total = time.perf_counter() - t0
+        return self._finish(request, response, total, timings, profiler)
+
+    async def __acall__(self, request):
+        timings = _Timings()
+        token = _current.set(timings)
+        t0 = time.perf_counter()
+        try:
+            response = await self.get_response(request)
+        finally:
+            _current.reset(token)
+        total = time.perf_counter() - t0
+        return self._finish(request, response, total, timings, None, with_db=False)
+
+    def _finish(self, request, response, total: float, timings: _Timings, profiler, with_db: bool = True):
+        match = getattr(request, "resolver_match", None)
+        metrics.observe(
+            "arabella_http_request_duration_seconds",
+            total,
+            url_name=(match.url_name if match else None) or "unmatched",
+            method=request.method,
+        )
+
+        if self.server_timing:
+            parts = [f"total;dur={_ms(total)}"]
+            if with_db:
+                parts.append(f'db;dur={_ms(timings.db)};desc="{len(timings.queries)} queries"')
+            parts += [f"tpl;dur={_ms(timings.tpl)}", f"session;dur={_ms(timings.session)}"]
+            response["Server-Timing"] = ", ".join(parts)
+
+        if total >= self.slow_s:
+            self._log_slow(request, response, total, timings, profiler, with_db)
+        return response
+
+    def _top_queries(self, timings: _Timings) -> List[dict]:
+        grouped: Dict[str, List[float]] = defaultdict(list)
+        for elapsed, sql in timings.queries:
+            grouped[sql].append(elapsed)
+        rows = sorted(grouped.items(), key=lambda kv: sum(kv[1]), reverse=True)[: self.top_n]
+        return [{"ms": _ms(sum(d)), "count": len(d), "sql": sql[:500]} for sql, d in rows]
+
+    def _log_slow(self, request, response, total: float, timings: _Timings, profiler, with_db: bool) -> None:
+        try:
+            url_name = resolve(request.path_info).url_name
+        except Resolver404:
+            url_name = None
+
+        record = {
+            "method": request.method,
+            "path": request.path,
+            "url_name": url_name,
+            "status": response.status_code,
+            "total_ms": _ms(total),
+            "db_ms": _ms(timings.db),
+            "queries": len(timings.queries),
+            "tpl_ms": _ms(timings.tpl),
+            "session_ms": _ms(timings.session),
+            "top_queries": self._top_queries(timings),
+        }
+        if not with_db:
+            for key in ("db_ms", "queries", "top_queries"):
+                del record[key]
+        if profiler is not None:
+            self.dump_dir.mkdir(parents=True, exist_ok=True)
+            path = self.dump_dir / f"{time.strftime('%Y%m%d-%H%M%S')}-{url_name or 'request'}-{id(request):x}.prof"
+            profiler.dump_stats(str(path))
+            record["profile"] = str(path)
+        logger.warning(json.dumps(record, ensure_ascii=False))
+
+
+class WhiteNoiseMiddleware(_WhiteNoiseMiddleware):
+    """
+    WhiteNoise الأصلي sync بس، ولأنه آخر middleware كان رح يجبر كل view async
+    تنلف بـ async_to_sync. البحث عن الملف الثابت بالذاكرة، فنفس المنطق بالنسختين.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response=None, *args, **kwargs):
+        super().__init__(get_response, *args, **kwargs)
+        self.is_async = iscoroutinefunction(get_response)
+        if self.is_async:
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if self.is_async:
+            return self.__acall__(request)
+        return super().__call__(request)
+
+    async def __acall__(self, request):
+        if self.autorefresh:
+            static_file = self.find_file(request.path_info)
+        else:
+            static_file = self.files.get(request.path_info)
+        if static_file is not None:
+            return self.serve(static_file, request)
+        return await self.get_response(request)
+
+
+class TableCookieMiddleware:
+    """
+    بيحط كوكي رقم الطاولة (menu/table.py) لما الزائر ما عنده session.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.is_async = iscoroutinefunction(get_response)
+        if self.is_async:
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if self.is_async:
+            return self.__acall__(request)
+        response = self.get_response(request)
+        table.apply_cookie(request, response)
+        return response
+
+    async def __acall__(self, request):
+        response = await self.get_response(request)
+        table.apply_cookie(request, response)
+        return response
+
+
+class CartStoreMiddleware:
+    """
+    بيحفظ السلة بعد الـ view حسب CART_STORE (menu/cart.py): مع "cookie" بيحط الكوكي،
+    ومع "session" ما في شي (SessionMiddleware بيحفظ). لازم يكون بعد SessionMiddleware.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.is_async = iscoroutinefunction(get_response)
+        if self.is_async:
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if self.is_async:
+            return self.__acall__(request)
+        response = self.get_response(request)
+        cart.save_store(request, response)
+        return response
+
+    async def __acall__(self, request):
+        response = await self.get_response(request)
+        cart.save_store(request, response)
+        return response
@@ -0,0 +1,44 @@
+# Generated by Django 5.2.9 on 2026-10-17 17:59
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+CLOSED = ("delivered", "canceled")
+
+
+def backfill_table_states(apps, schema_editor):
+    Order = apps.get_model("menu", "Order")
+    TableState = apps.get_model("menu", "TableState")
+
+    latest = {}
+    for o in Order.objects.exclude(status__in=CLOSED).order_by("table_no", "-created_at"):
+        latest.setdefault(o.table_no, o)
+
+    TableState.objects.bulk_create([
+        TableState(table_no=table_no, order=o, status=o.status)
+        for table_no, o in latest.items()
+    ])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('menu', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='TableState',
+            fields=[
+                ('table_no', models.CharField(max_length=20, primary_key=True, serialize=False)),
+                ('status', models.CharField(blank=True, choices=[('new', 'NEW'), ('preparing', 'PREPARING'), ('ready', 'READY'), ('delivered', 'DELIVERED'), ('canceled', 'CANCELED')], max_length=20)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('order', models.OneToOneField(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='table_state', to='menu.order')),
+            ],
+            options={
+                'ordering': ['table_no'],
+            },
+        ),
+        migrations.RunPython(backfill_table_states, migrations.RunPython.noop),
+    ]
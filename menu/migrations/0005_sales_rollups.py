@@ -0,0 +1,60 @@
+# Generated by Django 5.2.9 on 2026-10-17 18:17
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('menu', '0004_order_history_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='order',
+            name='in_rollups',
+            field=models.BooleanField(default=False),
+        ),
+        migrations.CreateModel(
+            name='DailyItemSales',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('day', models.DateField()),
+                ('item_key', models.CharField(max_length=40)),
+                ('item_type', models.CharField(choices=[('product', 'PRODUCT'), ('offer', 'OFFER')], max_length=20)),
+                ('name', models.CharField(max_length=140)),
+                ('qty', models.PositiveIntegerField(default=0)),
+                ('orders', models.PositiveIntegerField(default=0)),
+                ('revenue_syp', models.PositiveBigIntegerField(default=0)),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('day', 'item_key'), name='daily_item_sales_uniq')],
+            },
+        ),
+        migrations.CreateModel(
+            name='DailyTableSales',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('day', models.DateField()),
+                ('table_no', models.CharField(max_length=20)),
+                ('orders', models.PositiveIntegerField(default=0)),
+                ('revenue_syp', models.PositiveBigIntegerField(default=0)),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('day', 'table_no'), name='daily_table_sales_uniq')],
+            },
+        ),
+        migrations.CreateModel(
+            name='HourlySales',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('day', models.DateField()),
+                ('hour', models.PositiveSmallIntegerField()),
+                ('orders', models.PositiveIntegerField(default=0)),
+                ('revenue_syp', models.PositiveBigIntegerField(default=0)),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('day', 'hour'), name='hourly_sales_uniq')],
+            },
+        ),
+    ]
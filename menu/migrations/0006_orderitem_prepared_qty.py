@@ -0,0 +1,18 @@
+# Generated by Django 5.2.9 on 2026-10-17 18:29
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('menu', '0005_sales_rollups'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='orderitem',
+            name='prepared_qty',
+            field=models.PositiveIntegerField(default=0),
+        ),
+    ]
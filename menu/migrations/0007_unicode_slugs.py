@@ -0,0 +1,28 @@
+# Generated by Django 5.2.9 on 2026-10-17 18:54
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('menu', '0006_orderitem_prepared_qty'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='category',
+            name='slug',
+            field=models.SlugField(allow_unicode=True, max_length=90, unique=True),
+        ),
+        migrations.AlterField(
+            model_name='offer',
+            name='slug',
+            field=models.SlugField(allow_unicode=True, blank=True, max_length=140, unique=True),
+        ),
+        migrations.AlterField(
+            model_name='product',
+            name='slug',
+            field=models.SlugField(allow_unicode=True, max_length=140, unique=True),
+        ),
+    ]
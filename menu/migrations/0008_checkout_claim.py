@@ -0,0 +1,23 @@
+# Generated by Django 5.2.9 on 2026-10-17 18:56
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('menu', '0007_unicode_slugs'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CheckoutClaim',
+            fields=[
+                ('token', models.CharField(max_length=64, primary_key=True, serialize=False)),
+                ('digest', models.CharField(max_length=40)),
+                ('updated_at', models.DateTimeField(auto_now=True, db_index=True)),
+                ('order', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='+', to='menu.order')),
+            ],
+        ),
+    ]
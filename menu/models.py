@@ -1,11 +1,12 @@
 from django.db import models
 from django.utils import timezone
-from django.utils.text import slugify
+
+from .slugs import slug_base, taken_slugs, unique_slug
 
 
 class Category(models.Model):
     name = models.CharField(max_length=80, unique=True)
-    slug = models.SlugField(max_length=90, unique=True, db_index=True)
+    slug = models.SlugField(max_length=90, unique=True, db_index=True, allow_unicode=True)
     order = models.PositiveIntegerField(default=0)
     is_active = models.BooleanField(default=True)
 
@@ -19,7 +20,7 @@ class Category(models.Model):
 class Product(models.Model):
     category = models.ForeignKey(Category, on_delete=models.PROTECT, related_name="products")
     name = models.CharField(max_length=120)
-    slug = models.SlugField(max_length=140, unique=True, db_index=True)
+    slug = models.SlugField(max_length=140, unique=True, db_index=True, allow_unicode=True)
     description = models.CharField(max_length=220, blank=True)
     price_syp = models.PositiveIntegerField()
     image = models.ImageField(upload_to="products/", blank=True, null=True)
@@ -42,7 +43,7 @@ class Offer(models.Model):
     order = models.PositiveIntegerField(default=0)
 
     # slug لازم يكون موجود ومميز
-    slug = models.SlugField(max_length=140, unique=True, db_index=True, blank=True)
+    slug = models.SlugField(max_length=140, unique=True, db_index=True, blank=True, allow_unicode=True)
 
     class Meta:
         ordering = ["order", "title"]
@@ -54,14 +55,9 @@ class Offer(models.Model):
         - بدون super مرتين
         """
         if not self.slug:
-            base = slugify(self.title) or "offer"
-            candidate = base
-            i = 2
-            # تأكد من uniqueness
-            while Offer.objects.filter(slug=candidate).exclude(pk=self.pk).exists():
-                candidate = f"{base}-{i}"
-                i += 1
-            self.slug = candidate
+            base = slug_base(self.title, "offer")
+            # تأكد من uniqueness: كل الـ slugs المشابهة باستعلام واحد
+            self.slug = unique_slug(base, taken_slugs(Offer, [base], exclude_pk=self.pk))
 
         super().save(*args, **kwargs)
 
@@ -77,18 +73,137 @@ class Order(models.Model):
         DELIVERED = "delivered", "DELIVERED"
         CANCELED = "canceled", "CANCELED"
 
-    table_no = models.CharField(max_length=20, db_index=True)
+    # الـ index على table_no صار جزء من order_table_created_idx
+    table_no = models.CharField(max_length=20)
     status = models.CharField(max_length=20, choices=Status.choices, default=Status.NEW)
     note = models.CharField(max_length=400, blank=True)
     total_syp = models.PositiveIntegerField(default=0)
 
     created_at = models.DateTimeField(default=timezone.now)
     updated_at = models.DateTimeField(auto_now=True)
+    # آخر تغيير حالة (updated_at بيتغيّر مع كل دمج/تعديل). None = من وقت الإنشاء
+    status_changed_at = models.DateTimeField(null=True, blank=True)
+
+    # انحسب بجداول المبيعات اليومية (menu/rollups.py) → ما بينعد مرتين
+    in_rollups = models.BooleanField(default=False)
+
+    CLOSED_STATUSES = (Status.DELIVERED, Status.CANCELED)
+
+    class Meta:
+        indexes = [
+            # cursor لوحة الطلبات (live feed)
+            models.Index(fields=["updated_at", "id"], name="order_updated_cursor_idx"),
+            # سجل الطلبات (menu/history.py): keyset على (created_at, id) مع/بدون فلتر
+            models.Index(fields=["created_at", "id"], name="order_created_cursor_idx"),
+            models.Index(fields=["status", "created_at", "id"], name="order_status_created_idx"),
+            models.Index(fields=["table_no", "created_at", "id"], name="order_table_created_idx"),
+            # الطلبات المفتوحة بس (جزء صغير من الجدول)
+            models.Index(
+                fields=["table_no", "created_at"],
+                name="order_open_idx",
+                condition=models.Q(status__in=["new", "preparing", "ready"]),
+            ),
+        ]
+
+    @property
+    def is_closed(self) -> bool:
+        return self.status in self.CLOSED_STATUSES
+
+    @property
+    def status_since(self):
+        """
+        من إيمتى الطلب بحالته الحالية (None إذا الطلب أقدم من status_changed_at
+        وتغيّرت حالته قبل — ما منعرف).
+        """
+        if self.status_changed_at:
+            return self.status_changed_at
+        return self.created_at if self.status == self.Status.NEW else None
 
     def __str__(self) -> str:
         return f"Order #{self.id} - Table {self.table_no}"
 
 
+class TableState(models.Model):
+    """
+    سجل الطاولات: الطلب المفتوح الحالي لكل طاولة (إن وجد).
+    بينحدّث مع checkout وتغيير الحالة من اللوحة، فالتحقق من
+    "في طلب مفتوح؟" صار lookup واحد على الـ primary key.
+    """
+    table_no = models.CharField(max_length=20, primary_key=True)
+    order = models.OneToOneField(
+        Order, on_delete=models.SET_NULL, null=True, blank=True, related_name="table_state"
+    )
+    status = models.CharField(max_length=20, choices=Order.Status.choices, blank=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        ordering = ["table_no"]
+
+    @property
+    def is_open(self) -> bool:
+        return self.order_id is not None
+
+    @classmethod
+    def open_order_id(cls, table_no: str):
+        return (
+            cls.objects
+            .filter(pk=table_no, order__isnull=False)
+            .values_list("order_id", flat=True)
+            .first()
+        )
+
+    @classmethod
+    def busy_with_other(cls, order: Order) -> bool:
+        """
+        للطاولة طلب مفتوح غير هاد؟ (إعادة فتح طلب مسكّر لازم ترفض وقتها)
+        """
+        return cls.open_order_id(order.table_no) not in (None, order.id)
+
+    @classmethod
+    def sync(cls, order: Order) -> bool:
+        """
+        لازم تنادى جوّا نفس الـ transaction اللي غيّرت الطلب.
+        طلب مفتوح بياخد الطاولة بس إذا ما إلها طلب مفتوح أو هي أصلاً عليه —
+        غير هيك (إعادة فتح طلب قديم) ما منلمس الطاولة ومنرجّع False.
+        """
+        now = timezone.now()
+        if order.is_closed:
+            # نسكّر الطاولة بس إذا هاد هو طلبها المفتوح الحالي
+            cls.objects.filter(pk=order.table_no, order_id=order.id).update(
+                order=None, status=order.status, updated_at=now
+            )
+            return True
+        updated = (
+            cls.objects
+            .filter(models.Q(order__isnull=True) | models.Q(order_id=order.id), pk=order.table_no)
+            .update(order=order, status=order.status, updated_at=now)
+        )
+        if updated:
+            return True
+        _, created = cls.objects.get_or_create(
+            table_no=order.table_no, defaults={"order": order, "status": order.status}
+        )
+        return created
+
+    def __str__(self) -> str:
+        return f"Table {self.table_no} ({self.status or '-'})"
+
+
+class CheckoutClaim(models.Model):
+    """
+    توكن فورم التأكيد اللي انبعت (واحد لكل توكن بسبب الـ primary key).
+    بينكتب بنفس transaction الطلب، فالإرسال المكرر من أي worker بيستنى
+    قفل الـ DB وبعدين بيلاقي الطلب الأول بدل ما يكتب مرة تانية.
+    """
+    token = models.CharField(max_length=64, primary_key=True)
+    digest = models.CharField(max_length=40)
+    order = models.ForeignKey(Order, on_delete=models.CASCADE, null=True, blank=True, related_name="+")
+    updated_at = models.DateTimeField(auto_now=True, db_index=True)
+
+    def __str__(self) -> str:
+        return f"{self.token} → {self.order_id or '-'}"
+
+
 class OrderItem(models.Model):
     class ItemType(models.TextChoices):
         PRODUCT = "product", "PRODUCT"
@@ -109,9 +224,70 @@ class OrderItem(models.Model):
     # ملاحظات تخصيص لكل سطر (خصوصاً للعروض)
     note_snapshot = models.CharField(max_length=400, blank=True)
 
+    # كم قطعة جهزت بالمطبخ/البار (menu/prep.py)
+    prepared_qty = models.PositiveIntegerField(default=0)
+
     @property
     def line_total(self) -> int:
         return int(self.price_syp_snapshot) * int(self.qty)
 
+    @property
+    def pending_qty(self) -> int:
+        return max(int(self.qty) - int(self.prepared_qty), 0)
+
     def __str__(self) -> str:
         return f"{self.name_snapshot} x{self.qty}"
+
+
+# -----------------------------
+# مبيعات يومية (menu/rollups.py)
+# بتنحدّث بالزيادة لما الطلب يصير DELIVERED، فالتقارير بتقرا
+# صفوف (يوم × صنف) بدل ما تجمع كل OrderItem من أول التاريخ.
+# -----------------------------
+class DailyItemSales(models.Model):
+    day = models.DateField()
+    # "product:12" / "offer:3" (ولو الصنف انحذف بيضل الاسم)
+    item_key = models.CharField(max_length=40)
+    item_type = models.CharField(max_length=20, choices=OrderItem.ItemType.choices)
+    name = models.CharField(max_length=140)
+    qty = models.PositiveIntegerField(default=0)
+    orders = models.PositiveIntegerField(default=0)
+    revenue_syp = models.PositiveBigIntegerField(default=0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=["day", "item_key"], name="daily_item_sales_uniq"),
+        ]
+
+    def __str__(self) -> str:
+        return f"{self.day} {self.name} x{self.qty}"
+
+
+class DailyTableSales(models.Model):
+    day = models.DateField()
+    table_no = models.CharField(max_length=20)
+    orders = models.PositiveIntegerField(default=0)
+    revenue_syp = models.PositiveBigIntegerField(default=0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=["day", "table_no"], name="daily_table_sales_uniq"),
+        ]
+
+    def __str__(self) -> str:
+        return f"{self.day} Table {self.table_no}"
+
+
+class HourlySales(models.Model):
+    day = models.DateField()
+    hour = models.PositiveSmallIntegerField()
+    orders = models.PositiveIntegerField(default=0)
+    revenue_syp = models.PositiveBigIntegerField(default=0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=["day", "hour"], name="hourly_sales_uniq"),
+        ]
+
+    def __str__(self) -> str:
+        return f"{self.day} {self.hour:02d}:00"
@@ -0,0 +1,255 @@
+# menu/prep.py
+"""
+طابور التحضير للمطبخ/البار: الأصناف الناقصة من كل الطلبات المفتوحة مجمّعة
+حسب الصنف ("7 اسبريسو، 3 أركيلة نعنع") بدل طلب طلب.
+
+- الناقص من كل سطر = qty - prepared_qty. التجميع كله بـ GROUP BY واحد
+  (صنف × ملاحظة) ومنرتّب حسب أقدم طلب.
+- المحطات (bar / kitchen / ...) حسب slug التصنيف من PREP_STATIONS؛
+  الباقي لـ PREP_DEFAULT_STATION والعروض لـ PREP_OFFER_STATION.
+- التحديث التدريجي على نفس cursor تبع live (Order.updated_at, id): منجيب
+  الطلبات اللي تغيّرت بس، ومنعيد حساب الأصناف اللي فيها بس.
+  "تم التحضير" بيلمس updated_at تبع الطلب حتى يوصل للشاشات التانية.
+"""
+from dataclasses import dataclass, field
+from datetime import datetime
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+from django.conf import settings
+from django.core import checks
+from django.db import DatabaseError, transaction
+from django.db.models import Count, F, Max, Min, Q, Sum
+from django.utils import timezone
+
+from . import live
+from .models import Order, OrderItem
+from .rollups import item_key
+
+QUEUE_STATUSES = [s for s in Order.Status.values if s not in Order.CLOSED_STATUSES]
+DEFAULT_STATION = "kitchen"
+
+
+@dataclass
+class PrepRow:
+    key: str                 # "product:12" / "offer:3"
+    name: str
+    station: str
+    pending: int = 0
+    orders: int = 0
+    since: Optional[datetime] = None
+    # [{"note": "...", "pending": 2}] — نفس الصنف بملاحظات مختلفة
+    notes: List[dict] = field(default_factory=list)
+
+    def as_dict(self) -> dict:
+        return {
+            "key": self.key,
+            "name": self.name,
+            "station": self.station,
+            "pending": self.pending,
+            "orders": self.orders,
+            "since": self.since.isoformat() if self.since else None,
+            "notes": self.notes,
+        }
+
+
+# -----------------------------
+# المحطات
+# -----------------------------
+def default_station() -> str:
+    return getattr(settings, "PREP_DEFAULT_STATION", DEFAULT_STATION)
+
+
+def _category_stations() -> Dict[str, str]:
+    mapping = {}
+    for station, slugs in getattr(settings, "PREP_STATIONS", {}).items():
+        for slug in slugs:
+            mapping[slug] = station
+    return mapping
+
+
+def check_stations(app_configs=None, databases=None, **kwargs) -> List[checks.CheckMessage]:
+    """
+    system check (Tags.database: migrate و check --database default):
+    slug بـ PREP_STATIONS ما إله تصنيف → أصنافه بتروح عالمحطة الافتراضية بصمت.
+    """
+    configured = _category_stations()
+    if not configured or not databases:
+        return []
+    from .models import Category
+    errors = []
+    for alias in databases:
+        try:
+            known = set(Category.objects.using(alias).values_list("slug", flat=True))
+        except DatabaseError:
+            # قبل أول migrate
+            continue
+        if not known:
+            # لسا ما في منيو (قبل datagen / الاستيراد)
+            continue
+        for slug, station in sorted(configured.items()):
+            if slug not in known:
+                errors.append(checks.Warning(
+                    f"PREP_STATIONS[{station!r}] lists category slug {slug!r}, "
+                    f"but no category has it (database {alias!r}).",
+                    hint=f"Its products go to {default_station()!r}. Fix the slug or remove it.",
+                    id="menu.W001",
+                ))
+    return errors
+
+
+def stations() -> List[str]:
+    names = list(getattr(settings, "PREP_STATIONS", {}))
+    for extra in (default_station(), getattr(settings, "PREP_OFFER_STATION", None)):
+        if extra and extra not in names:
+            names.append(extra)
+    return names
+
+
+def _station_for(item_type: str, category_slug: Optional[str], by_category: Dict[str, str]) -> str:
+    if item_type == OrderItem.ItemType.OFFER:
+        return getattr(settings, "PREP_OFFER_STATION", None) or default_station()
+    return by_category.get(category_slug or "", default_station())
+
+
+# -----------------------------
+# الطابور
+# -----------------------------
+def _key_filter(keys: Iterable[str]) -> Q:
+    products, offers = [], []
+    for key in keys:
+        kind, _, ref = key.partition(":")
+        if not ref.isdigit():
+            continue
+        (products if kind == OrderItem.ItemType.PRODUCT else offers).append(int(ref))
+    return Q(product_id__in=products) | Q(offer_id__in=offers)
+
+
+def _rows(extra: Optional[Q] = None) -> List[PrepRow]:
+    """
+    GROUP BY واحد على (صنف، ملاحظة) لكل الأسطر الناقصة بالطلبات المفتوحة.
+    """
+    qs = OrderItem.objects.filter(order__status__in=QUEUE_STATUSES, prepared_qty__lt=F("qty"))
+    if extra is not None:
+        qs = qs.filter(extra)
+    groups = (
+        qs.values("item_type", "product_id", "offer_id", "note_snapshot", "product__category__slug")
+        .annotate(
+            name=Max("name_snapshot"),
+            pending=Sum(F("qty") - F("prepared_qty")),
+            orders=Count("order_id", distinct=True),
+            since=Min("order__created_at"),
+        )
+        .order_by()
+    )
+
+    by_category = _category_stations()
+    rows: Dict[str, PrepRow] = {}
+    for g in groups:
+        key = item_key(g["item_type"], g["product_id"], g["offer_id"], g["name"])
+        row = rows.get(key)
+        if row is None:
+            station = _station_for(g["item_type"], g["product__category__slug"], by_category)
+            row = rows[key] = PrepRow(key=key, name=g["name"], station=station)
+        row.pending += int(g["pending"])
+        # تقريبي: طلب فيه نفس الصنف بملاحظتين بينعد مرتين
+        row.orders += int(g["orders"])
+        row.since = min(row.since, g["since"]) if row.since else g["since"]
+        row.notes.append({"note": g["note_snapshot"], "pending": int(g["pending"])})
+
+    for row in rows.values():
+        row.notes.sort(key=lambda n: (n["note"] != "", -n["pending"]))
+    return sorted(rows.values(), key=lambda r: (r.since, r.name))
+
+
+def queue(station: str = "") -> List[PrepRow]:
+    rows = _rows()
+    return [r for r in rows if r.station == station] if station else rows
+
+
+def changes(cursor: Optional[live.Cursor], station: str = "") -> Tuple[List[PrepRow], List[str], str]:
+    """
+    (الصفوف اللي تغيّرت، المفاتيح اللي خلصت، cursor الجاي).
+    بيعيد حساب بس الأصناف الموجودة بالطلبات اللي تغيّرت بعد cursor.
+
+    سطر انحذف من طلب (الزبون شاله من السلة) ما بيبين هون لأنه ما عاد موجود؛
+    الشاشة بتعمل تحديث كامل كل PREP_FULL_REFRESH ثانية لهيك.
+    """
+    orders = live.changed_orders(cursor)
+    if not orders:
+        return [], [], live.encode_cursor(cursor)
+
+    keys: Set[str] = {
+        item_key(it.item_type, it.product_id, it.offer_id, it.name_snapshot)
+        for o in orders for it in o.items.all()
+    }
+    last = orders[-1]
+    next_cursor = live.encode_cursor((last.updated_at, last.id))
+    if not keys:
+        return [], [], next_cursor
+
+    rows = _rows(_key_filter(keys))
+    gone = sorted(keys - {r.key for r in rows})
+    return [r for r in rows if not station or r.station == station], gone, next_cursor
+
+
+# -----------------------------
+# تم التحضير
+# -----------------------------
+def prepare(key: str, note: Optional[str] = None, qty: Optional[int] = None) -> Tuple[int, Dict[int, str]]:
+    """
+    بيعلّم qty قطعة من الصنف (وبملاحظة معيّنة إذا انبعتت) كجاهزة، من أقدم طلب للأحدث.
+    qty=None → كل الناقص. لازم ينادى جوّا transaction.
+
+    بيرجّع (كم قطعة انعلّمت، {order_id: الحالة المقترحة}):
+    أول قطعة جاهزة → PREPARING، كل أسطر الطلب جاهزة → READY.
+    """
+    items = OrderItem.objects.filter(
+        _key_filter([key]),
+        order__status__in=QUEUE_STATUSES,
+        prepared_qty__lt=F("qty"),
+    )
+    if note is not None:
+        items = items.filter(note_snapshot=note)
+
+    remaining = qty if qty is not None else None
+    marked, touched = 0, set()
+    for it in items.order_by("order__created_at", "id").only("id", "order_id", "qty", "prepared_qty"):
+        if remaining is not None and remaining <= 0:
+            break
+        take = it.pending_qty if remaining is None else min(it.pending_qty, remaining)
+        OrderItem.objects.filter(pk=it.pk).update(prepared_qty=F("prepared_qty") + take)
+        marked += take
+        touched.add(it.order_id)
+        if remaining is not None:
+            remaining -= take
+
+    if not touched:
+        return 0, {}
+
+    Order.objects.filter(id__in=touched).update(updated_at=timezone.now())
+    transaction.on_commit(live.notify)
+
+    still_pending = set(
+        OrderItem.objects.filter(order_id__in=touched, prepared_qty__lt=F("qty"))
+        .values_list("order_id", flat=True).distinct()
+    )
+    statuses = dict(Order.objects.filter(id__in=touched).values_list("id", "status"))
+    suggested = {}
+    for order_id, status in statuses.items():
+        if order_id not in still_pending and status in (Order.Status.NEW, Order.Status.PREPARING):
+            suggested[order_id] = Order.Status.READY
+        elif status == Order.Status.NEW:
+            suggested[order_id] = Order.Status.PREPARING
+    return marked, suggested
+
+
+def mark_order_prepared(order_id: int) -> None:
+    """
+    الطلب انعلّم READY من اللوحة → كل أسطره جاهزة (بتطلع من الطابور).
+    """
+    OrderItem.objects.filter(order_id=order_id, prepared_qty__lt=F("qty")).update(prepared_qty=F("qty"))
+
+
+def row_for(key: str, station: str = "") -> Optional[PrepRow]:
+    rows = [r for r in _rows(_key_filter([key])) if not station or r.station == station]
+    return rows[0] if rows else None
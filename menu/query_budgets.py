@@ -0,0 +1,122 @@
+# menu/query_budgets.py
+"""
+ميزانية الاستعلامات لكل صفحة (حسب URL name).
+
+الأرقام للحالة "الدافئة": الـ catalog مبني والـ session موجودة، يعني
+الطلب التاني لنفس الصفحة. أي زيادة عن الرقم → الاختبار بيفشل وبيطبع
+الاستعلامات مجمّعة حسب مكان تنفيذها (سطر بالـ template أو بالكود).
+
+الفحص الثاني (N+1): نفس الصفحة على داتا صغيرة وكبيرة لازم تعطي نفس العدد.
+"""
+import os
+import sys
+from collections import OrderedDict
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from typing import Dict, List
+
+from django.conf import settings
+from django.db import connection
+
+BUDGETS: Dict[str, int] = {
+    # session
+    "home": 1,
+    # session
+    "cart": 1,
+    # session + checkout claim + tablestate/order + items (diff) + bulk writes + tablestate sync
+    # + claim update + session save (مع savepoints الاختبار)
+    "checkout": 16,
+    # order (validators) + order + items
+    "order_status": 3,
+    # session + user + tablestate/order + items + cursor
+    "admin_dashboard": 5,
+}
+
+
+def budget(url_name: str) -> int:
+    return BUDGETS[url_name]
+
+
+@dataclass
+class CapturedQuery:
+    sql: str
+    site: str
+
+
+@dataclass
+class QueryLog:
+    queries: List[CapturedQuery] = field(default_factory=list)
+
+    def __len__(self) -> int:
+        return len(self.queries)
+
+    def by_site(self) -> "OrderedDict[str, List[str]]":
+        grouped: "OrderedDict[str, List[str]]" = OrderedDict()
+        for q in self.queries:
+            grouped.setdefault(q.site, []).append(q.sql)
+        return grouped
+
+    def report(self, title: str = "") -> str:
+        lines = [title] if title else []
+        for site, sqls in self.by_site().items():
+            lines.append(f"  {len(sqls)}x {site}")
+            for sql in OrderedDict.fromkeys(sqls):
+                lines.append(f"      {sql[:300]}")
+        return "\n".join(lines)
+
+
+_BASE_DIR = str(settings.BASE_DIR) + os.sep
+_SKIP = (os.sep + "query_budgets.py", os.sep + "tests.py")
+
+
+def _call_site() -> str:
+    """
+    أقرب سطر template (لو الاستعلام طلع أثناء الرندر) وإلا أقرب سطر من كود المشروع.
+    """
+    frame = sys._getframe(2)
+    code_site = None
+    fallback = None
+    while frame is not None:
+        self_obj = frame.f_locals.get("self")
+        if frame.f_code.co_name == "render_annotated" and getattr(self_obj, "origin", None) is not None:
+            token = getattr(self_obj, "token", None)
+            name = getattr(self_obj.origin, "template_name", None) or self_obj.origin.name
+            return f"{name}:{getattr(token, 'lineno', '?')} (template)"
+        filename = frame.f_code.co_filename
+        if (
+            code_site is None
+            and filename.startswith(_BASE_DIR)
+            and not filename.endswith(_SKIP)
+            and "site-packages" not in filename
+        ):
+            code_site = f"{os.path.relpath(filename, settings.BASE_DIR)}:{frame.f_lineno} in {frame.f_code.co_name}"
+        if fallback is None and _is_framework_caller(filename):
+            # مثلاً حفظ الـ session من الـ middleware
+            short = filename.split("site-packages" + os.sep, 1)[-1]
+            fallback = f"{short}:{frame.f_lineno} in {frame.f_code.co_name}"
+        frame = frame.f_back
+    return code_site or fallback or "unknown"
+
+
+def _is_framework_caller(filename: str) -> bool:
+    return (
+        os.sep + os.path.join("django", "db") + os.sep not in filename
+        and not filename.endswith(_SKIP)
+        and not filename.endswith("contextlib.py")
+    )
+
+
+@contextmanager
+def capture(using=None):
+    """
+    with capture() as log: ...  → log.queries فيها SQL + مكان التنفيذ.
+    """
+    conn = using or connection
+    log = QueryLog()
+
+    def wrapper(execute, sql, params, many, context):
+        log.queries.append(CapturedQuery(sql=sql, site=_call_site()))
+        return execute(sql, params, many, context)
+
+    with conn.execute_wrapper(wrapper):
+        yield log
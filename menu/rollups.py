@@ -0,0 +1,210 @@
+# menu/rollups.py
+"""
+جداول مبيعات يومية بتنحدّث بالزيادة:
+
+- DailyItemSales (يوم × صنف)، DailyTableSales (يوم × طاولة)، HourlySales (يوم × ساعة)
+- لما الطلب يصير DELIVERED منضيف أسطره (من name/price snapshots)، ولو رجع
+  لحالة تانية منطرحها. العلم Order.in_rollups بيتقلب بـ UPDATE شرطي،
+  فنفس الطلب ما بينعد مرتين حتى لو انضغط "تم التسليم" مرتين بنفس اللحظة.
+- التقارير بتقرا من هالجداول: الكلفة حسب عدد الأيام × الأصناف، مو حجم التاريخ.
+
+اليوم والساعة حسب وقت الطلب (created_at) بتوقيت TIME_ZONE.
+"""
+from datetime import date, datetime, time as dtime, timedelta
+from typing import Callable, Dict, Optional, Tuple
+
+from django.db import transaction
+from django.db.models import Count, F, Max, Sum
+from django.db.models.functions import ExtractHour, TruncDate
+from django.utils import timezone
+
+from .models import DailyItemSales, DailyTableSales, HourlySales, Order, OrderItem
+
+BATCH_SIZE = 1000
+
+
+def item_key(item_type: str, product_id, offer_id, name: str) -> str:
+    ref = product_id if item_type == OrderItem.ItemType.PRODUCT else offer_id
+    return f"{item_type}:{ref}" if ref else f"{item_type}:{name}"[:40]
+
+
+def _bump(model, lookup: dict, sign: int, defaults: Optional[dict] = None, **deltas) -> None:
+    changes = {k: F(k) + sign * v for k, v in deltas.items()}
+    if defaults and sign > 0:
+        changes.update(defaults)  # آخر اسم للصنف
+    if not model.objects.filter(**lookup).update(**changes) and sign > 0:
+        model.objects.create(**lookup, **(defaults or {}), **deltas)
+
+
+def _apply(order: Order, sign: int) -> None:
+    local = timezone.localtime(order.created_at)
+    day, hour = local.date(), local.hour
+
+    lines: Dict[str, dict] = {}
+    for it in order.items.all():
+        key = item_key(it.item_type, it.product_id, it.offer_id, it.name_snapshot)
+        row = lines.setdefault(key, {"item_type": it.item_type, "name": it.name_snapshot, "qty": 0, "revenue": 0})
+        row["qty"] += int(it.qty)
+        row["revenue"] += int(it.qty) * int(it.price_syp_snapshot)
+    revenue = sum(r["revenue"] for r in lines.values())
+
+    for key, r in lines.items():
+        _bump(
+            DailyItemSales, {"day": day, "item_key": key}, sign,
+            defaults={"item_type": r["item_type"], "name": r["name"]},
+            qty=r["qty"], orders=1, revenue_syp=r["revenue"],
+        )
+    _bump(DailyTableSales, {"day": day, "table_no": order.table_no}, sign, orders=1, revenue_syp=revenue)
+    _bump(HourlySales, {"day": day, "hour": hour}, sign, orders=1, revenue_syp=revenue)
+
+
+def sync(order: Order) -> None:
+    """
+    لازم تنادى جوّا نفس الـ transaction اللي غيّرت حالة الطلب (متل TableState.sync).
+    """
+    if order.status == Order.Status.DELIVERED:
+        if Order.objects.filter(pk=order.pk, in_rollups=False).update(in_rollups=True):
+            _apply(order, +1)
+    elif Order.objects.filter(pk=order.pk, in_rollups=True).update(in_rollups=False):
+        _apply(order, -1)
+
+
+# -----------------------------
+# backfill
+# -----------------------------
+def _bounds(since: Optional[date], until: Optional[date]) -> dict:
+    lookup = {}
+    if since:
+        lookup["created_at__gte"] = timezone.make_aware(datetime.combine(since, dtime.min))
+    if until:
+        lookup["created_at__lt"] = timezone.make_aware(datetime.combine(until + timedelta(days=1), dtime.min))
+    return lookup
+
+
+def backfill(since: Optional[date] = None, until: Optional[date] = None,
+             log: Callable[[str], None] = lambda m: None) -> Dict[str, int]:
+    """
+    إعادة بناء الجداول من الطلبات المسلّمة (كلها أو ضمن مدة) بـ GROUP BY.
+    """
+    bounds = _bounds(since, until)
+    days = {}
+    if since:
+        days["day__gte"] = since
+    if until:
+        days["day__lte"] = until
+
+    with transaction.atomic():
+        for model in (DailyItemSales, DailyTableSales, HourlySales):
+            model.objects.filter(**days).delete()
+        Order.objects.filter(in_rollups=True, **bounds).update(in_rollups=False)
+
+        delivered = Order.objects.filter(status=Order.Status.DELIVERED, **bounds)
+        line_revenue = Sum(F("items__qty") * F("items__price_syp_snapshot"))
+
+        items = [
+            DailyItemSales(
+                day=r["day"],
+                item_key=item_key(r["item_type"], r["product_id"], r["offer_id"], r["name"]),
+                item_type=r["item_type"],
+                name=r["name"],
+                qty=r["units"],
+                orders=r["orders"],
+                revenue_syp=r["revenue"] or 0,
+            )
+            for r in (
+                OrderItem.objects
+                .filter(order__in=delivered)
+                .annotate(day=TruncDate("order__created_at"))
+                .values("day", "item_type", "product_id", "offer_id")
+                .annotate(
+                    name=Max("name_snapshot"),
+                    units=Sum("qty"),
+                    orders=Count("order_id", distinct=True),
+                    revenue=Sum(F("qty") * F("price_syp_snapshot")),
+                )
+                .order_by()
+            )
+        ]
+        # صنف محذوف (product_id=NULL) بأسماء مختلفة → نفس المفتاح؛ منجمّعهم
+        merged: Dict[Tuple[date, str], DailyItemSales] = {}
+        for row in items:
+            prev = merged.get((row.day, row.item_key))
+            if prev is None:
+                merged[(row.day, row.item_key)] = row
+            else:
+                prev.qty += row.qty
+                prev.orders += row.orders
+                prev.revenue_syp += row.revenue_syp
+        DailyItemSales.objects.bulk_create(merged.values(), batch_size=BATCH_SIZE)
+
+        tables = [
+            DailyTableSales(day=r["day"], table_no=r["table_no"], orders=r["orders"], revenue_syp=r["revenue"] or 0)
+            for r in (
+                delivered
+                .annotate(day=TruncDate("created_at"))
+                .values("day", "table_no")
+                .annotate(orders=Count("id", distinct=True), revenue=line_revenue)
+                .order_by()
+            )
+        ]
+        DailyTableSales.objects.bulk_create(tables, batch_size=BATCH_SIZE)
+
+        hours = [
+            HourlySales(day=r["day"], hour=r["hour"], orders=r["orders"], revenue_syp=r["revenue"] or 0)
+            for r in (
+                delivered
+                .annotate(day=TruncDate("created_at"), hour=ExtractHour("created_at"))
+                .values("day", "hour")
+                .annotate(orders=Count("id", distinct=True), revenue=line_revenue)
+                .order_by()
+            )
+        ]
+        HourlySales.objects.bulk_create(hours, batch_size=BATCH_SIZE)
+
+        orders = delivered.update(in_rollups=True)
+
+    counts = {"orders": orders, "item_days": len(merged), "table_days": len(tables), "hours": len(hours)}
+    log(", ".join(f"{k}={v}" for k, v in counts.items()))
+    return counts
+
+
+# -----------------------------
+# التقارير
+# -----------------------------
+def report(since: date, until: date, top: int = 10) -> dict:
+    days = {"day__gte": since, "day__lte": until}
+    items = DailyItemSales.objects.filter(**days).values("item_key").annotate(
+        name=Max("name"),
+        qty=Sum("qty"),
+        revenue=Sum("revenue_syp"),
+    )
+    by_day = list(
+        HourlySales.objects.filter(**days).values("day")
+        .annotate(orders=Sum("orders"), revenue=Sum("revenue_syp")).order_by("day")
+    )
+    by_hour = {
+        r["hour"]: r for r in
+        HourlySales.objects.filter(**days).values("hour")
+        .annotate(orders=Sum("orders"), revenue=Sum("revenue_syp")).order_by("hour")
+    }
+    tables = list(
+        DailyTableSales.objects.filter(**days).values("table_no")
+        .annotate(orders=Sum("orders"), revenue=Sum("revenue_syp")).order_by("-revenue")[:top]
+    )
+
+    hours = [by_hour.get(h, {"hour": h, "orders": 0, "revenue": 0}) for h in range(24)]
+    peak = max((h["revenue"] for h in hours), default=0) or 1
+    for h in hours:
+        h["pct"] = round(100 * h["revenue"] / peak)
+
+    return {
+        "since": since,
+        "until": until,
+        "orders": sum(d["orders"] for d in by_day),
+        "revenue": sum(d["revenue"] for d in by_day),
+        "top_revenue": list(items.order_by("-revenue")[:top]),
+        "top_qty": list(items.order_by("-qty")[:top]),
+        "by_day": by_day,
+        "by_hour": hours,
+        "top_tables": tables,
+    }
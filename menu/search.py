@@ -0,0 +1,262 @@
+# menu/search.py
+"""
+فهرس بحث (inverted index) للمنتجات داخل الذاكرة.
+
+- توحيد الكتابة العربية: الهمزات/الألف، التاء المربوطة والهاء، الألف المقصورة،
+  التطويل والتشكيل. واللاتيني lowercase وبدون accents.
+- السوابق (ال / و / ب / ل / ف / ك وتركيباتها): كل كلمة بالفهرس بتنحفظ كاملة
+  وبدون السابقة ("بالنعناع" → "نعناع")، وكلمة البحث بتتجرّب بدون "ال"
+  ("القهوة" بتلاقي "قهوة"). متل icontains القديم بهالحالات.
+- مطابقة بالبادئة (prefix) على مفردات مرتبة (bisect) → زمن البحث ما بيكبر
+  مع حجم المنيو.
+- الفهرس تابع لـ snapshot المنيو (Catalog.digest، متل الـ ETag وكاش الأقسام):
+  أي snapshot بداتا تانية (تعديل من worker تاني، update() ...) → إعادة بناء
+  من الـ snapshot نفسه. حفظ/حذف منتج بهالـ worker → تحديث تدريجي، بس إذا
+  الفهرس كان مطابق للـ snapshot اللي قبل التعديل.
+"""
+import bisect
+import re
+import threading
+import unicodedata
+from collections import defaultdict
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+from django.db import transaction
+
+from . import catalog as catalog_srv, metrics
+from .models import Product
+
+NAME_WEIGHT = 3
+DESCRIPTION_WEIGHT = 1
+EXACT_BONUS = 1  # الكلمة كاملة أحسن من بادئة
+
+_ARABIC_DIACRITICS = re.compile("[\u0610-\u061A\u064B-\u065F\u0670\u06D6-\u06ED]")
+_TATWEEL = "\u0640"
+_ARABIC_MAP = str.maketrans({
+    "أ": "ا", "إ": "ا", "آ": "ا", "ٱ": "ا",
+    "ة": "ه",
+    "ى": "ي",
+    "ؤ": "و",
+    "ئ": "ي",
+    # أرقام عربية → لاتينية
+    "٠": "0", "١": "1", "٢": "2", "٣": "3", "٤": "4",
+    "٥": "5", "٦": "6", "٧": "7", "٨": "8", "٩": "9",
+})
+_TOKEN_RE = re.compile(r"\w+")
+
+# بعد normalize. الأطول أول؛ الباقي لازم يضل فيه MIN_STEM حرف عالأقل
+ARTICLES = ("وال", "بال", "فال", "كال", "لل", "ال")
+PROCLITICS = ARTICLES + ("و", "ب", "ل", "ف", "ك")
+MIN_STEM = 2
+
+
+def normalize(text: str) -> str:
+    text = (text or "").replace(_TATWEEL, "")
+    text = _ARABIC_DIACRITICS.sub("", text)
+    text = text.translate(_ARABIC_MAP)
+    # Latin: café → cafe
+    text = unicodedata.normalize("NFKD", text)
+    text = "".join(ch for ch in text if not unicodedata.combining(ch))
+    return text.casefold()
+
+
+def tokenize(text: str) -> List[str]:
+    return _TOKEN_RE.findall(normalize(text))
+
+
+def strip_proclitics(token: str, prefixes: Tuple[str, ...] = PROCLITICS) -> Set[str]:
+    """
+    الكلمة بدون السوابق الممكنة: "والقهوه" → {"قهوه", "القهوه"}.
+    حرف واحد (و/ب/ل/ف/ك) بينشال بس إذا ضل MIN_STEM + 1 حرف، حتى "بن" ما تصير "ن".
+    """
+    stems = set()
+    for prefix in prefixes:
+        rest = token[len(prefix):]
+        min_len = MIN_STEM if len(prefix) > 1 else MIN_STEM + 1
+        if token.startswith(prefix) and len(rest) >= min_len:
+            stems.add(rest)
+    return stems
+
+
+def index_terms(token: str) -> Set[str]:
+    return {token} | strip_proclitics(token)
+
+
+class SearchIndex:
+    def __init__(self):
+        self._lock = threading.RLock()
+        self._postings: Dict[str, Dict[int, int]] = {}
+        self._doc_tokens: Dict[int, Set[str]] = {}
+        self._vocab: List[str] = []
+        self.version: Optional[int] = None
+        # بصمة الـ snapshot اللي انبنى منه (None: انعدّل تدريجياً بعد آخر snapshot)
+        self.digest: Optional[str] = None
+
+    # -----------------------------
+    # بناء / تحديث
+    # -----------------------------
+    def _doc_weights(self, name: str, description: str) -> Dict[str, int]:
+        weights: Dict[str, int] = defaultdict(int)
+        for text, weight in ((name, NAME_WEIGHT), (description, DESCRIPTION_WEIGHT)):
+            for tok in tokenize(text):
+                for term in index_terms(tok):
+                    weights[term] = max(weights[term], weight)
+        return weights
+
+    def _remove(self, product_id: int) -> None:
+        for tok in self._doc_tokens.pop(product_id, ()):
+            posting = self._postings.get(tok)
+            if posting is None:
+                continue
+            posting.pop(product_id, None)
+            if not posting:
+                del self._postings[tok]
+                i = bisect.bisect_left(self._vocab, tok)
+                if i < len(self._vocab) and self._vocab[i] == tok:
+                    del self._vocab[i]
+
+    def _add(self, product_id: int, name: str, description: str) -> None:
+        weights = self._doc_weights(name, description)
+        for tok, w in weights.items():
+            posting = self._postings.get(tok)
+            if posting is None:
+                posting = self._postings[tok] = {}
+                bisect.insort(self._vocab, tok)
+            posting[product_id] = w
+        self._doc_tokens[product_id] = set(weights)
+
+    def rebuild(self, rows: Iterable[Tuple[int, str, str]], version: Optional[int] = None,
+                digest: Optional[str] = None) -> None:
+        with self._lock:
+            self._postings = {}
+            self._doc_tokens = {}
+            self._vocab = []
+            for pid, name, description in rows:
+                self._add(pid, name, description)
+            self.version = version
+            self.digest = digest
+
+    def update(self, product_id: int, name: str, description: str) -> None:
+        with self._lock:
+            self._remove(product_id)
+            self._add(product_id, name, description)
+
+    def remove(self, product_id: int) -> None:
+        with self._lock:
+            self._remove(product_id)
+
+    # -----------------------------
+    # البحث
+    # -----------------------------
+    def _match_prefix(self, term: str) -> Dict[int, int]:
+        scores: Dict[int, int] = {}
+        i = bisect.bisect_left(self._vocab, term)
+        while i < len(self._vocab) and self._vocab[i].startswith(term):
+            tok = self._vocab[i]
+            bonus = EXACT_BONUS if tok == term else 0
+            for pid, w in self._postings[tok].items():
+                s = w + bonus
+                if s > scores.get(pid, 0):
+                    scores[pid] = s
+            i += 1
+        return scores
+
+    def search(self, query: str) -> List[Tuple[int, int]]:
+        """
+        كل كلمة بالاستعلام لازم تطابق (AND) — يرجّع [(product_id, score)] مرتبة.
+        """
+        terms = tokenize(query)
+        if not terms:
+            return []
+
+        with self._lock:
+            total: Optional[Dict[int, int]] = None
+            for term in terms:
+                matched = self._match_prefix(term)
+                for stem in strip_proclitics(term, ARTICLES):
+                    for pid, score in self._match_prefix(stem).items():
+                        if score > matched.get(pid, 0):
+                            matched[pid] = score
+                if total is None:
+                    total = matched
+                else:
+                    total = {pid: total[pid] + s for pid, s in matched.items() if pid in total}
+                if not total:
+                    return []
+
+        return sorted(total.items(), key=lambda kv: -kv[1])
+
+
+_index = SearchIndex()
+
+
+def _ensure_fresh(menu) -> SearchIndex:
+    with _index._lock:
+        # بعد تحديث تدريجي: أول snapshot بنفس النسخة هو اللي بيطابقه
+        if _index.digest is None and _index.version is not None and _index.version == menu.version:
+            _index.digest = menu.digest
+        fresh = _index.digest == menu.digest
+        if not fresh:
+            rows = [(p.id, p.name, p.description) for p in menu.product_by_id.values()]
+            _index.rebuild(rows, version=menu.version, digest=menu.digest)
+    metrics.cache_lookup("search_index", fresh)
+    return _index
+
+
+def search_products(query: str, category_slug: str = "all") -> List[Product]:
+    """
+    نتائج البحث كمنتجات من الـ catalog (فعّالة وضمن التصنيف المختار)، مرتبة حسب الصلة.
+    """
+    menu = catalog_srv.get_catalog()
+    index = _ensure_fresh(menu)
+    visible = {p.id: p for p in menu.products_for(category_slug)}
+
+    results = []
+    for pid, score in index.search(query):
+        p = visible.get(pid)
+        if p is not None:
+            results.append((score, p))
+
+    # نفس ترتيب المنيو عند التعادل: المميز أولاً ثم الاسم
+    results.sort(key=lambda sp: (-sp[0], not sp[1].is_featured, sp[1].name))
+    return [p for _, p in results]
+
+
+def _apply_product_change(product_id: int, name: Optional[str], description: Optional[str]) -> None:
+    # تحديث تدريجي بس إذا الفهرس مطابق للـ snapshot اللي قبل هالتعديل
+    # (نفس البصمة والنسخة اللي قبل). غير هيك رح ينعاد بناؤه بأول بحث.
+    version = catalog_srv.current_version()
+    previous = catalog_srv.peek()
+    with _index._lock:
+        if (
+            _index.version is None
+            or _index.version != version - 1
+            or previous is None
+            or previous.version != _index.version
+            or _index.digest != previous.digest
+        ):
+            return
+        if name is None:
+            _index.remove(product_id)
+        else:
+            _index.update(product_id, name, description or "")
+        _index.version = version
+        _index.digest = None
+
+
+def _on_product_save(sender, instance, **kwargs):
+    pid, name, description = instance.pk, instance.name, instance.description
+    transaction.on_commit(lambda: _apply_product_change(pid, name, description))
+
+
+def _on_product_delete(sender, instance, **kwargs):
+    pid = instance.pk
+    transaction.on_commit(lambda: _apply_product_change(pid, None, None))
+
+
+def connect_signals() -> None:
+    from django.db.models.signals import post_save, post_delete
+
+    # لازم تنربط بعد catalog.connect_signals حتى تنرفع النسخة قبل التحديث
+    post_save.connect(_on_product_save, sender=Product, dispatch_uid="search-product-save")
+    post_delete.connect(_on_product_delete, sender=Product, dispatch_uid="search-product-delete")
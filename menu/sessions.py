@@ -0,0 +1,189 @@
+# menu/sessions.py
+"""
+عمر الـ sessions وتنظيف django_session.
+
+- SESSION_ENGINE = "menu.sessions": نفس الـ DB backend بس العمر حسب صاحب الـ session:
+  زائر (سلة كبيرة / طاولة / طلب مبعوت) → SESSION_ANON_AGE، موظف مسجّل دخول
+  → SESSION_STAFF_AGE. العمر بينحسب من آخر تعديل (الـ session ما بتنحفظ بالتصفح).
+- purge_expired(): مسح المنتهية دفعات صغيرة، كل دفعة transaction لحالها،
+  حتى ما نمسك قفل الكتابة على SQLite أكتر من كم ميلي ثانية.
+- start_scheduler(): thread بالخلفية بيعمل purge كل SESSION_PURGE_INTERVAL ثانية
+  (0 = مطفي؛ الأفضل cron على `python manage.py purge_sessions`).
+- purge_checkout_claims(): مسح حجوزات توكن التأكيد اللي خلص الـ TTL تبعها.
+- stats(): حجم الجدول (عدد + منتهي + بايتات إذا الـ DB بتدعم).
+"""
+import logging
+import random
+import threading
+import time
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+from typing import Optional
+
+from django.conf import settings
+from django.contrib.auth import SESSION_KEY as AUTH_SESSION_KEY
+from django.contrib.sessions.backends.db import SessionStore as DBSessionStore
+from django.contrib.sessions.models import Session
+from django.db import DatabaseError, connection, transaction
+from django.db.models import Count, Min, Q
+from django.utils import timezone
+
+from . import metrics
+from .cart import checkout_token_ttl
+from .models import CheckoutClaim
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_ANON_AGE = 3 * 60 * 60  # ثواني
+DEFAULT_STAFF_AGE = 7 * 24 * 60 * 60
+DEFAULT_PURGE_BATCH = 500
+DEFAULT_PURGE_INTERVAL = 0
+
+_scheduler: Optional[threading.Thread] = None
+_scheduler_lock = threading.Lock()
+
+
+def anon_age() -> int:
+    return int(getattr(settings, "SESSION_ANON_AGE", DEFAULT_ANON_AGE))
+
+
+def staff_age() -> int:
+    return int(getattr(settings, "SESSION_STAFF_AGE", DEFAULT_STAFF_AGE))
+
+
+def db_backed() -> bool:
+    return settings.SESSION_ENGINE in (
+        "menu.sessions",
+        "django.contrib.sessions.backends.db",
+        "django.contrib.sessions.backends.cached_db",
+    )
+
+
+class SessionStore(DBSessionStore):
+    """
+    الـ DB backend مع عمر حسب المستخدم. بس الموظفين بيسجّلوا دخول بهالتطبيق،
+    فـ "في مستخدم" = موظف.
+    """
+
+    def get_session_cookie_age(self):
+        # ما منحمّل الـ session من هون: بتنحفظ بس إذا كانت محمّلة ومتغيّرة
+        data = getattr(self, "_session_cache", None) or {}
+        return staff_age() if data.get(AUTH_SESSION_KEY) else anon_age()
+
+
+# -----------------------------
+# التنظيف
+# -----------------------------
+def purge_expired(batch_size: Optional[int] = None, pause: float = 0.0, now: Optional[datetime] = None) -> int:
+    """
+    بيمسح الـ sessions المنتهية وبيرجّع العدد.
+    pause: استراحة بين الدفعات حتى الطلبات تلحق تكتب.
+    """
+    batch_size = batch_size or int(getattr(settings, "SESSION_PURGE_BATCH", DEFAULT_PURGE_BATCH))
+    now = now or timezone.now()
+    total = 0
+    while True:
+        keys = list(
+            Session.objects.filter(expire_date__lt=now)
+            .order_by("expire_date")
+            .values_list("session_key", flat=True)[:batch_size]
+        )
+        if not keys:
+            break
+        with transaction.atomic():
+            deleted, _ = Session.objects.filter(session_key__in=keys).delete()
+        total += deleted
+        if len(keys) < batch_size:
+            break
+        if pause:
+            time.sleep(pause)
+    if total:
+        metrics.inc("arabella_sessions_purged_total", total)
+    return total
+
+
+def purge_checkout_claims(now: Optional[datetime] = None) -> int:
+    """
+    الحجز بيفيد بس ضمن CHECKOUT_TOKEN_TTL (بعدها التوكن بيتغيّر)، فالقديم بينمسح.
+    """
+    cutoff = (now or timezone.now()) - timedelta(seconds=checkout_token_ttl())
+    deleted, _ = CheckoutClaim.objects.filter(updated_at__lt=cutoff).delete()
+    return deleted
+
+
+@dataclass
+class SessionStats:
+    total: int
+    expired: int
+    oldest_expiry: Optional[datetime]
+    table_bytes: Optional[int]
+
+
+def _table_bytes() -> Optional[int]:
+    table = Session._meta.db_table
+    if connection.vendor == "sqlite":
+        sql, params = "SELECT SUM(pgsize) FROM dbstat WHERE name = %s", [table]
+    elif connection.vendor == "postgresql":
+        sql, params = "SELECT pg_total_relation_size(%s)", [table]
+    else:
+        return None
+    try:
+        with connection.cursor() as cursor:
+            cursor.execute(sql, params)
+            row = cursor.fetchone()
+    except DatabaseError:  # SQLite بدون dbstat
+        return None
+    return int(row[0]) if row and row[0] is not None else None
+
+
+def stats(now: Optional[datetime] = None) -> SessionStats:
+    now = now or timezone.now()
+    agg = Session.objects.aggregate(
+        total=Count("pk"),
+        expired=Count("pk", filter=Q(expire_date__lt=now)),
+        oldest=Min("expire_date"),
+    )
+    return SessionStats(
+        total=agg["total"],
+        expired=agg["expired"],
+        oldest_expiry=agg["oldest"],
+        table_bytes=_table_bytes(),
+    )
+
+
+# -----------------------------
+# المجدول
+# -----------------------------
+def purge_interval() -> float:
+    return float(getattr(settings, "SESSION_PURGE_INTERVAL", DEFAULT_PURGE_INTERVAL))
+
+
+def _run(interval: float) -> None:
+    # بداية عشوائية حتى workers gunicorn ما يمسحوا بنفس اللحظة
+    time.sleep(random.uniform(0, interval))
+    while True:
+        try:
+            purged = purge_expired(pause=0.05)
+            if purged:
+                logger.info("purged %d expired sessions", purged)
+            purge_checkout_claims()
+        except Exception:
+            logger.exception("session purge failed")
+        finally:
+            connection.close()
+        time.sleep(interval)
+
+
+def start_scheduler() -> bool:
+    """
+    بتنادى من arabella/wsgi.py و asgi.py (مو من ready() حتى ما يشتغل مع كل command).
+    """
+    global _scheduler
+    interval = purge_interval()
+    if interval <= 0 or not db_backed():
+        return False
+    with _scheduler_lock:
+        if _scheduler is None:
+            _scheduler = threading.Thread(target=_run, args=(interval,), name="session-purge", daemon=True)
+            _scheduler.start()
+    return True
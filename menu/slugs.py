@@ -0,0 +1,56 @@
+# menu/slugs.py
+"""
+توليد slugs فريدة لدفعة كاملة مقابل مجموعة محمّلة مسبقاً
+(استعلام واحد بدل exists() لكل محاولة).
+"""
+from typing import Iterable, Set
+
+from django.db.models import Q
+from django.utils.text import slugify
+
+
+def unique_slug(base: str, taken: Set[str], sep: str = "-") -> str:
+    """
+    أول قيمة مو مستعملة من base, base-2, base-3 ... وبتنضاف لـ taken.
+    """
+    base = base or "item"
+    candidate = base
+    i = 2
+    while candidate in taken:
+        candidate = f"{base}{sep}{i}"
+        i += 1
+    taken.add(candidate)
+    return candidate
+
+
+def slug_base(text: str, fallback: str) -> str:
+    # allow_unicode: بدونها الأسماء العربية كلها بتصير fallback, fallback-2 ...
+    return slugify(text or "", allow_unicode=True) or fallback
+
+
+class UnicodeSlugConverter:
+    """
+    متل <slug:...> بس بيقبل حروف عربية (نفس اللي بيطلّعه slug_base).
+    """
+    regex = r"[-\w]+"
+
+    def to_python(self, value: str) -> str:
+        return value
+
+    def to_url(self, value: str) -> str:
+        return value
+
+
+def taken_slugs(model, bases: Iterable[str], exclude_pk=None) -> Set[str]:
+    """
+    كل الـ slugs الموجودة اللي ممكن تتصادم مع bases (استعلام واحد).
+    """
+    q = Q()
+    for base in set(bases):
+        q |= Q(slug=base) | Q(slug__startswith=f"{base}-")
+    if not q:
+        return set()
+    qs = model.objects.filter(q)
+    if exclude_pk is not None:
+        qs = qs.exclude(pk=exclude_pk)
+    return set(qs.values_list("slug", flat=True))
@@ -0,0 +1,76 @@
+# menu/table.py
+"""
+رقم الطاولة (من QR ?t= أو من فورم السلة).
+
+زائر ما أضاف شي للسلة ما لازم ينعمله session row بس مشان رقم الطاولة:
+إذا الـ session فاضية الرقم بينحفظ بكوكي موقّعة (TABLE_COOKIE_NAME) وبتنحط
+عالـ response من TableCookieMiddleware. أول ما يصير في session (إضافة للسلة)
+الرقم الجديد بينكتب فيها، والقراءة دايماً: session أول، بعدين الكوكي.
+
+وبالحالتين ما منكتب شي إذا الرقم ما تغيّر (نفس QR مرة تانية).
+"""
+from django.conf import settings
+
+SESSION_KEY = "table_no"
+DEFAULT_COOKIE_NAME = "arabella_table"
+DEFAULT_COOKIE_AGE = 12 * 60 * 60  # ثواني
+_SALT = "menu.table"
+
+
+def cookie_name() -> str:
+    return getattr(settings, "TABLE_COOKIE_NAME", DEFAULT_COOKIE_NAME)
+
+
+def cookie_age() -> int:
+    return int(getattr(settings, "TABLE_COOKIE_AGE", DEFAULT_COOKIE_AGE))
+
+
+def _from_cookie(request) -> str:
+    return request.get_signed_cookie(cookie_name(), default="", salt=_SALT, max_age=cookie_age()) or ""
+
+
+def _store(request, table_no: str) -> bool:
+    """
+    True إذا لازم ينكتب بالـ session (False → بالكوكي).
+    """
+    if request.session.is_empty():
+        request._table_cookie = table_no
+        return False
+    return True
+
+
+def get_table_no(request) -> str:
+    return (request.session.get(SESSION_KEY) or _from_cookie(request) or "").strip()
+
+
+def remember(request, table_no: str) -> None:
+    table_no = (table_no or "").strip()
+    if table_no == get_table_no(request):
+        return
+    if _store(request, table_no):
+        request.session[SESSION_KEY] = table_no
+
+
+def capture_from_qr(request) -> None:
+    t = (request.GET.get("t") or "").strip()
+    if t:
+        remember(request, t)
+
+
+async def acapture_from_qr(request) -> None:
+    """
+    نفس capture_from_qr للـ views الـ async (بتحمّل الـ session كمان).
+    """
+    current = (await request.session.aget(SESSION_KEY) or _from_cookie(request) or "").strip()
+    t = (request.GET.get("t") or "").strip()
+    if t and t != current and _store(request, t):
+        await request.session.aset(SESSION_KEY, t)
+
+
+def apply_cookie(request, response) -> None:
+    table_no = getattr(request, "_table_cookie", None)
+    if table_no is not None:
+        response.set_signed_cookie(
+            cookie_name(), table_no, salt=_SALT, max_age=cookie_age(),
+            secure=settings.SESSION_COOKIE_SECURE, httponly=True, samesite="Lax",
+        )
@@ -0,0 +1,36 @@
+from django import template
+from django.utils.html import format_html
+
+from .. import images
+
+register = template.Library()
+
+DEFAULT_SIZES = "(max-width: 480px) 50vw, 240px"
+
+
+@register.simple_tag
+def responsive_image(image, fallback="", alt="", sizes=DEFAULT_SIZES, css_class="", loading="lazy"):
+    """
+    {% responsive_image p.image "img/product-3.jpg" alt="prod" %}
+
+    <picture> فيه WebP + JPEG بعدة عروض (srcset/sizes) و loading="lazy".
+    """
+    img = images.responsive(image) or images.responsive(fallback)
+    if img is None:
+        return ""
+
+    class_attr = format_html(' class="{}"', css_class) if css_class else ""
+    if not img.srcsets:
+        return format_html(
+            '<img src="{}" alt="{}"{} loading="{}" decoding="async">',
+            img.src, alt, class_attr, loading,
+        )
+
+    return format_html(
+        '<picture>'
+        '<source type="image/webp" srcset="{}" sizes="{}">'
+        '<img src="{}" srcset="{}" sizes="{}" alt="{}"{} loading="{}" decoding="async">'
+        '</picture>',
+        img.srcset("webp"), sizes,
+        img.src, img.srcset("jpg"), sizes, alt, class_attr, loading,
+    )
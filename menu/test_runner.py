@@ -0,0 +1,30 @@
+# menu/test_runner.py
+"""
+TEST_RUNNER: الملفات اللي بتكتبها الاختبارات (صور، نسخ الصور، ملف الـ metrics)
+بمجلد مؤقت بدل MEDIA_ROOT و METRICS_DB الحقيقيين تبع المشروع.
+"""
+import os
+import shutil
+import tempfile
+
+from django.conf import settings
+from django.test.runner import DiscoverRunner
+
+from . import metrics
+
+
+class Runner(DiscoverRunner):
+    def setup_test_environment(self, **kwargs):
+        super().setup_test_environment(**kwargs)
+        self._tmp = tempfile.mkdtemp(prefix="arabella-tests-")
+        self._saved = {"MEDIA_ROOT": settings.MEDIA_ROOT, "METRICS_DB": settings.METRICS_DB}
+        settings.MEDIA_ROOT = self._tmp
+        settings.METRICS_DB = os.path.join(self._tmp, "metrics.sqlite3")
+
+    def teardown_test_environment(self, **kwargs):
+        # آخر فروقات للملف المؤقت، حتى thread الـ flush ما يكتبها بالملف الحقيقي
+        metrics.flush()
+        for name, value in self._saved.items():
+            setattr(settings, name, value)
+        shutil.rmtree(self._tmp, ignore_errors=True)
+        super().teardown_test_environment(**kwargs)
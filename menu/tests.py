@@ -1,3 +1,920 @@
-from django.test import TestCase
+import io
+import os
+import tempfile
+import threading
+from datetime import timedelta
+from unittest import mock
 
-# Create your tests here.
+from asgiref.sync import sync_to_async
+from django.contrib.auth import get_user_model
+from django.contrib.sessions.models import Session
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.conf import settings
+from django.db import connection
+from django.test import Client, TestCase, TransactionTestCase, override_settings
+from django.template import Context, Template
+from django.urls import reverse
+from django.utils import timezone
+
+from . import cart as cart_srv, catalog as catalog_srv, catalog_io, datagen, history, images, live, metrics, prep, query_budgets, rollups, search, sessions
+from .models import Category, CheckoutClaim, DailyItemSales, HourlySales, Offer, Product, Order, OrderItem, TableState
+
+
+def _is_write(sql: str) -> bool:
+    return sql.lstrip().split(" ", 1)[0].upper() in {"INSERT", "UPDATE", "DELETE"}
+
+
+# signed_cookies: الـ session بالكوكي، فالكتابات الوحيدة على الـ DB هي كتابات الطلب
+@override_settings(SESSION_ENGINE="django.contrib.sessions.backends.signed_cookies")
+class CheckoutIdempotencyTests(TransactionTestCase):
+    def setUp(self):
+        cat = Category.objects.create(name="قهوة", slug="coffee")
+        self.product = Product.objects.create(category=cat, name="إسبريسو", slug="espresso", price_syp=15000)
+
+        self.client = Client()
+        self.client.get(reverse("landing"), {"t": "4"})
+        self.client.post(reverse("cart_add", args=[self.product.slug]), {"qty": 2})
+        self.token = self.client.get(reverse("cart")).context["submit_token"]
+        self.data = {"table_no": "4", "note": "", "submit_token": self.token}
+
+    def test_resubmit_short_circuits_to_same_order(self):
+        first = self.client.post(reverse("checkout"), self.data)
+
+        writes = []
+
+        def spy(execute, sql, params, many, context):
+            if _is_write(sql):
+                writes.append(sql)
+            return execute(sql, params, many, context)
+
+        with connection.execute_wrapper(spy):
+            second = self.client.post(reverse("checkout"), self.data)
+
+        self.assertEqual(second.url, first.url)
+        self.assertEqual(writes, [])
+        self.assertEqual(Order.objects.count(), 1)
+
+    def test_concurrent_identical_posts_write_once(self):
+        n = 8
+        cookies = {k: m.value for k, m in self.client.cookies.items()}
+        barrier = threading.Barrier(n)
+        writers = []
+        urls = []
+        errors = []
+
+        def submit():
+            client = Client()
+            client.cookies.load(cookies)
+            writes = []
+
+            def spy(execute, sql, params, many, context):
+                # محاولة حجز التوكن مسموحة؛ المهم ما حدا غير الأول يكتب طلب
+                if _is_write(sql) and CheckoutClaim._meta.db_table not in sql:
+                    writes.append(sql)
+                return execute(sql, params, many, context)
+
+            try:
+                barrier.wait()
+                with connection.execute_wrapper(spy):
+                    response = client.post(reverse("checkout"), self.data)
+                urls.append(response.url)
+                if writes:
+                    writers.append(writes)
+            except Exception as exc:  # pragma: no cover - shown in the assertion below
+                errors.append(exc)
+            finally:
+                connection.close()
+
+        threads = [threading.Thread(target=submit) for _ in range(n)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+
+        self.assertEqual(errors, [])
+        self.assertEqual(len(writers), 1)
+        self.assertEqual(len(set(urls)), 1)
+        self.assertEqual(Order.objects.count(), 1)
+        self.assertEqual(OrderItem.objects.get().qty, 2)
+
+    @override_settings(SESSION_ENGINE="django.contrib.sessions.backends.signed_cookies")
+    def test_duplicate_without_session_record_is_claimed_in_db(self):
+        # إعادة إرسال بكوكي قديمة (ما فيها رقم الطلب) ومن غير كاش مشترك
+        self.client = Client()
+        self.client.get(reverse("landing"), {"t": "4"})
+        self.client.post(reverse("cart_add", args=[self.product.slug]), {"qty": 2})
+        self.data["submit_token"] = self.client.get(reverse("cart")).context["submit_token"]
+        cookies = {k: m.value for k, m in self.client.cookies.items()}
+        first = self.client.post(reverse("checkout"), self.data)
+
+        replay = Client()
+        replay.cookies.load(cookies)
+        second = replay.post(reverse("checkout"), self.data)
+
+        self.assertEqual(second.url, first.url)
+        self.assertEqual(Order.objects.count(), 1)
+        self.assertEqual(OrderItem.objects.get().qty, 2)
+        self.assertEqual(CheckoutClaim.objects.get().order_id, Order.objects.get().id)
+
+
+class QueryBudgetTests(TestCase):
+    """
+    كل صفحة من query_budgets.BUDGETS بتنفحص على داتا صغيرة وكبيرة:
+    لازم تبقى ضمن الميزانية، ونفس العدد بالحالتين (ما في N+1).
+    """
+    SIZES = {
+        "small": dict(categories=3, products=10, offers=2, tables=6, open_tables=2, cart_lines=2),
+        "large": dict(categories=12, products=200, offers=20, tables=40, open_tables=30, cart_lines=8),
+    }
+
+    def _seed(self, size):
+        opts = dict(self.SIZES[size])
+        cart_lines = opts.pop("cart_lines")
+        datagen.clear()
+        with self.captureOnCommitCallbacks(execute=True):
+            datagen.generate(datagen.DataSpec(seed=7, days=1, orders_per_day=20, **opts))
+        products = list(
+            Product.objects.filter(is_active=True, category__is_active=True).order_by("id")[:cart_lines]
+        )
+        return products
+
+    def _measure(self, size):
+        """
+        {url name: QueryLog} للطلب "الدافئ" (التاني) لكل صفحة.
+        """
+        products = self._seed(size)
+        logs = {}
+
+        def measure(name, client, method, path, data=None):
+            getattr(client, method)(path, data or {})  # تسخين: catalog / session / صور
+            if method == "post":
+                self._fill_cart(client, products)
+            with query_budgets.capture() as log:
+                response = getattr(client, method)(path, data or {})
+            self.assertLess(response.status_code, 400, f"{name} ({size}) → {response.status_code}")
+            logs[name] = log
+            return response
+
+        client = Client()
+        client.get(reverse("landing"), {"t": "99"})
+        self._fill_cart(client, products)
+        measure("home", client, "get", reverse("home"))
+        measure("cart", client, "get", reverse("cart"))
+
+        token = client.get(reverse("cart")).context["submit_token"]
+        client.post(reverse("checkout"), {"table_no": "99", "note": "", "submit_token": token})
+        self._fill_cart(client, products)
+        token = client.get(reverse("cart")).context["submit_token"]
+        with query_budgets.capture() as log:
+            response = client.post(reverse("checkout"), {"table_no": "99", "note": "", "submit_token": token})
+        self.assertEqual(response.status_code, 302)
+        logs["checkout"] = log
+
+        measure("order_status", client, "get", response.url)
+
+        staff = Client()
+        staff.force_login(get_user_model().objects.create(username=f"staff-{size}", is_staff=True))
+        measure("admin_dashboard", staff, "get", reverse("admin_dashboard"))
+        return logs
+
+    def _fill_cart(self, client, products):
+        for p in products:
+            client.post(reverse("cart_add", args=[p.slug]), {"qty": 1})
+
+    def test_views_stay_within_budget(self):
+        logs = self._measure("large")
+        failures = [
+            log.report(f"{name}: {len(log)} queries (budget {query_budgets.budget(name)})")
+            for name, log in logs.items()
+            if len(log) > query_budgets.budget(name)
+        ]
+        if failures:
+            self.fail("\n" + "\n".join(failures))
+
+    def test_query_count_does_not_grow_with_data(self):
+        small = self._measure("small")
+        large = self._measure("large")
+        failures = [
+            large[name].report(f"{name}: {len(small[name])} → {len(large[name])} queries (small → large data)")
+            for name in query_budgets.BUDGETS
+            if len(large[name]) > len(small[name])
+        ]
+        if failures:
+            self.fail("\n" + "\n".join(failures))
+
+
+class BrowseWritesTests(TestCase):
+    """
+    التصفح بدون تعديل على السلة ما لازم يكتب بالـ DB:
+    زائر جديد ما بينعمله session row، وزائر عنده سلة ما بتنحفظ الـ session تبعه.
+    """
+
+    def setUp(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            datagen.generate(datagen.DataSpec(seed=3, days=1, orders_per_day=5, categories=3, products=10,
+                                              offers=2, tables=4, open_tables=1))
+        self.product = Product.objects.filter(is_active=True, category__is_active=True).order_by("id").first()
+        self.category = self.product.category
+        self.offer = Offer.objects.filter(is_active=True).order_by("id").first()
+        self.order = Order.objects.order_by("id").first()
+
+    def _browse(self, client):
+        with query_budgets.capture() as log:
+            for path, data in [
+                (reverse("landing"), {"t": "5"}),
+                (reverse("landing"), {"t": "5"}),
+                (reverse("home"), {}),
+                (reverse("home"), {"cat": self.category.slug}),
+                (reverse("home"), {"q": self.product.name[:3]}),
+                (reverse("product_details", args=[self.product.slug]), {}),
+                (reverse("offers"), {}),
+                (reverse("offer_customize", args=[self.offer.slug]), {}),
+                (reverse("cart"), {}),
+                (reverse("cart"), {}),
+                (reverse("order_status", args=[self.order.id]), {}),
+            ]:
+                response = client.get(path, data)
+                self.assertEqual(response.status_code, 200, path)
+        return [q for q in log.queries if _is_write(q.sql)]
+
+    def test_anonymous_browse_writes_nothing(self):
+        client = Client()
+        self.assertEqual(self._browse(client), [])
+        self.assertEqual(Session.objects.count(), 0)
+        # رقم الطاولة بالكوكي بدل الـ session
+        self.assertEqual(client.get(reverse("cart")).context["table_no"], "5")
+
+    @override_settings(CART_STORE="session")
+    def test_browse_with_cart_writes_nothing(self):
+        client = Client()
+        client.get(reverse("landing"), {"t": "5"})
+        client.post(reverse("cart_add", args=[self.product.slug]), {"qty": 1})
+        client.get(reverse("cart"))  # توكن التأكيد بينكتب مرة وحدة
+        self.assertEqual(Session.objects.count(), 1)
+        self.assertEqual(self._browse(client), [])
+        self.assertEqual(client.get(reverse("cart")).context["table_no"], "5")
+
+
+@override_settings(CART_STORE="cookie")
+class CookieCartStoreTests(TestCase):
+    def setUp(self):
+        with self.captureOnCommitCallbacks(execute=True):  # نسخة منيو جديدة
+            cat = Category.objects.create(name="قهوة", slug="coffee")
+            self.products = [
+                Product.objects.create(category=cat, name=f"صنف {i}", slug=f"item-{i}", price_syp=1000 * (i + 1))
+                for i in range(3)
+            ]
+        self.client.get(reverse("home"))  # تسخين الـ catalog
+
+    def test_cart_actions_need_no_database(self):
+        with query_budgets.capture() as log:
+            self.client.post(reverse("cart_add", args=[self.products[0].slug]), {"qty": 2})
+            self.client.post(reverse("cart_add", args=[self.products[1].slug]), {"qty": 1})
+            self.client.post(reverse("cart_update_key"), {"key": f"p:{self.products[1].id}", "delta": "1"})
+            response = self.client.get(reverse("cart"))
+        self.assertEqual(len(log), 0, log.report("cart actions"))
+        self.assertEqual(Session.objects.count(), 0)
+        self.assertEqual(response.context["total"], 2 * 1000 + 2 * 2000)
+
+    def test_tampered_cookie_is_ignored(self):
+        self.client.post(reverse("cart_add", args=[self.products[0].slug]), {"qty": 1})
+        name = cart_srv.cart_cookie_name()
+        self.client.cookies[name] = self.client.cookies[name].value[:-2] + "xx"
+        self.assertEqual(self.client.get(reverse("cart")).context["total"], 0)
+
+    def test_oversized_cart_falls_back_to_session(self):
+        name = cart_srv.cart_cookie_name()
+        self.client.post(reverse("cart_add", args=[self.products[0].slug]), {"qty": 1})
+        limit = len(self.client.cookies[name].value) + 4  # سطر واحد بيساع، تلاتة لا
+
+        with self.settings(CART_COOKIE_MAX_BYTES=limit):
+            for p in self.products[1:]:
+                self.client.post(reverse("cart_add", args=[p.slug]), {"qty": 1})
+            self.assertEqual(Session.objects.count(), 1)
+            self.assertFalse(self.client.cookies[name].value)
+
+            # رجعت صغيرة → ترجع للكوكي وتنشال من الـ session
+            for p in self.products[1:]:
+                self.client.post(reverse("cart_remove_key"), {"key": f"p:{p.id}"})
+            self.assertTrue(self.client.cookies[name].value)
+            self.assertNotIn(cart_srv.SESSION_KEY, Session.objects.get().get_decoded())
+            self.assertEqual(self.client.get(reverse("cart")).context["total"], 1000)
+
+
+class SearchTests(TestCase):
+    def setUp(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            self.drinks = Category.objects.create(name="مشروبات", slug="drinks")
+            self.sweets = Category.objects.create(name="حلويات", slug="sweets")
+            self.turkish = Product.objects.create(category=self.drinks, name="القهوة التركية", slug="turkish",
+                                                  price_syp=10000)
+            self.tea = Product.objects.create(category=self.drinks, name="شاي", slug="tea",
+                                              description="بالنعناع", price_syp=5000)
+            self.lemonade = Product.objects.create(category=self.drinks, name="ليمون بالنعناع", slug="lemon-mint",
+                                                   price_syp=8000)
+            self.cake = Product.objects.create(category=self.sweets, name="كيكة الشوكولا", slug="cake",
+                                               price_syp=12000)
+
+    def _search(self, q, cat="all"):
+        return [p.slug for p in search.search_products(q, cat)]
+
+    def test_arabic_normalization(self):
+        self.assertEqual(search.normalize("أإآٱ"), "اااا")
+        self.assertEqual(search.normalize("قهوة"), search.normalize("قهوه"))
+        self.assertEqual(search.normalize("ليمـــون"), "ليمون")
+        self.assertEqual(search.normalize("شَايٌ"), "شاي")
+        self.assertEqual(search.normalize("Café"), "cafe")
+        self.assertEqual(self._search("كيكه"), ["cake"])
+        self.assertEqual(self._search("الشوكـولا"), ["cake"])
+
+    def test_proclitics_match_like_icontains(self):
+        self.assertEqual(self._search("قهوة"), ["turkish"])
+        self.assertEqual(self._search("القهوه"), ["turkish"])
+        self.assertEqual(self._search("نعناع"), ["lemon-mint", "tea"])  # الاسم أقوى من الوصف
+        self.assertEqual(self._search("بالنعناع"), ["lemon-mint", "tea"])
+
+    def test_prefix_and_all_terms(self):
+        self.assertEqual(self._search("ترك"), ["turkish"])
+        self.assertEqual(self._search("قهوة تركية"), ["turkish"])
+        self.assertEqual(self._search("قهوة نعناع"), [])
+
+    def test_category_scope(self):
+        self.assertEqual(self._search("نعناع", "sweets"), [])
+        self.assertEqual(self._search("شوكولا", "sweets"), ["cake"])
+
+    def test_incremental_update_on_save(self):
+        self._search("شاي")  # بناء الفهرس
+        with self.captureOnCommitCallbacks(execute=True):
+            self.tea.name = "شاي أخضر"
+            self.tea.save()
+        with mock.patch.object(search.SearchIndex, "rebuild") as rebuild:
+            self.assertEqual(self._search("اخضر"), ["tea"])
+        rebuild.assert_not_called()
+
+    @override_settings(MENU_CATALOG_MAX_AGE=0)
+    def test_follows_snapshot_changed_elsewhere(self):
+        # update() بدون signals متل تعديل من worker تاني: النسخة هون ما بتتحرك
+        self.assertEqual(self._search("شاي"), ["tea"])
+        Product.objects.filter(pk=self.tea.pk).update(name="موكا")
+        self.assertEqual(self._search("موكا"), ["tea"])
+        self.assertEqual(self._search("شاي"), [])
+
+
+class MenuSnapshotTests(TestCase):
+    """
+    worker تاني غيّر المنيو ومع LocMemCache النسخة هون ما تحرّكت: إعادة البناء
+    بعد MENU_CATALOG_MAX_AGE لازم تبيّن بالـ ETag وبالصفحة.
+    """
+
+    def setUp(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            cat = Category.objects.create(name="قهوة", slug="coffee")
+            self.product = Product.objects.create(category=cat, name="إسبريسو", slug="espresso", price_syp=15000)
+
+    def _change_elsewhere(self, **fields):
+        # update() بدون signals → ما في bump للنسخة
+        version = catalog_srv.current_version()
+        Product.objects.filter(pk=self.product.pk).update(**fields)
+        self.assertEqual(catalog_srv.current_version(), version)
+
+    @override_settings(MENU_CATALOG_MAX_AGE=0)
+    def test_etag_follows_catalog_contents(self):
+        url = reverse("product_details", args=[self.product.slug])
+        self.client.get(url)  # كوكي CSRF (جزء من الـ ETag)
+        first = self.client.get(url)
+        # نفس الداتا بعد إعادة البناء → نفس الـ ETag
+        self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=first["ETag"]).status_code, 304)
+
+        self._change_elsewhere(price_syp=17000)
+        second = self.client.get(url, HTTP_IF_NONE_MATCH=first["ETag"])
+        self.assertEqual(second.status_code, 200)
+        self.assertNotEqual(second["ETag"], first["ETag"])
+
+    @override_settings(MENU_CATALOG_MAX_AGE=0)
+    def test_home_sections_follow_catalog_contents(self):
+        self.assertContains(self.client.get(reverse("home")), "إسبريسو")
+        self._change_elsewhere(name="إسبريسو دبل")
+        self.assertContains(self.client.get(reverse("home")), "إسبريسو دبل")
+
+    @override_settings(MENU_CATALOG_MAX_AGE=0)
+    def test_cart_badge_follows_catalog_contents(self):
+        self.client.post(reverse("cart_add", args=[self.product.slug]), {"qty": 2})
+        self.assertContains(self.client.get(reverse("home")), "<strong>30000</strong>")
+        self._change_elsewhere(price_syp=20000)
+        self.assertContains(self.client.get(reverse("home")), "<strong>40000</strong>")
+        # نفس الـ snapshot → الملخص المحفوظ بيرجع بدون ما تنكتب الـ session
+        with query_budgets.capture() as log:
+            self.client.get(reverse("home"))
+        self.assertEqual([q.sql for q in log.queries if _is_write(q.sql)], [])
+
+
+class CatalogImportSlugTests(TestCase):
+    def test_arabic_names_keep_their_letters(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            catalog_io.import_data({
+                "categories": [{"slug": "drinks", "name": "مشروبات"}],
+                "products": [
+                    {"name": "قهوة تركية", "category": "drinks", "price_syp": 10000},
+                    {"name": "قهوة تركية", "category": "drinks", "price_syp": 12000},
+                    {"slug": "tea", "name": "شاي", "category": "drinks", "price_syp": 5000},
+                ],
+            })
+        slugs = set(Product.objects.values_list("slug", flat=True))
+        self.assertEqual(slugs, {"قهوة-تركية", "قهوة-تركية-2", "tea"})
+        url = reverse("product_details", args=["قهوة-تركية"])
+        self.assertEqual(self.client.get(url).status_code, 200)
+
+    def test_invalid_slug_in_file_is_an_error(self):
+        data = {
+            "categories": [{"slug": "drinks", "name": "مشروبات"}],
+            "products": [{"slug": "hot coffee/x", "name": "قهوة", "category": "drinks", "price_syp": 10000}],
+        }
+        with self.assertRaises(catalog_io.CatalogImportError) as cm:
+            catalog_io.import_data(data)
+        self.assertIn("hot coffee/x", str(cm.exception))
+        self.assertFalse(Product.objects.exists())
+        self.assertFalse(Category.objects.exists())
+        self.assertEqual(self.client.get(reverse("home")).status_code, 200)
+
+
+class ResponsiveImageTests(TestCase):
+    TAG = Template('{% load menu_images %}{% responsive_image p.image "img/product-3.jpg" alt="prod" %}')
+
+    def _product(self, color="red"):
+        from PIL import Image
+
+        buf = io.BytesIO()
+        Image.new("RGB", (500, 300), color).save(buf, "JPEG")
+        with self.captureOnCommitCallbacks(execute=True):
+            cat = Category.objects.get_or_create(name="قهوة", slug="coffee")[0]
+            return Product.objects.create(
+                category=cat, name=f"صنف {color}", slug=f"item-{color}", price_syp=1000,
+                image=SimpleUploadedFile(f"{color}.jpg", buf.getvalue(), content_type="image/jpeg"),
+            )
+
+    def _render(self, product) -> str:
+        return self.TAG.render(Context({"p": product}))
+
+    def test_media_root_is_temporary(self):
+        self.assertTrue(str(settings.MEDIA_ROOT).startswith(tempfile.gettempdir()))
+
+    @override_settings(MENU_IMAGE_EAGER=False)
+    def test_template_only_looks_up(self):
+        product = self._product("blue")
+        html = self._render(product)
+        self.assertIn(product.image.url, html)
+        self.assertNotIn("srcset", html)
+        digest = images._content_hash(product.image.path)
+        self.assertFalse(os.path.exists(images._out_dir(digest)))
+
+    def test_generated_on_save(self):
+        html = self._render(self._product("green"))
+        self.assertIn('type="image/webp"', html)
+        # ما منكبّر: 960 → عرض الأصل
+        self.assertIn("320.webp 320w", html)
+        self.assertIn("500.jpg 500w", html)
+        self.assertNotIn(" 960w", html)
+
+    @override_settings(MENU_IMAGE_EAGER=False)
+    def test_build_images_command(self):
+        product = self._product("red")
+        call_command("build_images", stdout=io.StringIO())
+        self.assertIn("500.webp 500w", self._render(product))
+
+
+class MetricsTests(TestCase):
+    def setUp(self):
+        # عدّادات الاختبارات السابقة (on_commit) لسا بالذاكرة → عالملف القديم
+        metrics.flush()
+        tmp = tempfile.mkdtemp(dir=settings.MEDIA_ROOT)
+        self.settings_override = override_settings(METRICS_DB=os.path.join(tmp, "metrics.sqlite3"))
+        self.settings_override.enable()
+        self.addCleanup(self.settings_override.disable)
+
+    def _lines(self, prefix):
+        return [line for line in metrics.render().splitlines() if line.startswith(prefix)]
+
+    def test_flushes_from_workers_add_up(self):
+        # كل flush متل worker لحاله: الفروقات بتنضاف عالملف المشترك
+        metrics.inc("arabella_orders_created_total", 2)
+        metrics.flush()
+        metrics.inc("arabella_orders_created_total", 3)
+        self.assertEqual(self._lines("arabella_orders_created_total "),
+                         ["arabella_orders_created_total 5"])
+
+    def test_histogram_buckets_are_cumulative(self):
+        for seconds in (0.003, 0.02, 20):
+            metrics.observe("arabella_checkout_duration_seconds", seconds, case="render")
+        lines = self._lines("arabella_checkout_duration_seconds")
+        self.assertIn('arabella_checkout_duration_seconds_bucket{case="render",le="0.005"} 1', lines)
+        self.assertIn('arabella_checkout_duration_seconds_bucket{case="render",le="0.01"} 1', lines)
+        self.assertIn('arabella_checkout_duration_seconds_bucket{case="render",le="0.025"} 2', lines)
+        self.assertIn('arabella_checkout_duration_seconds_bucket{case="render",le="10"} 2', lines)
+        self.assertIn('arabella_checkout_duration_seconds_bucket{case="render",le="+Inf"} 3', lines)
+        self.assertIn('arabella_checkout_duration_seconds_count{case="render"} 3', lines)
+        self.assertIn('arabella_checkout_duration_seconds_sum{case="render"} 20.023', lines)
+        self.assertIn("# TYPE arabella_checkout_duration_seconds histogram", metrics.render().splitlines())
+
+    def test_label_values_are_escaped(self):
+        metrics.inc("arabella_cache_requests_total", cache='5"\\')
+        self.assertEqual(self._lines('arabella_cache_requests_total{cache="5\\"'),
+                         ['arabella_cache_requests_total{cache="5\\"\\\\"} 1'])
+
+    def test_status_duration_counts_from_last_status_change(self):
+        # دمج بالطلب (updated_at جديد) ما بيصفّر وقت الحالة
+        order = Order.objects.create(table_no="3", status=Order.Status.PREPARING,
+                                     status_changed_at=timezone.now() - timedelta(minutes=10))
+        order.note = "بدون سكر"
+        order.save()
+        staff = Client()
+        staff.force_login(get_user_model().objects.create_superuser("boss", password="x"))
+        with self.captureOnCommitCallbacks(execute=True):
+            staff.post(reverse("admin_set_status", args=[order.id]), {"status": Order.Status.READY})
+        self.assertIn('arabella_order_status_duration_seconds_bucket'
+                      '{status_from="preparing",status_to="ready",le="600"} 0',
+                      self._lines("arabella_order_status_duration_seconds_bucket"))
+        self.assertIn('arabella_order_status_duration_seconds_bucket'
+                      '{status_from="preparing",status_to="ready",le="900"} 1',
+                      self._lines("arabella_order_status_duration_seconds_bucket"))
+
+    def test_orders_created_has_no_table_label(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            Product.objects.create(category=Category.objects.create(name="c", slug="c"), name="p", slug="p", price_syp=1)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.post(reverse("cart_add", args=["p"]), {"qty": 1})
+            self.client.post(reverse("checkout"), {"table_no": "any-table"})
+        self.assertEqual(self._lines("arabella_orders_created_total"), ["arabella_orders_created_total 1"])
+
+    @override_settings(METRICS_FLUSH_INTERVAL=0)
+    def test_request_thread_does_not_flush(self):
+        calls = []
+        with mock.patch.object(metrics, "flush", side_effect=lambda: calls.append(threading.current_thread())):
+            metrics.observe("arabella_checkout_duration_seconds", 0.1, case="inline")
+        self.assertNotIn(threading.current_thread(), calls)
+
+
+class RollupTests(TestCase):
+    def setUp(self):
+        cat = Category.objects.create(name="قهوة", slug="coffee")
+        self.espresso = Product.objects.create(category=cat, name="إسبريسو", slug="espresso", price_syp=15000)
+        self.latte = Product.objects.create(category=cat, name="لاتيه", slug="latte", price_syp=20000)
+        self.order = Order.objects.create(table_no="7", total_syp=50000)
+        self.items = [
+            OrderItem.objects.create(order=self.order, product=p, name_snapshot=p.name,
+                                     price_syp_snapshot=p.price_syp, qty=qty)
+            for p, qty in ((self.espresso, 2), (self.latte, 1))
+        ]
+        self.staff = Client()
+        self.staff.force_login(get_user_model().objects.create_superuser("boss", password="x"))
+
+    def _sales(self):
+        return {r.item_key: (r.qty, r.orders, r.revenue_syp) for r in DailyItemSales.objects.all() if r.qty}
+
+    def _set_status(self, status):
+        self.staff.post(reverse("admin_set_status", args=[self.order.id]), {"status": status})
+
+    def test_delivered_twice_counts_once(self):
+        self._set_status(Order.Status.DELIVERED)
+        self._set_status(Order.Status.DELIVERED)
+        self.assertEqual(self._sales(), {
+            f"product:{self.espresso.id}": (2, 1, 30000),
+            f"product:{self.latte.id}": (1, 1, 20000),
+        })
+        self.assertEqual(HourlySales.objects.get().revenue_syp, 50000)
+
+        self._set_status(Order.Status.READY)
+        self.assertEqual(self._sales(), {})
+        self.assertFalse(Order.objects.get().in_rollups)
+
+    def test_backfill_matches_incremental(self):
+        self._set_status(Order.Status.DELIVERED)
+        incremental = self._sales()
+        rollups.backfill()
+        self.assertEqual(self._sales(), incremental)
+        self.assertTrue(Order.objects.get().in_rollups)
+
+    def test_admin_save_counts_saved_inlines(self):
+        # حذف سطر مع "تم التسليم" بنفس الحفظ: الـ rollups بعد الـ inlines
+        local = timezone.localtime(self.order.created_at)
+        data = {
+            "table_no": "7", "status": Order.Status.DELIVERED, "note": "", "total_syp": 50000,
+            "created_at_0": local.strftime("%Y-%m-%d"), "created_at_1": local.strftime("%H:%M:%S"),
+            "items-TOTAL_FORMS": 2, "items-INITIAL_FORMS": 2, "items-MIN_NUM_FORMS": 0, "items-MAX_NUM_FORMS": 1000,
+        }
+        for i, it in enumerate(self.items):
+            data.update({
+                f"items-{i}-id": it.id, f"items-{i}-order": self.order.id, f"items-{i}-item_type": it.item_type,
+                f"items-{i}-product": it.product_id, f"items-{i}-note_snapshot": "",
+                f"items-{i}-prepared_qty": 0,
+            })
+        data["items-1-DELETE"] = "on"
+        response = self.staff.post(reverse("admin:menu_order_change", args=[self.order.id]), data)
+        self.assertEqual(response.status_code, 302, getattr(response, "context_data", {}).get("errors"))
+        self.assertEqual(self._sales(), {f"product:{self.espresso.id}": (2, 1, 30000)})
+
+
+
+class TableStateTests(TestCase):
+    def setUp(self):
+        self.staff = Client()
+        self.staff.force_login(get_user_model().objects.create_superuser("boss", password="x"))
+        self.old = Order.objects.create(table_no="4", status=Order.Status.DELIVERED)
+        self.current = Order.objects.create(table_no="4")
+        TableState.objects.create(table_no="4", order=self.current, status=self.current.status)
+
+    def test_reopening_old_order_keeps_current_one(self):
+        self.staff.post(reverse("admin_set_status", args=[self.old.id]), {"status": Order.Status.NEW})
+        self.old.refresh_from_db()
+        self.assertEqual(self.old.status, Order.Status.DELIVERED)
+        self.assertEqual(TableState.open_order_id("4"), self.current.id)
+
+    def test_sync_leaves_busy_table_alone(self):
+        self.old.status = Order.Status.NEW
+        self.assertFalse(TableState.sync(self.old))
+        self.assertEqual(TableState.open_order_id("4"), self.current.id)
+
+    def test_reopening_after_table_freed(self):
+        self.staff.post(reverse("admin_set_status", args=[self.current.id]), {"status": Order.Status.CANCELED})
+        self.staff.post(reverse("admin_set_status", args=[self.old.id]), {"status": Order.Status.NEW})
+        self.assertEqual(TableState.open_order_id("4"), self.old.id)
+
+
+class LiveCursorTests(TestCase):
+    def setUp(self):
+        self.staff = Client()
+        self.staff.force_login(get_user_model().objects.create_superuser("boss", password="x"))
+        Order.objects.create(table_no="2")
+
+    def test_out_of_range_cursor_is_ignored(self):
+        for raw in ("1000000000000000000000000000000-1", "-1-1", "99999999999999999-1", "1000-99999999999999999999999"):
+            for name in ("admin_feed", "admin_prep_feed"):
+                with self.subTest(raw=raw, view=name):
+                    self.assertEqual(self.staff.get(reverse(name), {"cursor": raw}).status_code, 200)
+
+
+class PrepStationCheckTests(TestCase):
+    @override_settings(PREP_STATIONS={"bar": ["coffee", "hot-drinks"]})
+    def test_warns_about_unknown_category_slugs(self):
+        Category.objects.create(name="قهوة", slug="coffee")
+        warnings = prep.check_stations(databases=["default"])
+        self.assertEqual([w.id for w in warnings], ["menu.W001"])
+        self.assertIn("'hot-drinks'", warnings[0].msg)
+        self.assertEqual(prep.check_stations(), [])
+
+
+@override_settings(LIVE_POLL_INTERVAL=0.01)
+class OrderStatusPollTests(TestCase):
+    def setUp(self):
+        self.order = Order.objects.create(table_no="6", total_syp=15000)
+        self.url = reverse("order_status", args=[self.order.id])
+        self.etag = self.client.get(self.url)["ETag"]
+
+    def _patch_wait(self, on_wait):
+        # نسختين: views (thread) و async_views (event loop) حسب ASYNC_VIEWS
+        def wait(seq, timeout):
+            on_wait()
+
+        async def await_change(seq, timeout):
+            await sync_to_async(on_wait)()
+
+        for name, fake in (("wait_for_change", wait), ("await_change", await_change)):
+            patcher = mock.patch.object(live, name, side_effect=fake)
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+    def test_unchanged_order_is_304(self):
+        response = self.client.get(self.url, headers={"if-none-match": self.etag})
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response["ETag"], self.etag)
+
+    def test_wait_times_out_with_304(self):
+        waits = []
+        self._patch_wait(lambda: waits.append(1))
+        response = self.client.get(self.url, {"wait": "0.05"}, headers={"if-none-match": self.etag})
+        self.assertEqual(response.status_code, 304)
+        self.assertTrue(waits)
+
+    def test_wait_returns_when_status_changes(self):
+        self._patch_wait(lambda: Order.objects.filter(id=self.order.id).update(
+            status=Order.Status.READY, updated_at=timezone.now()))
+        response = self.client.get(self.url, {"wait": "20"}, headers={"if-none-match": self.etag})
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response["ETag"], self.etag)
+        self.assertEqual(response.context["order"].status, Order.Status.READY)
+
+    def test_wait_without_matching_etag_answers_at_once(self):
+        self._patch_wait(lambda: self.fail("should not wait"))
+        self.assertEqual(self.client.get(self.url, {"wait": "20"}, headers={"if-none-match": '"old"'}).status_code, 200)
+
+
+class CheckoutMergeTests(TestCase):
+    def setUp(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            cat = Category.objects.create(name="قهوة", slug="coffee")
+            self.espresso = Product.objects.create(category=cat, name="إسبريسو", slug="espresso", price_syp=15000)
+            self.latte = Product.objects.create(category=cat, name="لاتيه", slug="latte", price_syp=20000)
+            self.mocha = Product.objects.create(category=cat, name="موكا", slug="mocha", price_syp=25000)
+        self.client.get(reverse("landing"), {"t": "9"})
+
+    def _checkout(self, note=""):
+        # بدون submit_token: نفس السلة مرتين = طلبين من الزبون مو ضغط مزدوج
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.post(reverse("checkout"), {"table_no": "9", "note": note})
+        self.assertEqual(response.status_code, 302)
+        return Order.objects.get(id=response.url.rstrip("/").rsplit("/", 1)[-1])
+
+    def _items(self, order):
+        return {it.product_id: (it.id, it.qty, it.price_syp_snapshot) for it in order.items.all()}
+
+    def test_second_checkout_merges_into_open_order(self):
+        self.client.post(reverse("cart_add", args=["espresso"]), {"qty": 2})
+        self.client.post(reverse("cart_add", args=["latte"]), {"qty": 1})
+        first = self._checkout()
+        self.assertEqual(first.total_syp, 50000)
+        before = self._items(first)
+
+        # latte → mocha، وespresso +1
+        self.client.post(reverse("cart_update_key"), {"key": f"p:{self.espresso.id}", "delta": 1})
+        self.client.post(reverse("cart_remove_key"), {"key": f"p:{self.latte.id}"})
+        self.client.post(reverse("cart_add", args=["mocha"]), {"qty": 1})
+        second = self._checkout(note="بسرعة")
+
+        self.assertEqual(second.id, first.id)
+        self.assertEqual(Order.objects.count(), 1)
+        after = self._items(second)
+        self.assertEqual(set(after), {self.espresso.id, self.mocha.id})
+        # نفس السطر (نفس الـ id) بس الكمية تغيّرت
+        self.assertEqual(after[self.espresso.id], (before[self.espresso.id][0], 3, 15000))
+        self.assertEqual(after[self.mocha.id][1:], (1, 25000))
+        self.assertEqual((second.total_syp, second.note), (3 * 15000 + 25000, "بسرعة"))
+
+    def test_unchanged_cart_keeps_items_and_total(self):
+        self.client.post(reverse("cart_add", args=["espresso"]), {"qty": 2})
+        first = self._checkout()
+        before = self._items(first)
+        second = self._checkout()
+        self.assertEqual(second.id, first.id)
+        self.assertEqual(self._items(second), before)
+        self.assertEqual(second.total_syp, 30000)
+
+    def test_price_change_rewrites_snapshot_and_total(self):
+        self.client.post(reverse("cart_add", args=["espresso"]), {"qty": 2})
+        first = self._checkout()
+        with self.captureOnCommitCallbacks(execute=True):
+            self.espresso.price_syp = 18000
+            self.espresso.save()
+        second = self._checkout()
+        item_id = self._items(first)[self.espresso.id][0]
+        self.assertEqual(self._items(second), {self.espresso.id: (item_id, 2, 18000)})
+        self.assertEqual(second.total_syp, 36000)
+
+
+class HistoryTests(TestCase):
+    def setUp(self):
+        self.staff = Client()
+        self.staff.force_login(get_user_model().objects.create_superuser("boss", password="x"))
+        now = timezone.now()
+        same = now - timedelta(hours=1)
+        rows = [
+            ("1", Order.Status.DELIVERED, now - timedelta(minutes=5)),
+            ("2", Order.Status.DELIVERED, same),
+            ("2", Order.Status.CANCELED, same),     # نفس created_at → الترتيب على id
+            ("3", Order.Status.DELIVERED, same),
+            ("1", Order.Status.CANCELED, now - timedelta(days=3)),
+            ("1", Order.Status.NEW, now),           # مفتوح → مو بالسجل الافتراضي
+        ]
+        self.orders = [Order.objects.create(table_no=t, status=s, created_at=c) for t, s, c in rows]
+
+    def _ids(self, **params):
+        return [o.id for o in self.staff.get(reverse("admin_history"), params).context["orders"]]
+
+    def test_keyset_pages_cover_every_order_once(self):
+        expected = [o.id for o in sorted(self.orders[:5], key=lambda o: (o.created_at, o.id), reverse=True)]
+        f = history.parse_filter({})
+        seen, cursor = [], None
+        while True:
+            orders, raw = history.page(f, cursor, limit=2)
+            seen += [o.id for o in orders]
+            if not raw:
+                break
+            cursor = history.parse_cursor(raw)
+        self.assertEqual(seen, expected)
+
+    def test_next_link_keeps_filters(self):
+        Order.objects.bulk_create(
+            Order(table_no="8", status=Order.Status.DELIVERED) for _ in range(history.PAGE_SIZE + 1)
+        )
+        response = self.staff.get(reverse("admin_history"), {"table": "8"})
+        self.assertEqual(len(response.context["orders"]), history.PAGE_SIZE)
+        self.assertIn("table=8", response.context["next_qs"])
+        rest = self.staff.get(reverse("admin_history") + "?" + response.context["next_qs"])
+        self.assertEqual(len(rest.context["orders"]), 1)
+        self.assertFalse(rest.context["next_qs"])
+
+    def test_filters(self):
+        o = self.orders
+        self.assertEqual(self._ids(status="canceled"), [o[2].id, o[4].id])
+        self.assertEqual(self._ids(table="#2"), [o[2].id, o[1].id])
+        self.assertEqual(self._ids(status="all", table="1"), [o[5].id, o[0].id, o[4].id])
+        self.assertNotIn(o[4].id, self._ids(range="today"))
+        day = timezone.localtime(o[4].created_at).date().isoformat()
+        self.assertEqual(self._ids(**{"from": day, "to": day}), [o[4].id])
+
+
+@override_settings(PREP_STATIONS={"bar": ["coffee"]}, PREP_DEFAULT_STATION="kitchen")
+class PrepQueueTests(TestCase):
+    def setUp(self):
+        self.staff = Client()
+        self.staff.force_login(get_user_model().objects.create_superuser("boss", password="x"))
+        coffee = Category.objects.create(name="قهوة", slug="coffee")
+        shisha = Category.objects.create(name="أركيلة", slug="shisha")
+        self.espresso = Product.objects.create(category=coffee, name="إسبريسو", slug="espresso", price_syp=15000)
+        self.mint = Product.objects.create(category=shisha, name="أركيلة نعنع", slug="mint", price_syp=40000)
+        now = timezone.now()
+        self.first = Order.objects.create(table_no="1", created_at=now - timedelta(minutes=10))
+        self.second = Order.objects.create(table_no="2", created_at=now - timedelta(minutes=5))
+        closed = Order.objects.create(table_no="3", status=Order.Status.DELIVERED)
+        for order, product, qty, note in (
+            (self.first, self.espresso, 2, ""),
+            (self.second, self.espresso, 3, "بدون سكر"),
+            (self.second, self.mint, 1, ""),
+            (closed, self.espresso, 4, ""),
+        ):
+            OrderItem.objects.create(order=order, product=product, name_snapshot=product.name,
+                                     price_syp_snapshot=product.price_syp, qty=qty, note_snapshot=note)
+        self.key = f"product:{self.espresso.id}"
+
+    def test_open_orders_grouped_by_item_and_station(self):
+        rows = {r.key: r for r in prep.queue()}
+        espresso = rows[self.key]
+        self.assertEqual((espresso.station, espresso.pending, espresso.orders), ("bar", 5, 2))
+        self.assertEqual(espresso.notes, [{"note": "", "pending": 2}, {"note": "بدون سكر", "pending": 3}])
+        self.assertEqual(espresso.since, self.first.created_at)
+        self.assertEqual(rows[f"product:{self.mint.id}"].station, "kitchen")
+        self.assertEqual([r.key for r in prep.queue("bar")], [self.key])
+
+    def test_prepare_takes_oldest_order_first(self):
+        response = self.staff.post(reverse("admin_prep_prepare"), {"key": self.key, "qty": 3})
+        data = response.json()
+        self.assertEqual(data["marked"], 3)
+        self.assertEqual(data["row"]["pending"], 2)
+        self.assertEqual(data["orders"], {str(self.first.id): "ready", str(self.second.id): "preparing"})
+        self.first.refresh_from_db()
+        self.second.refresh_from_db()
+        self.assertEqual((self.first.status, self.second.status), (Order.Status.READY, Order.Status.PREPARING))
+
+        # بدون qty → كل الباقي؛ الصنف بيطلع من الطابور بس الأركيلة لسا ناقصة
+        data = self.staff.post(reverse("admin_prep_prepare"), {"key": self.key}).json()
+        self.assertEqual((data["marked"], data["row"]), (2, None))
+        self.assertEqual([r.key for r in prep.queue()], [f"product:{self.mint.id}"])
+        self.assertEqual(Order.objects.get(id=self.second.id).status, Order.Status.PREPARING)
+
+    def test_prepare_rejects_non_positive_qty(self):
+        response = self.staff.post(reverse("admin_prep_prepare"), {"key": self.key, "qty": 0})
+        self.assertEqual(response.status_code, 400)
+
+
+@override_settings(SESSION_ENGINE="menu.sessions", SESSION_ANON_AGE=600, SESSION_STAFF_AGE=86400)
+class SessionExpiryTests(TestCase):
+    def _expires_in(self, key) -> float:
+        return (Session.objects.get(pk=key).expire_date - timezone.now()).total_seconds()
+
+    def test_age_depends_on_owner(self):
+        visitor = sessions.SessionStore()
+        visitor["table_no"] = "5"
+        visitor.save()
+        self.assertAlmostEqual(self._expires_in(visitor.session_key), 600, delta=30)
+
+        staff = Client()
+        get_user_model().objects.create_superuser("boss", password="x")
+        self.assertTrue(staff.login(username="boss", password="x"))
+        self.assertAlmostEqual(self._expires_in(staff.session.session_key), 86400, delta=30)
+
+    def test_purge_deletes_only_expired_in_batches(self):
+        now = timezone.now()
+        Session.objects.bulk_create(
+            [Session(session_key=f"old{i:02}", session_data="", expire_date=now - timedelta(minutes=i + 1))
+             for i in range(7)]
+            + [Session(session_key=f"live{i}", session_data="", expire_date=now + timedelta(hours=1))
+               for i in range(2)]
+        )
+        deletes = []
+
+        def spy(execute, sql, params, many, context):
+            if sql.lstrip().upper().startswith("DELETE"):
+                deletes.append(sql)
+            return execute(sql, params, many, context)
+
+        with connection.execute_wrapper(spy):
+            self.assertEqual(sessions.purge_expired(batch_size=3, now=now), 7)
+        self.assertEqual(len(deletes), 3)
+        self.assertEqual(sorted(Session.objects.values_list("pk", flat=True)), ["live0", "live1"])
+        self.assertEqual(sessions.purge_expired(batch_size=3, now=now), 0)
+
+    def test_purge_checkout_claims_keeps_fresh_ones(self):
+        CheckoutClaim.objects.create(token="fresh", digest="x")
+        CheckoutClaim.objects.create(token="stale", digest="x")
+        CheckoutClaim.objects.filter(pk="stale").update(updated_at=timezone.now() - timedelta(hours=1))
+        self.assertEqual(sessions.purge_checkout_claims(), 1)
+        self.assertEqual(list(CheckoutClaim.objects.values_list("pk", flat=True)), ["fresh"])
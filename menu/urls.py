@@ -1,23 +1,32 @@
-from django.urls import path
+from django.conf import settings
+from django.urls import path, register_converter
 from . import views
 from . import admin_views
+from . import async_views
+from .slugs import UnicodeSlugConverter
+
+register_converter(UnicodeSlugConverter, "uslug")
+
+# صفحات القراءة + الـ long-poll: نسخ async مع ASGI (ASYNC_VIEWS)
+reads = async_views if getattr(settings, "ASYNC_VIEWS", False) else views
+polls = async_views if getattr(settings, "ASYNC_VIEWS", False) else admin_views
 
 urlpatterns = [
-    path("", views.landing, name="landing"),
-    path("home/", views.home, name="home"),
+    path("", reads.landing, name="landing"),
+    path("home/", reads.home, name="home"),
 
     # صفحات العروض
-    path("offers/", views.offers, name="offers"),
+    path("offers/", reads.offers, name="offers"),
 
     # ✅ تخصيص عرض (Route واحد فقط) - حسب الـ slug
-    path("offer/<slug:slug>/", views.offer_customize, name="offer_customize"),
+    path("offer/<uslug:slug>/", reads.offer_customize, name="offer_customize"),
 
     # تفاصيل منتج
-    path("product/<slug:slug>/", views.product_details, name="product_details"),
+    path("product/<uslug:slug>/", reads.product_details, name="product_details"),
 
     # السلة
     path("cart/", views.cart_page, name="cart"),
-    path("cart/add/<slug:slug>/", views.cart_add, name="cart_add"),
+    path("cart/add/<uslug:slug>/", views.cart_add, name="cart_add"),
     path("cart/add-offer/<int:offer_id>/", views.cart_add_offer, name="cart_add_offer"),
 
     # تحديث/حذف بسطر السلة باستخدام key (p:12 / o:3)
@@ -30,12 +39,22 @@ urlpatterns = [
 
     # الطلب
     path("order/success/<int:order_id>/", views.order_success, name="order_success"),
-    path("order/status/<int:order_id>/", views.order_status, name="order_status"),
+    path("order/status/<int:order_id>/", reads.order_status, name="order_status"),
 
     # لوحة الأدمن
     path("panel/", admin_views.dashboard, name="admin_dashboard"),
     path("panel/order/<int:order_id>/status/", admin_views.set_status, name="admin_set_status"),
     path("panel/order/<int:order_id>/done/", admin_views.done, name="admin_done"),
+    path("panel/feed/", polls.feed, name="admin_feed"),
+    path("panel/feed/stream/", admin_views.feed_stream, name="admin_feed_stream"),
+    path("panel/metrics/", admin_views.metrics_view, name="admin_metrics"),
+    path("panel/history/", admin_views.history, name="admin_history"),
+    path("panel/order/<int:order_id>/", admin_views.order_details, name="admin_order_details"),
+    path("panel/items/", admin_views.items, name="admin_items"),
+    path("panel/reports/", admin_views.reports, name="admin_reports"),
+    path("panel/prep/", admin_views.prep_queue, name="admin_prep"),
+    path("panel/prep/feed/", polls.prep_feed, name="admin_prep_feed"),
+    path("panel/prep/prepare/", admin_views.prep_prepare, name="admin_prep_prepare"),
 
 
 
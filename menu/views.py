@@ -1,20 +1,37 @@
+import functools
+import hashlib
+import time
+from datetime import timedelta
+from typing import Tuple
+
+from django.conf import settings
 from django.shortcuts import render, get_object_or_404, redirect
+from django.template.loader import render_to_string
+from django.utils.safestring import mark_safe
 from django.views.decorators.http import require_POST
-from django.http import JsonResponse
-from django.db import transaction
-from django.db.models import Q
-from .models import Category, Product, Offer, Order, OrderItem
+from django.http import HttpResponse, JsonResponse, Http404
+from django.db import IntegrityError, transaction
+from django.utils.cache import get_conditional_response, patch_cache_control, patch_vary_headers
+from django.utils import timezone
+from django.utils.http import http_date, quote_etag
+from .models import CheckoutClaim, Product, Offer, Order, OrderItem, TableState
 from . import cart as cart_srv
+from . import catalog as catalog_srv
+from . import fragments
+from . import search as search_srv
+from . import table as table_srv
+from . import live
+from . import metrics
+from .db import atomic_retry
 
 
-CLOSED_STATUSES = [Order.Status.DELIVERED, Order.Status.CANCELED]
+CLOSED_STATUSES = Order.CLOSED_STATUSES
 
 
 def capture_table_from_qr(request):
-    t = (request.GET.get("t") or "").strip()
-    if t:
-        request.session["table_no"] = t
-        request.session.modified = True
+    # بيكتب بس إذا الطاولة تغيّرت (شوف menu/table.py)
+    table_srv.capture_from_qr(request)
+
 
 def ensure_cart_not_cleared_if_open(request):
     """
@@ -28,17 +45,58 @@ def ensure_cart_not_cleared_if_open(request):
     if not table_no:
         return
 
-    open_order_exists = Order.objects.filter(table_no=table_no).exclude(status__in=CLOSED_STATUSES).exists()
-    if not open_order_exists:
-        cart_srv.clear(request.session)
-        request.session.modified = True
-
+    if TableState.open_order_id(table_no) is None:
+        cart_srv.clear(cart_srv.store_for(request))
+        request.session.pop("has_submitted_order", None)
 
 
 def _cart_summary(session):
-    lines, total = cart_srv.get_lines(session)
-    count = sum(int(ln.qty) for ln in lines)
-    return count, int(total)
+    return cart_srv.summary(session)
+
+
+def _menu_etag(request, menu, page: str, *parts) -> str:
+    """
+    validator رخيص لصفحات المنيو بدون ولا استعلام: بصمة الـ snapshot (menu.digest)
+    + باراميترات الـ GET + بصمة السلة (+ كوكي CSRF لأن بالصفحات فورمات).
+    مع CART_STORE = "session" بصمة السلة بتحمّل الـ session (استعلام واحد).
+    """
+    raw = repr((
+        menu.digest,
+        page,
+        parts,
+        sorted(request.GET.lists()),
+        cart_srv.digest(cart_srv.store_for(request)),
+        request.COOKIES.get(settings.CSRF_COOKIE_NAME, ""),
+    ))
+    return quote_etag(f"m{hashlib.sha1(raw.encode()).hexdigest()[:24]}")
+
+
+def _menu_headers(response, etag: str):
+    if response.status_code in (200, 304):
+        response["ETag"] = etag
+        # الصفحة بتختلف حسب السلة (كوكي) → proxy ما بيخلطها بين الزبائن
+        patch_vary_headers(response, ("Cookie",))
+        patch_cache_control(response, private=True, no_cache=True)
+    return response
+
+
+def conditional_menu_page(view):
+    """
+    If-None-Match مطابق → 304 قبل أي render (الـ ETag من الـ snapshot الحالي،
+    فإذا خلص عمره بينبنى من جديد أول).
+    الطاولة من ?t= والسلة المسكّرة بيتعالجوا أول (ممكن يغيّروا البصمة).
+    """
+    @functools.wraps(view)
+    def wrapper(request, *args, **kwargs):
+        capture_table_from_qr(request)
+        ensure_cart_not_cleared_if_open(request)
+        menu = catalog_srv.get_catalog()
+        etag = _menu_etag(request, menu, view.__name__, *args, *sorted(kwargs.items()))
+        response = get_conditional_response(request, etag=etag)
+        if response is None:
+            response = view(request, *args, **kwargs)
+        return _menu_headers(response, etag)
+    return wrapper
 
 
 def landing(request):
@@ -47,48 +105,63 @@ def landing(request):
     return render(request, "index.html")
 
 
-def home(request):
-    capture_table_from_qr(request)
+CART_BADGE_SLOT = mark_safe("<!--arabella:cart-badge-->")
 
-    q = (request.GET.get("q") or "").strip()
-    selected_cat = (request.GET.get("cat") or "all").strip()
 
-    categories = Category.objects.filter(is_active=True).order_by("order", "name")
-    offers = Offer.objects.filter(is_active=True).order_by("order", "title")[:10]
-
-    products = Product.objects.filter(
-        is_active=True,
-        category__is_active=True
-    ).select_related("category")
-
-    # ✅ فلترة حسب التصنيف
-    if selected_cat != "all":
-        products = products.filter(category__slug=selected_cat)
+def _home_sections(menu, selected_cat: str, q: str, lookup: bool = True) -> Tuple[str, str]:
+    """
+    صفحة home كاملة ما عدا شارة السلة: (قبل الشارة، بعدها).
+    بتنعمل render مرة وحدة لكل (بصمة الـ snapshot، التصنيف، البحث) وبتنحفظ بـ fragments.
+    بدون request بالـ context حتى ما يدخل شي خاص بزائر عالكاش.
+    lookup=False: المتصل فحص الكاش قبل (async_views.home).
+    """
+    key = (menu.digest, selected_cat, q)
+    if lookup:
+        parts = fragments.home_sections.get(key)
+        if parts is not None:
+            return parts
 
-    # ✅ فلترة حسب البحث
+    # ✅ فلترة حسب البحث (مرتبة حسب الصلة) + التصنيف
     if q:
-        products = products.filter(
-            Q(name__icontains=q) | Q(description__icontains=q)
-        )
-
-    cart_count, cart_total = _cart_summary(request.session)
+        products = search_srv.search_products(q, selected_cat)
+    else:
+        products = menu.products_for(selected_cat)
 
-    return render(request, "home.html", {
-        "categories": categories,
-        "offers": offers,
+    html = render_to_string("home.html", {
+        "categories": menu.categories,
+        "offers": menu.offers[:10],
         "products": products,
-        "cart_count": cart_count,
-        "cart_total": cart_total,
+        "cart_badge": CART_BADGE_SLOT,
         "selected_cat": selected_cat,  # ✅ مهم للـ is-active
         "q": q,                        # ✅ مهم ليضل البحث ظاهر
     })
+    before, _, after = html.partition(CART_BADGE_SLOT)
+    parts = (before, after)
+    fragments.home_sections.set(key, parts)
+    return parts
+
+
+def _home_response(parts: Tuple[str, str], cart_count: int, cart_total: int) -> HttpResponse:
+    badge = render_to_string("_cart_badge.html", {"cart_count": cart_count, "cart_total": cart_total})
+    return HttpResponse(parts[0] + badge + parts[1])
 
-def product_details(request, slug: str):
-    capture_table_from_qr(request)
-    ensure_cart_not_cleared_if_open(request)
 
-    product = get_object_or_404(Product, slug=slug, is_active=True)
-    cart_count, cart_total = _cart_summary(request.session)
+@conditional_menu_page
+def home(request):
+    q = (request.GET.get("q") or "").strip()
+    selected_cat = (request.GET.get("cat") or "all").strip()
+
+    parts = _home_sections(catalog_srv.get_catalog(), selected_cat, q)
+    cart_count, cart_total = _cart_summary(cart_srv.store_for(request))
+    return _home_response(parts, cart_count, cart_total)
+
+
+@conditional_menu_page
+def product_details(request, slug: str):
+    product = catalog_srv.get_catalog().product_by_slug.get(slug)
+    if product is None:
+        raise Http404("No Product matches the given query.")
+    cart_count, cart_total = _cart_summary(cart_srv.store_for(request))
     return render(request, "product.html", {
         "product": product,
         "cart_count": cart_count,
@@ -96,14 +169,12 @@ def product_details(request, slug: str):
     })
 
 
+@conditional_menu_page
 def offers(request):
-    capture_table_from_qr(request)
-    ensure_cart_not_cleared_if_open(request)
-
-    offers_qs = Offer.objects.filter(is_active=True).order_by("order", "title")
-    cart_count, cart_total = _cart_summary(request.session)
+    menu = catalog_srv.get_catalog()
+    cart_count, cart_total = _cart_summary(cart_srv.store_for(request))
     return render(request, "offers.html", {
-        "offers": offers_qs,
+        "offers": menu.offers,
         "cart_count": cart_count,
         "cart_total": cart_total,
     })
@@ -111,12 +182,12 @@ def offers(request):
 
 
 # ✅ صفحة تخصيص عرض ديناميكية
+@conditional_menu_page
 def offer_customize(request, slug: str):
-    capture_table_from_qr(request)
-    ensure_cart_not_cleared_if_open(request)
-
-    offer = get_object_or_404(Offer, slug=slug, is_active=True)
-    cart_count, cart_total = _cart_summary(request.session)
+    offer = catalog_srv.get_catalog().offer_by_slug.get(slug)
+    if offer is None:
+        raise Http404("No Offer matches the given query.")
+    cart_count, cart_total = _cart_summary(cart_srv.store_for(request))
     return render(request, "offer-customize.html", {
         "offer": offer,
         "cart_count": cart_count,
@@ -128,8 +199,10 @@ def cart_page(request):
     capture_table_from_qr(request)
     ensure_cart_not_cleared_if_open(request)
 
-    lines, total = cart_srv.get_lines(request.session)
-    table_no = request.session.get("table_no", "")
+    cart = cart_srv.store_for(request)
+    lines, total = cart_srv.get_lines(cart)
+    table_no = table_srv.get_table_no(request)
+    submit_token = cart_srv.checkout_token(cart) if lines else ""
 
     ui_lines = []
     for ln in lines:
@@ -164,6 +237,7 @@ def cart_page(request):
         "lines": ui_lines,
         "total": int(total),
         "table_no": table_no,
+        "submit_token": submit_token,
     })
 
 
@@ -176,10 +250,12 @@ def debug_session(request):
 # -----------------------------
 @require_POST
 def cart_add(request, slug: str):
-    product = get_object_or_404(Product, slug=slug, is_active=True)
+    product = catalog_srv.get_catalog().product_by_slug.get(slug)
+    if product is None:
+        raise Http404("No Product matches the given query.")
     qty = int(request.POST.get("qty", "1") or 1)
     qty = max(1, min(qty, 50))
-    cart_srv.add_product(request.session, product.id, qty)
+    cart_srv.add_product(cart_srv.store_for(request), product.id, qty)
     return redirect("cart")
 
 
@@ -189,7 +265,9 @@ def cart_add(request, slug: str):
 
 @require_POST
 def cart_add_offer(request, offer_id: int):
-    offer = get_object_or_404(Offer, id=offer_id, is_active=True)
+    offer = catalog_srv.get_catalog().offer_by_id.get(offer_id)
+    if offer is None:
+        raise Http404("No Offer matches the given query.")
 
     qty = int(request.POST.get("qty", "1") or 1)
     qty = max(1, min(qty, 50))
@@ -204,7 +282,7 @@ def cart_add_offer(request, offer_id: int):
     if note: parts.append(f"ملاحظة: {note}")
     note_str = " | ".join(parts)
 
-    cart_srv.add_offer(request.session, offer.id, qty=qty, note=note_str)
+    cart_srv.add_offer(cart_srv.store_for(request), offer.id, qty=qty, note=note_str)
     return redirect("cart")
 
 
@@ -219,9 +297,9 @@ def cart_update_key(request):
             delta = int(delta)
         except ValueError:
             delta = 0
-        current = cart_srv.get_qty(request.session, key)
-        new_qty = max(0, min(current + delta, 50))
-        cart_srv.set_qty_key(request.session, key, new_qty)
+        cart = cart_srv.store_for(request)
+        new_qty = max(0, min(cart_srv.get_qty(cart, key) + delta, 50))
+        cart_srv.set_qty_key(cart, key, new_qty)
         return redirect("cart")
 
     # qty مباشر
@@ -230,7 +308,7 @@ def cart_update_key(request):
     except ValueError:
         qty = 1
     qty = max(0, min(qty, 50))
-    cart_srv.set_qty_key(request.session, key, qty)
+    cart_srv.set_qty_key(cart_srv.store_for(request), key, qty)
     return redirect("cart")
 
 # -----------------------------
@@ -242,21 +320,17 @@ def cart_update_key(request):
 @require_POST
 def cart_remove_key(request):
     key = (request.POST.get("key") or "").strip()
-    cart_srv.remove_key(request.session, key)
+    cart_srv.remove_key(cart_srv.store_for(request), key)
     return redirect("cart")
 
 
 def _get_or_create_open_order(table_no: str) -> Order:
-    # آخر Order مفتوح لنفس الطاولة
-    open_order = (
-        Order.objects
-        .filter(table_no=table_no)
-        .exclude(status__in=CLOSED_STATUSES)
-        .order_by("-created_at")
-        .first()
-    )
-    if open_order:
-        return open_order
+    # الطلب المفتوح الحالي للطاولة (من سجل الطاولات)
+    state = TableState.objects.select_related("order").filter(pk=table_no).first()
+    if state and state.order:
+        return state.order
+    # بدون label الطاولة: رقم الطاولة جاي من الزبون (?t= / الفورم) → قيم بلا حد
+    transaction.on_commit(lambda: metrics.inc("arabella_orders_created_total"))
     return Order.objects.create(
         table_no=table_no,
         total_syp=0,
@@ -264,80 +338,184 @@ def _get_or_create_open_order(table_no: str) -> Order:
     )
 
 
+def _order_item_key(item_type: str, product_id, offer_id, note: str):
+    return (item_type, product_id, offer_id, (note or "").strip())
+
+
+def _sync_order_items(order: Order, lines):
+    """
+    مقارنة عناصر الطلب الحالية مع سطور السلة (المفتاح: منتج/عرض + الملاحظة).
+    العناصر اللي ما تغيّرت بتضل بنفس الـ id (المطبخ بيعرف شو الجديد).
+    يرجّع (صار تغيير؟، الإجمالي الجديد).
+    """
+    existing = {}
+    duplicates = []
+    for it in order.items.all():
+        key = _order_item_key(it.item_type, it.product_id, it.offer_id, it.note_snapshot)
+        if key in existing:
+            duplicates.append(it.id)
+        else:
+            existing[key] = it
+
+    to_create, to_update = [], []
+    total = 0
+    for ln in lines:
+        if ln.kind == "product":
+            item_type, product, offer = OrderItem.ItemType.PRODUCT, ln.obj, None
+        else:
+            item_type, product, offer = OrderItem.ItemType.OFFER, None, ln.obj
+        name = ln.name
+        price = int(ln.unit_price)
+        qty = int(ln.qty)
+        total += price * qty
+
+        key = _order_item_key(item_type, product and product.id, offer and offer.id, ln.note)
+        it = existing.pop(key, None)
+        if it is None:
+            to_create.append(OrderItem(
+                order=order,
+                item_type=item_type,
+                product=product,
+                offer=offer,
+                name_snapshot=name,
+                price_syp_snapshot=price,
+                qty=qty,
+                note_snapshot=ln.note,
+            ))
+        elif (it.qty, it.price_syp_snapshot, it.name_snapshot) != (qty, price, name):
+            it.qty, it.price_syp_snapshot, it.name_snapshot = qty, price, name
+            to_update.append(it)
+
+    to_delete = duplicates + [it.id for it in existing.values()]
+
+    if to_delete:
+        OrderItem.objects.filter(id__in=to_delete).delete()
+    if to_update:
+        OrderItem.objects.bulk_update(to_update, ["qty", "price_syp_snapshot", "name_snapshot"])
+    if to_create:
+        OrderItem.objects.bulk_create(to_create)
+
+    return bool(to_delete or to_update or to_create), int(total)
+
+
 @require_POST
 def set_table(request):
-    table_no = (request.POST.get("table_no") or "").strip()
-    request.session["table_no"] = table_no
-    request.session.modified = True
+    table_srv.remember(request, request.POST.get("table_no") or "")
     return redirect("cart")
 
 
+CHECKOUT_TOKEN_MAX = CheckoutClaim._meta.get_field("token").max_length
+
+
+def _claim_checkout(token: str, digest: str):
+    """
+    بيحجز التوكن جوّا transaction الطلب. إذا نفس التوكن انبعت قبل بنفس
+    المحتوى (وضمن الـ TTL) → الطلب تبعه، وإلا None (منكمّل كتابة عادية).
+
+    طلبين بنفس اللحظة: على SQLite التاني بيستنى قفل الكتابة وبيعيد كل
+    الـ transaction (atomic_retry) فبيلاقي الحجز؛ على Postgres بيستنى
+    عالـ primary key وبيطلع IntegrityError.
+    """
+    claim = CheckoutClaim.objects.select_related("order").filter(pk=token).first()
+    if claim is None:
+        try:
+            with transaction.atomic():
+                CheckoutClaim.objects.create(token=token, digest=digest)
+            return None
+        except IntegrityError:
+            claim = CheckoutClaim.objects.select_related("order").get(pk=token)
+    fresh = timezone.now() - claim.updated_at < timedelta(seconds=cart_srv.checkout_token_ttl())
+    if claim.digest == digest and claim.order is not None and fresh:
+        return claim.order
+    return None
+
+
 @require_POST
 def checkout(request):
     # ✅ ما في مسح للسلة بعد التأكيد
-    lines, total = cart_srv.get_lines(request.session)
-    if not lines:
-        return redirect("cart")
-
-    table_no = (request.POST.get("table_no") or request.session.get("table_no") or "").strip()
+    table_no = (request.POST.get("table_no") or table_srv.get_table_no(request)).strip()
     note = (request.POST.get("note") or "").strip()
 
+    # ✅ ضغط مزدوج / إعادة إرسال بنفس التوكن ونفس السلة → نفس الطلب بدون DB
+    token = (request.POST.get("submit_token") or "").strip()
+    if len(token) > CHECKOUT_TOKEN_MAX:
+        token = ""
+    cart = cart_srv.store_for(request)
+    digest = cart_srv.checkout_digest(cart, table_no, note) if token else ""
+    if token:
+        order_id = cart_srv.submitted_order_id(cart, token, digest)
+        if order_id:
+            return redirect("order_status", order_id=order_id)
+
+    t0 = time.perf_counter()
+    response, order_id = _checkout(request, table_no, note, token, digest)
+    metrics.observe("arabella_checkout_duration_seconds", time.perf_counter() - t0)
+
+    if token and order_id:
+        cart_srv.remember_submission(cart, token, digest, order_id)
+    return response
+
+
+def _checkout(request, table_no: str, note: str, token: str = "", digest: str = ""):
+    """
+    يرجّع (response، رقم الطلب أو None). رقم الطلب None كمان إذا الطلب
+    كان مكرر (انكتب من طلب تاني بنفس التوكن).
+    """
+    lines, total = cart_srv.get_lines(cart_srv.store_for(request))
+    if not lines:
+        return redirect("cart"), None
+
     if not table_no:
         return render(request, "cart.html", {
             "lines": [],
             "total": int(total),
-            "table_no": request.session.get("table_no", ""),
+            "table_no": table_srv.get_table_no(request),
             "error": "رقم الطاولة مطلوب لتأكيد الطلب",
-        })
-
-    with transaction.atomic():
-        order = _get_or_create_open_order(table_no)
+        }), None
 
-        # ✅ تحديث الملاحظة والإجمالي
-        order.note = note
-        order.total_syp = int(total)
-        if order.status in CLOSED_STATUSES:
-            order.status = Order.Status.NEW
-        order.save()
-
-        # ✅ المهم: استبدال العناصر كلها بما هو موجود حالياً بالسلة
-        order.items.all().delete()
-
-        items = []
-        for ln in lines:
-            if ln.kind == "product":
-                p: Product = ln.obj
-                items.append(OrderItem(
-                    order=order,
-                    item_type=OrderItem.ItemType.PRODUCT,
-                    product=p,
-                    offer=None,
-                    name_snapshot=p.name,
-                    price_syp_snapshot=int(p.price_syp),
-                    qty=int(ln.qty),
-                    note_snapshot=ln.note,
-                ))
-            else:
-                o: Offer = ln.obj
-                items.append(OrderItem(
-                    order=order,
-                    item_type=OrderItem.ItemType.OFFER,
-                    product=None,
-                    offer=o,
-                    name_snapshot=o.title,
-                    price_syp_snapshot=int(o.price_syp),
-                    qty=int(ln.qty),
-                    note_snapshot=ln.note,
-                ))
-
-        OrderItem.objects.bulk_create(items)
+    order, written = _write_order(table_no, note, lines, token, digest)
+    if not written:
+        return redirect("order_status", order_id=order.id), None
 
     request.session["table_no"] = table_no
     request.session["has_submitted_order"] = True  # ✅ صار في Order مربوط بالطاولة
-    request.session.modified = True
 
     # بدال order_success، الأفضل نخليك على تتبع الطلب
-    return redirect("order_status", order_id=order.id)
+    return redirect("order_status", order_id=order.id), order.id
+
+
+@atomic_retry
+def _write_order(table_no: str, note: str, lines, token: str = "", digest: str = "") -> Tuple[Order, bool]:
+    """
+    (الطلب، انكتب هلق؟). مع token: الحجز أول شي بنفس الـ transaction.
+    """
+    if token:
+        claimed = _claim_checkout(token, digest)
+        if claimed is not None:
+            return claimed, False
+
+    order = _get_or_create_open_order(table_no)
+
+    # ✅ المهم: عناصر الطلب لازم تطابق السلة الحالية — بس بالفرق (insert/update/delete)
+    items_changed, items_total = _sync_order_items(order, lines)
+
+    # ✅ تحديث الملاحظة والإجمالي (وما منلمس الطلب إذا ما تغيّر شي)
+    if (
+        items_changed
+        or order.note != note
+        or order.total_syp != items_total
+        or order.status in CLOSED_STATUSES
+    ):
+        order.note = note
+        order.total_syp = items_total
+        if order.status in CLOSED_STATUSES:
+            order.status = Order.Status.NEW
+            order.status_changed_at = timezone.now()
+        order.save()
+        TableState.sync(order)
+    if token:
+        CheckoutClaim.objects.filter(pk=token).update(digest=digest, order=order, updated_at=timezone.now())
+    return order, True
 
 
 def order_success(request, order_id: int):
@@ -345,6 +523,66 @@ def order_success(request, order_id: int):
     return render(request, "order-success.html", {"order": order})
 
 
+ORDER_STATUS_MAX_WAIT = 25  # ثواني
+
+
+def _order_status_validators(order_id: int):
+    """
+    (etag, updated_at) بدون تحميل الطلب كامل أو عمل render.
+    """
+    row = Order.objects.filter(id=order_id).values_list("updated_at", "status").first()
+    if row is None:
+        raise Http404("No Order matches the given query.")
+    updated_at, status = row
+    items = _order_status_items(order_id)
+    return _order_status_etag(order_id, updated_at, status, list(items)), updated_at
+
+
+def _order_status_items(order_id: int):
+    return (
+        OrderItem.objects
+        .filter(order_id=order_id)
+        .order_by("id")
+        .values_list("id", "qty", "price_syp_snapshot", "note_snapshot")
+    )
+
+
+def _order_status_etag(order_id: int, updated_at, status: str, items: list) -> str:
+    digest = hashlib.sha1(repr((updated_at.isoformat(), status, items)).encode()).hexdigest()[:20]
+    return quote_etag(f"o{order_id}-{digest}")
+
+
 def order_status(request, order_id: int):
-    order = get_object_or_404(Order, id=order_id)
-    return render(request, "order-status.html", {"order": order})
+    """
+    - ETag/Last-Modified → التحديث المتكرر بيرجع 304 بدون render.
+    - ?wait=N (مع If-None-Match): بيستنى لحد ما تتغير الحالة أو يخلص الوقت.
+    """
+    etag, updated_at = _order_status_validators(order_id)
+
+    try:
+        wait = min(float(request.GET.get("wait") or 0), ORDER_STATUS_MAX_WAIT)
+    except ValueError:
+        wait = 0
+    client_etag = request.headers.get("If-None-Match")
+    if wait > 0 and client_etag == etag:
+        deadline = time.monotonic() + wait
+        while etag == client_etag:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            live.wait_for_change(live.current_seq(), min(live.poll_interval(), remaining))
+            etag, updated_at = _order_status_validators(order_id)
+
+    last_modified = int(updated_at.timestamp())
+    response = get_conditional_response(request, etag=etag, last_modified=last_modified)
+    if response is None:
+        order = get_object_or_404(Order, id=order_id)
+        response = render(request, "order-status.html", {"order": order, "etag": etag})
+    return _order_status_headers(response, etag, last_modified)
+
+
+def _order_status_headers(response, etag: str, last_modified: int):
+    response["ETag"] = etag
+    response["Last-Modified"] = http_date(last_modified)
+    patch_cache_control(response, private=True, no_cache=True)
+    return response